@@ -1,6 +1,8 @@
 import arcade
 import view
 import utils
+import audio
+import textures
 import pickle
 
 
@@ -43,21 +45,29 @@ class BoxHead2d(arcade.Window):
         arcade.load_font("fonts/FFFFORWA.ttf")
         arcade.load_font("fonts/Cubic_11_1.013_R.ttf")
 
-        # Load sound and music
-        self.button_sound = arcade.Sound("audio/ui_click.wav")
-        self.explosion_sound = arcade.Sound("audio/explosion_2.wav")
-        self.explosion_sound_cnt: int = 0
-        self.refresh_sound = arcade.Sound("audio/ui_refresh.wav")
-        self.purchase_sound = arcade.Sound("audio/ui_purchase.wav")
-        self.purchase_fail_sound = arcade.Sound("audio/ui_purchase_fail.wav")
-        self.round_start_sound = arcade.Sound("audio/round_start.wav")
-        self.game_over_sound = arcade.Sound("audio/game_over.wav")
-        self.game_win_sound = arcade.Sound("audio/mission_complete.wav")
-
-        self.start_music = arcade.Sound(
-            "audio/the-best-jazz-club-in-new-orleans-164472.wav")
-        self.game_music = arcade.Sound(
-            "audio/zapsplat_game_music_medium_action_electronic_techno.wav")
+        # Load every texture once, into the shared atlas
+        textures.Textures.preload(self.ctx)
+
+        # Load sound and music, the music is streamed from the disk
+        self.start_music = audio.Sounds.get(
+            "audio/the-best-jazz-club-in-new-orleans-164472.wav",
+            streaming=True)
+        self.game_music = audio.Sounds.get(
+            "audio/zapsplat_game_music_medium_action_electronic_techno.wav",
+            streaming=True)
+        audio.Sounds.preload()
+
+        self.button_sound = audio.Sounds.get("audio/ui_click.wav")
+        self.explosion_sound = audio.Sounds.get("audio/explosion_2.wav")
+        # Avoid too many explosion noisy
+        audio.Sounds.limit("audio/explosion_2.wav", cooldown=18)
+        self.refresh_sound = audio.Sounds.get("audio/ui_refresh.wav")
+        self.purchase_sound = audio.Sounds.get("audio/ui_purchase.wav")
+        self.purchase_fail_sound = audio.Sounds.get(
+            "audio/ui_purchase_fail.wav")
+        self.round_start_sound = audio.Sounds.get("audio/round_start.wav")
+        self.game_over_sound = audio.Sounds.get("audio/game_over.wav")
+        self.game_win_sound = audio.Sounds.get("audio/mission_complete.wav")
 
         # Set game views
         self.option_view = view.OptionView()
@@ -72,32 +82,32 @@ class BoxHead2d(arcade.Window):
             volume=self.music_volume/20, loop=True)
         self.game_music_player.pause()
 
+    def play_effect(self, sound: arcade.Sound) -> None:
+        audio.Sounds.play(sound, volume=self.effect_volume/20)
+
     def play_button_sound(self) -> None:
-        self.button_sound.play(volume=self.effect_volume/20)
+        self.play_effect(self.button_sound)
 
     def play_explosion_sound(self) -> None:
-        if self.explosion_sound_cnt == 0:
-            # Avoid too many explosion noisy
-            self.explosion_sound.play(volume=self.effect_volume/20)
-            self.explosion_sound_cnt = 18
+        self.play_effect(self.explosion_sound)
 
     def play_refresh_sound(self) -> None:
-        self.refresh_sound.play(volume=self.effect_volume/20)
+        self.play_effect(self.refresh_sound)
 
     def play_purchase_sound(self) -> None:
-        self.purchase_sound.play(volume=self.effect_volume/20)
+        self.play_effect(self.purchase_sound)
 
     def play_purchase_fail_sound(self) -> None:
-        self.purchase_fail_sound.play(volume=self.effect_volume/20)
+        self.play_effect(self.purchase_fail_sound)
 
     def play_round_start_sound(self) -> None:
-        self.round_start_sound.play(volume=self.effect_volume/20)
+        self.play_effect(self.round_start_sound)
 
     def play_game_over_sound(self) -> None:
-        self.game_over_sound.play(volume=self.effect_volume/20)
+        self.play_effect(self.game_over_sound)
 
     def play_game_win_sound(self) -> None:
-        self.game_win_sound.play(volume=self.effect_volume/20)
+        self.play_effect(self.game_win_sound)
 
     def update_music_volume(self) -> None:
         self.start_music_player.volume = self.music_volume/20
@@ -0,0 +1,73 @@
+import os
+import arcade
+from pyglet.media import Player
+
+AUDIO_DIR = "audio"
+MAX_VOICES = 8
+
+
+class Sounds:
+    """
+    Registry of every sound under audio/, keyed by its path.
+    Each file is decoded once and the same arcade.Sound is handed out to
+    every user, long tracks are streamed from the disk instead.
+    play() keeps at most voices players of one sound alive at once and
+    waits cooldown game ticks (counted by tick()) between two starts.
+    """
+
+    cache = {}  # lower case path -> arcade.Sound
+    limits = {}  # arcade.Sound -> (voices, cooldown)
+    voices = {}  # arcade.Sound -> players started by play()
+    cooldown = {}  # arcade.Sound -> ticks left before it can start again
+
+    @staticmethod
+    def get(path: str, streaming: bool = False) -> arcade.Sound:
+        """Sound of a file, loaded on the first request if not preloaded."""
+        key = path.lower()
+        sound = Sounds.cache.get(key)
+        if sound is None:
+            sound = arcade.Sound(path, streaming=streaming)
+            Sounds.cache[key] = sound
+        return sound
+
+    @staticmethod
+    def preload() -> None:
+        """Decode every sound under audio/ not loaded yet."""
+        for root, _, files in os.walk(AUDIO_DIR):
+            for name in sorted(files):
+                if name.lower().endswith(".wav"):
+                    Sounds.get(os.path.join(root, name).replace(os.sep, "/"))
+
+    @staticmethod
+    def limit(path: str, voices: int = MAX_VOICES, cooldown: int = 0) -> None:
+        """Set how many players of a sound and how often it can start."""
+        Sounds.limits[Sounds.get(path)] = (voices, cooldown)
+
+    @staticmethod
+    def play(sound: arcade.Sound, volume: float = 1.0) -> Player:
+        """
+        Play a sound effect unless it is at its voice limit or cooling down.
+        Returns the player, or None if the sound was skipped.
+        """
+        if Sounds.cooldown.get(sound, 0) > 0:
+            return None
+        voices, cooldown = Sounds.limits.get(sound, (MAX_VOICES, 0))
+        players = [player for player in Sounds.voices.get(sound, ())
+                   if player.playing]
+        if len(players) >= voices:
+            Sounds.voices[sound] = players
+            return None
+
+        player = sound.play(volume=volume)
+        players.append(player)
+        Sounds.voices[sound] = players
+        if cooldown > 0:
+            Sounds.cooldown[sound] = cooldown
+        return player
+
+    @staticmethod
+    def tick(ticks: int = 1) -> None:
+        """Count down the cooldowns by the game ticks run this frame."""
+        for sound, left in Sounds.cooldown.items():
+            if left > 0:
+                Sounds.cooldown[sound] = max(0, left - ticks)
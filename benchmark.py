@@ -0,0 +1,205 @@
+import argparse
+import json
+import math
+import platform
+import time
+import tracemalloc
+import numpy as np
+import character
+import room
+import simulation
+from pyglet.math import Vec2
+
+ROOMS = (room.GameRoom0, room.GameRoom1, room.GameRoom2)
+SEED = 0
+WARMUP = 60  # ticks run before measuring
+AIM_RADIUS = 200
+AIM_SPEED = 0.05  # radians per tick
+
+
+def late_game(sim: simulation.Simulation, round: int) -> None:
+    """Jump into a late round, the player cannot die and keeps firing."""
+    sim.round = round
+    sim.spawn_cnt = round * 8
+    sim.counter = 1900  # the tank waves start at 2000
+    sim.player.health = 10 ** 9
+    sim.player.energy = 10 ** 9
+    sim.player.is_attack = True
+
+
+def aim_around(sim: simulation.Simulation) -> None:
+    """Sweep the aim around the player, to hit enemies on every side."""
+    angle = sim.ticks * AIM_SPEED
+    sim.mouse_pos.x = sim.player.center_x + math.cos(angle) * AIM_RADIUS
+    sim.mouse_pos.y = sim.player.center_y + math.sin(angle) * AIM_RADIUS
+
+
+def waves(sim: simulation.Simulation) -> None:
+    """Round 18 with full waves of the heavy enemies on the map."""
+    late_game(sim, 18)
+    for enemy_type in (character.EnemyCrash, character.EnemyCrack,
+                       character.EnemyTank):
+        sim.generate_enemy(3, enemy_type)
+        sim.generate_enemy(3, enemy_type)
+
+
+def boss(sim: simulation.Simulation) -> None:
+    """Round 20 with BossRed in phase 2, filling the room with fire."""
+    waves(sim)
+    sim.round = 20
+    sim.set_boss(character.BossRed)
+    for enemy in sim.enemies.of_type(character.BossRed):
+        enemy.health = 2000
+
+
+def explosions(sim: simulation.Simulation) -> None:
+    """Round 16 fought with multi rockets, explosions setting off more."""
+    late_game(sim, 16)
+    sim.player.add_weapon(sim.shop.rocket)
+    sim.player.change_weapon(len(sim.player.weapons) - 1)
+    sim.player.is_rocket_multi = True
+    sim.player.is_barrel_multi = True
+    for enemy_type in (character.EnemyCrash, character.EnemyCrack):
+        sim.generate_enemy(3, enemy_type)
+
+
+def chain_explosions(sim: simulation.Simulation) -> None:
+    """Set off multi explosions around the player every 15 ticks."""
+    aim_around(sim)
+    if sim.ticks % 15 == 0:
+        for i in range(4):
+            aim = Vec2(150, 0).rotate(i * math.pi / 2 + sim.ticks)
+            sim.set_multi_explosion((sim.player.center_x + aim.x,
+                                     sim.player.center_y + aim.y))
+
+
+# name: (set up, called before each tick)
+SCENARIOS = {
+    "waves": (waves, aim_around),
+    "boss": (boss, aim_around),
+    "explosions": (explosions, chain_explosions),
+}
+
+
+def start(scenario: str, map: type) -> tuple:
+    """A simulation set up for scenario and warmed up, and its tick hook."""
+    set_up, before_tick = SCENARIOS[scenario]
+    sim = simulation.Simulation(character.Player, map, SEED)
+    set_up(sim)
+    for _ in range(WARMUP):
+        before_tick(sim)
+        sim.tick()
+    return sim, before_tick
+
+
+def measure_time(scenario: str, map: type, ticks: int) -> dict:
+    sim, before_tick = start(scenario, map)
+    times = np.zeros(ticks)
+    for i in range(ticks):
+        before_tick(sim)
+        begin = time.perf_counter()
+        sim.tick()
+        times[i] = time.perf_counter() - begin
+    result = {
+        "ticks_per_sec": ticks / times.sum(),
+        "frame_ms": {
+            "mean": times.mean() * 1000,
+            "p50": np.percentile(times, 50) * 1000,
+            "p99": np.percentile(times, 99) * 1000,
+            "max": times.max() * 1000,
+        },
+        "enemies": len(sim.enemies),
+        "bullets": (sim.player_bullets.count + sim.enemy_bullets.count
+                    + sim.boss_bullets.count),
+        "explosions": len(sim.explosions_list),
+    }
+    sim.stop()
+    return result
+
+
+def measure_allocations(scenario: str, map: type, ticks: int) -> dict:
+    """
+    Bytes allocated in each phase of a tick, on average. allocated is the
+    peak reached during the phase, retained what is still there after it.
+    """
+    sim, before_tick = start(scenario, map)
+    allocated = {}
+    retained = {}
+
+    def wrap(phase: str, method):
+        allocated.setdefault(phase, 0)
+        retained.setdefault(phase, 0)
+
+        def traced(*args, **kwargs):
+            begin = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            result = method(*args, **kwargs)
+            current, peak = tracemalloc.get_traced_memory()
+            allocated[phase] += peak - begin
+            retained[phase] += current - begin
+            return result
+        return traced
+
+    sim.instrument(wrap)
+    tracemalloc.start()
+    for _ in range(ticks):
+        before_tick(sim)
+        sim.tick()
+    tracemalloc.stop()
+    sim.stop()
+    return {phase: {"allocated_per_tick": allocated[phase] / ticks,
+                    "retained_per_tick": retained[phase] / ticks}
+            for phase in allocated}
+
+
+def main():
+    """Run the scenarios and write the results as JSON."""
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark late game scenarios, headless.")
+    parser.add_argument("--ticks", type=int, default=600,
+                        help="ticks measured per run")
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append",
+                        help="scenario to run, all by default")
+    parser.add_argument("--room", choices=[r.__name__ for r in ROOMS],
+                        action="append", help="room to run in, all by default")
+    parser.add_argument("--no-alloc", action="store_true",
+                        help="skip the allocation pass")
+    parser.add_argument("--out", default="benchmark.json",
+                        help="output file, - for stdout")
+    args = parser.parse_args()
+
+    results = []
+    for scenario in args.scenario or SCENARIOS:
+        for map in ROOMS:
+            if args.room and map.__name__ not in args.room:
+                continue
+            result = {"scenario": scenario, "room": map.__name__}
+            result.update(measure_time(scenario, map, args.ticks))
+            if not args.no_alloc:
+                result["allocations"] = measure_allocations(scenario, map,
+                                                            args.ticks)
+            print(f"{scenario:>10} {map.__name__}: "
+                  f"{result['ticks_per_sec']:8.1f} ticks/s, "
+                  f"p50 {result['frame_ms']['p50']:.2f} ms, "
+                  f"p99 {result['frame_ms']['p99']:.2f} ms")
+            results.append(result)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": SEED,
+        "warmup": WARMUP,
+        "ticks": args.ticks,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out == "-":
+        print(text)
+    else:
+        with open(args.out, "w") as file:
+            file.write(text)
+
+
+if __name__ == "__main__":
+    main()
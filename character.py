@@ -1,7 +1,13 @@
 import arcade
+import numpy as np
 import utils
+import render
+import textures
 import random
 import weapon
+import projectile
+import pathfinding
+import registry
 from pyglet.math import Vec2
 
 BODY_ANIM = [-1, -1, -1, -1, -1, -1, 0,
@@ -18,6 +24,16 @@ R_WALK_X = [1, 1, 1, 0, 0, 0, -1, -1, -1, 0, 0,
 R_WALK_Y = [1, 1, 1, 0, 0, 0, -1, -1, -1, 0, 0,
             0, 1, 1, 1, 0, 0, 0, -1, -1, -1, 0, 0, 0]
 GET_DAMAGE_LEN = 8
+DAMAGE_ALPHA = 150
+
+# Enemy behaviours, run over the whole EnemyTable by kind
+NO_ATTACK = 0
+SHOOT = 1  # attack() when standing and the cooldown restarts
+DASH = 2  # dash() during the first dash_part of the cooldown
+
+# Animation tables as arrays, for the enemy batch
+BODY_ANIM_ARRAY = np.array(BODY_ANIM)
+WALK_ARRAY = np.array([L_WALK_X, L_WALK_Y, R_WALK_X, R_WALK_Y]).T
 
 
 class Character(arcade.Sprite):
@@ -68,19 +84,15 @@ class Character(arcade.Sprite):
         self.body = arcade.Sprite()
         # Feet sprite
         self.foot_l = arcade.Sprite(
-            filename="graphics/character/Foot.png",
+            texture=textures.Textures.get("graphics/character/Foot.png"),
             center_x=self.foot_l_pos.x + self.pos.x,
             center_y=self.foot_l_pos.y + self.pos.x,
-            image_width=4,
-            image_height=4,
             scale=1,
         )
         self.foot_r = arcade.Sprite(
-            filename="graphics/character/Foot.png",
+            texture=textures.Textures.get("graphics/character/Foot.png"),
             center_x=self.foot_r_pos.x + self.pos.x,
             center_y=self.foot_r_pos.y + self.pos.x,
-            image_width=4,
-            image_height=4,
             scale=1,
         )
         # Shadow sprite
@@ -89,25 +101,47 @@ class Character(arcade.Sprite):
             center_y=self.collider_pos.y + self.pos.x,
             scale=1,
         )
-        self.shadow.texture = arcade.make_soft_square_texture(
+        self.shadow.texture = textures.Textures.make(
+            arcade.make_soft_square_texture,
             22, utils.Color.LIGHT_BLACK, 160, 100)
         # Get damage sprite
-        self.damage_sprite = arcade.SpriteSolidColor(20, 24,
-                                                     utils.Color.RED_TRANSPARENT)
+        self.damage_sprite = textures.Textures.solid_sprite(
+            20, 24, utils.Color.RED_TRANSPARENT)
         self.damage_sprite.alpha = 0
 
-        # Body parts list for rendering
-        self.parts = arcade.SpriteList()
+        # Body parts list for rendering, made in OpenGL when first drawn
+        self.parts = arcade.SpriteList(lazy=True)
         self.parts.append(self.shadow)
         self.parts.append(self.body)
         self.parts.append(self.foot_l)
         self.parts.append(self.foot_r)
         self.parts.append(self.damage_sprite)
 
+        # Set when the character is drawn by an EnemyBatch instead
+        self.batch = None
+        self.slot = -1
+
+    # Animation of the character in an EnemyBatch: how far the body bobs
+    # and the feet walk (enemies do not move their feet)
+    bob = 1
+    stride = 0
+
+    def batch_parts(self) -> list:
+        """Part sprites and their offsets from pos, in drawing order."""
+        return [(self.shadow, self.shadow_pos),
+                (self.body, self.body_pos),
+                (self.foot_l, self.foot_l_pos),
+                (self.foot_r, self.foot_r_pos),
+                (self.damage_sprite, self.collider_pos)]
+
     def move(self) -> None:
         """Move all the body parts"""
         self.pos.x = self.center_x - self.collider_pos.x
         self.pos.y = self.center_y - self.collider_pos.y
+        if self.batch is not None:
+            # The parts are placed by the batch
+            self.batch.pos[self.slot] = self.pos.x, self.pos.y
+            return
 
         self.body.center_x = self.pos.x + self.body_pos.x
         self.body.center_y = self.pos.y + self.body_pos.y
@@ -126,6 +160,12 @@ class Character(arcade.Sprite):
     def update(self) -> None:
         self.move()
 
+        if self.batch is not None:
+            # Animated by the batch
+            self.get_damage_len -= 1
+            self.batch.damaged[self.slot] = self.get_damage_len > 0
+            return
+
         # Body animation
         if self.body_move_frames == 0:  # reset frames
             self.body_move_frames = self.body_move_frames_max
@@ -137,35 +177,16 @@ class Character(arcade.Sprite):
         self.get_damage_len -= 1
 
         if self.get_damage_len > 0:
-            self.damage_sprite.alpha = 150
+            self.damage_sprite.alpha = DAMAGE_ALPHA
         else:
             self.damage_sprite.alpha = 0
 
     def draw(self, *, filter=None, pixelated=None, blend_function=None) -> None:
         self.parts.draw()
 
-    def register_dir_field(self, dir_field: dict) -> None:
+    def register_dir_field(self, dir_field: pathfinding.FlowFieldWorker) -> None:
         self.dir_field = dir_field
 
-    def follow_dir(self) -> None:
-        grid_x = int(self.center_x / utils.Utils.WALL_SIZE)
-        grid_y = int(self.center_y / utils.Utils.WALL_SIZE)
-        self.force = self.dir_field[(grid_x, grid_y)]
-        self.force = self.force.scale(self.speed)
-
-        # Since the character collider are square,
-        # it is still possible to be stuck with a wall.
-        cur_pos = Vec2(self.center_x, self.center_y)
-        if cur_pos.distance(self.last_pos) < 0.0001 and self.is_walking:
-            # Apply opposite force to avoid
-            self.force.x = random.choice([-1.0, 1.0])
-            self.force.y = random.choice([-1.0, 1.0])
-            self.force = self.force.scale(10 * self.speed)
-
-        self.physics_engines[0].apply_force(
-            self, (self.force.x, self.force.y))
-        self.last_pos = cur_pos
-
 
 """Play characters"""
 
@@ -173,7 +194,7 @@ class Character(arcade.Sprite):
 class Player(Character):
     """Player game object."""
 
-    body_texture = arcade.load_texture("graphics/character/Player.png")
+    body_texture = textures.Textures.get("graphics/character/Player.png")
     name = "Nameless"
     description = "Nameless Description"
 
@@ -306,8 +327,8 @@ class Player(Character):
         aim_pos = self.mouse_pos - self.pos
         self.current_weapon.aim(aim_pos)
 
-    def attack(self) -> arcade.SpriteList:
-        return self.current_weapon.get_bullet()
+    def attack(self, bullets: projectile.BulletSystem) -> None:
+        self.current_weapon.shoot(bullets)
 
     def place(self) -> arcade.Sprite:
         return self.current_weapon.get_object()
@@ -329,7 +350,7 @@ class Player(Character):
 class Rambo(Player):
     "Rambo character."
 
-    body_texture = arcade.load_texture("graphics/character/Rambo.png")
+    body_texture = textures.Textures.get("graphics/character/Rambo.png")
     name = "Rambo"
     description = "Rambo Description"
 
@@ -341,7 +362,7 @@ class Rambo(Player):
 class Redbit(Player):
     "Redbit character."
 
-    body_texture = arcade.load_texture("graphics/character/Redbit.png")
+    body_texture = textures.Textures.get("graphics/character/Redbit.png")
     name = "Redbit"
     description = "Redbit Description"
 
@@ -361,7 +382,31 @@ class Redbit(Player):
 """Enemy characters"""
 
 
-class EnemyWhite(Character):
+class Enemy(Character):
+    """
+    Enemy base class. While an enemy is in an EnemyTable its columns are
+    stored in the table, which also steers it along the flow field and
+    runs its attack as given by the class attributes below.
+    """
+
+    health = registry.Column()
+    cd = registry.Column()
+    cd_max = registry.Column()
+    speed = registry.Column()
+    is_walking = registry.Column()
+    force = registry.Column(2)
+    dash_force = registry.Column(2)
+
+    steered = True
+    shoot_range = 0  # stands still closer than this to the player
+    attack_mode = NO_ATTACK
+    dash_part = 0.0
+    dash_power = 0  # dash force, times speed
+
+    table = None
+
+
+class EnemyWhite(Enemy):
     """EnemyWhite class."""
 
     def __init__(self, x: float = 0, y: float = 0,
@@ -371,19 +416,18 @@ class EnemyWhite(Character):
         self.health_max = int(100)
         self.is_walking = True
         self.hit_damage = int(20)
-        self.body.texture = arcade.load_texture(
+        self.body.texture = textures.Textures.get(
             "graphics/character/EnemyWhite.png")
         self.player = player
         self.force = Vec2(0, 0)
 
-    def update(self) -> None:
-        super().update()
-        self.follow_dir()
 
-
-class EnemyRed(Character):
+class EnemyRed(Enemy):
     """EnemyRed class."""
 
+    shoot_range = 200
+    attack_mode = SHOOT
+
     def __init__(self, x: float = 0, y: float = 0,
                  physics_engine: arcade.PymunkPhysicsEngine = None,
                  player: Player = None) -> None:
@@ -392,45 +436,24 @@ class EnemyRed(Character):
         self.health_max = int(300)
         self.is_walking = True
         self.hit_damage = int(20)
-        self.shoot_range = 200
         self.cd_max = int(90)
         self.bullet = weapon.FireBall
-        self.body.texture = arcade.load_texture(
+        self.body.texture = textures.Textures.get(
             "graphics/character/EnemyRed.png")
         self.player = player
         self.force = Vec2(0, 0)
 
-    def update(self) -> None:
-        super().update()
-        current_pos = Vec2(self.center_x, self.center_y)
-        player_pos = Vec2(self.player.center_x, self.player.center_y)
-
-        if current_pos.distance(player_pos) < self.shoot_range:
-            self.is_walking = False
-            return
-        else:
-            self.is_walking = True
-
-        self.follow_dir()
-
-    def attack(self) -> weapon.FireBall:
+    def attack(self, bullets: projectile.BulletSystem) -> None:
         # Enemy red attack property
         bullet_speed = 6
         damage = 30
         aim_pos = Vec2(self.player.center_x - self.center_x,
                        self.player.center_y - self.center_y)
-        bullet = self.bullet()
-        bullet.center_x = self.center_x
-        bullet.center_y = self.center_y
-        bullet.speed = bullet_speed
-        bullet.aim = aim_pos.normalize().scale(bullet.speed)
-        bullet.damage = damage
-        bullet.change_x = bullet.aim.x
-        bullet.change_y = bullet.aim.y
-        return bullet
-
-
-class EnemyCrack(Character):
+        bullets.spawn(self.bullet, self.center_x, self.center_y,
+                      aim_pos.normalize().scale(bullet_speed), damage)
+
+
+class EnemyCrack(Enemy):
     """EnemyCrack class."""
 
     def __init__(self, x: float = 0, y: float = 0,
@@ -442,18 +465,17 @@ class EnemyCrack(Character):
         self.health_max = int(200)
         self.is_walking = True
         self.hit_damage = int(40)
-        self.body.texture = arcade.load_texture("graphics/character/Crack.png")
+        self.body.texture = textures.Textures.get("graphics/character/Crack.png")
         self.player = player
         self.force = Vec2(0, 0)
 
-    def update(self) -> None:
-        super().update()
-        self.follow_dir()
-
 
-class EnemyBigMouth(Character):
+class EnemyBigMouth(Enemy):
     """Enemy Big Mouth class."""
 
+    shoot_range = 300
+    attack_mode = SHOOT
+
     def __init__(self, x: float = 0, y: float = 0,
                  physics_engine: arcade.PymunkPhysicsEngine = None,
                  player: Player = None) -> None:
@@ -462,62 +484,36 @@ class EnemyBigMouth(Character):
         self.health_max = int(250)
         self.is_walking = True
         self.hit_damage = int(20)
-        self.shoot_range = 300
         self.cd_max = int(70)
         self.bullet = weapon.FireBall
-        self.body.texture = arcade.load_texture(
+        self.body.texture = textures.Textures.get(
             "graphics/character/BigMouth.png")
         self.player = player
         self.force = Vec2(0, 0)
 
-    def update(self) -> None:
-        super().update()
-        current_pos = Vec2(self.center_x, self.center_y)
-        player_pos = Vec2(self.player.center_x, self.player.center_y)
-
-        if current_pos.distance(player_pos) < self.shoot_range:
-            self.is_walking = False
-            return
-        else:
-            self.is_walking = True
-
-        self.follow_dir()
-
-    def attack(self) -> arcade.SpriteList():
-        bullets = arcade.SpriteList()
+    def attack(self, bullets: projectile.BulletSystem) -> None:
         bullet_speed = 7
         damage = 50
+        life_span = 120
         aim_pos = Vec2(self.player.center_x - self.center_x,
                        self.player.center_y - self.center_y)
+        aim_up = aim_pos.normalize().scale(bullet_speed)
+        aim_down = aim_up.rotate(-0.05)
 
-        bullet_up = self.bullet()
-        bullet_up.life_span = int(120)
-        bullet_up.center_x = self.center_x
-        bullet_up.center_y = self.center_y + 10
-        bullet_up.speed = bullet_speed
-        bullet_up.damage = damage
-        bullet_up.aim = aim_pos.normalize().scale(bullet_up.speed)
-        bullet_up.change_x = bullet_up.aim.x
-        bullet_up.change_y = bullet_up.aim.y
-
-        bullet_down = self.bullet()
-        bullet_down.life_span = int(120)
-        bullet_down.center_x = self.center_x
-        bullet_down.center_y = self.center_y - 10
-        bullet_down.speed = bullet_speed
-        bullet_down.damage = damage
-        bullet_down.aim = bullet_up.aim.rotate(-0.05)
-        bullet_down.change_x = bullet_down.aim.x
-        bullet_down.change_y = bullet_down.aim.y
-
-        bullets.append(bullet_up)
-        bullets.append(bullet_down)
-        return bullets
-
-
-class EnemyCrash(Character):
+        bullets.spawn(self.bullet, self.center_x, self.center_y + 10,
+                      aim_up, damage, life_span)
+        bullets.spawn(self.bullet, self.center_x, self.center_y - 10,
+                      aim_down, damage, life_span)
+
+
+class EnemyCrash(Enemy):
     """EnemyCrash class."""
 
+    shoot_range = 200
+    attack_mode = DASH
+    dash_part = 1 / 2
+    dash_power = 3
+
     def __init__(self, x: float = 0, y: float = 0,
                  physics_engine: arcade.PymunkPhysicsEngine = None,
                  player: Player = None) -> None:
@@ -527,38 +523,21 @@ class EnemyCrash(Character):
         self.health_max = int(100)
         self.is_walking = True
         self.hit_damage = int(80)
-        self.body.texture = arcade.load_texture("graphics/character/Crash.png")
+        self.body.texture = textures.Textures.get("graphics/character/Crash.png")
         self.player = player
         self.force = Vec2(0, 0)
         self.cd_max = int(120)
-        self.shoot_range = 200
         self.dash_force = Vec2(0, 0)
 
-    def update(self) -> None:
-        super().update()
-        current_pos = Vec2(self.center_x, self.center_y)
-        player_pos = Vec2(self.player.center_x, self.player.center_y)
-
-        if current_pos.distance(player_pos) < self.shoot_range:
-            if self.dash_force.mag < 0.000001:
-                self.dash_force = player_pos - current_pos
-                self.dash_force = self.dash_force.normalize()
-            self.is_walking = False
-            return
-        else:
-            self.is_walking = True
-            self.dash_force = Vec2(0, 0)
-
-        self.follow_dir()
-
-    def dash(self) -> None:
-        force = self.dash_force.scale(3 * self.speed)
-        self.physics_engines[0].apply_force(self, (force.x, force.y))
-
 
-class EnemyTank(Character):
+class EnemyTank(Enemy):
     """EnemyTank class."""
 
+    shoot_range = 200
+    attack_mode = DASH
+    dash_part = 2 / 3
+    dash_power = 5
+
     def __init__(self, x: float = 0, y: float = 0,
                  physics_engine: arcade.PymunkPhysicsEngine = None,
                  player: Player = None) -> None:
@@ -569,38 +548,32 @@ class EnemyTank(Character):
         self.is_walking = True
         self.last_force = Vec2(0, 0)
         self.hit_damage = int(120)
-        self.body.texture = arcade.load_texture("graphics/character/Tank.png")
-        self.l_or_r = 1 if bool(random.getrandbits(1)) else -1
-        self.u_or_d = 1 if bool(random.getrandbits(1)) else -1
+        self.body.texture = textures.Textures.get("graphics/character/Tank.png")
         self.player = player
         self.cd_max = int(120)
-        self.shoot_range = 200
         self.dash_force = Vec2(0, 0)
 
-    def update(self) -> None:
-        super().update()
-        current_pos = Vec2(self.center_x, self.center_y)
-        player_pos = Vec2(self.player.center_x, self.player.center_y)
-
-        if current_pos.distance(player_pos) < self.shoot_range:
-            if self.dash_force.mag < 0.000001:
-                self.dash_force = player_pos - current_pos
-                self.dash_force = self.dash_force.normalize()
-            self.is_walking = False
-            return
-        else:
-            self.is_walking = True
-            self.dash_force = Vec2(0, 0)
 
-        self.follow_dir()
+class BossRed(arcade.Sprite):
+    """Simple Red Boss."""
 
-    def dash(self) -> None:
-        force = self.dash_force.scale(5 * self.speed)
-        self.physics_engines[0].apply_force(self, (force.x, force.y))
+    health = registry.Column()
+    cd = registry.Column()
+    cd_max = registry.Column()
+    speed = registry.Column()
+    is_walking = registry.Column()
+    force = registry.Column(2)
+    dash_force = registry.Column(2)
 
+    # Its moves and attacks depend on its phase, they are run by its
+    # update and the game view
+    steered = False
+    shoot_range = 300
+    attack_mode = NO_ATTACK
+    dash_part = 0.0
+    dash_power = 0
 
-class BossRed(arcade.Sprite):
-    """Simple Red Boss."""
+    table = None
 
     def __init__(self, x: float = 0, y: float = 0,
                  physics_engine: arcade.PymunkPhysicsEngine = None,
@@ -646,57 +619,72 @@ class BossRed(arcade.Sprite):
 
         # Visuals
         # Body sprite
-        self.body = arcade.Sprite(filename="graphics/character/BossRedBody.png",
-                                  image_width=40,
-                                  image_height=52)
+        self.body = arcade.Sprite(
+            texture=textures.Textures.get("graphics/character/BossRedBody.png"))
         # Feet sprite
         self.foot_l = arcade.Sprite(
-            filename="graphics/character/BossFoot.png",
+            texture=textures.Textures.get("graphics/character/BossFoot.png"),
             center_x=self.foot_l_pos.x + self.pos.x,
             center_y=self.foot_l_pos.y + self.pos.x,
-            image_width=10,
-            image_height=10,
             scale=1,
         )
         self.foot_r = arcade.Sprite(
-            filename="graphics/character/BossFoot.png",
+            texture=textures.Textures.get("graphics/character/BossFoot.png"),
             center_x=self.foot_r_pos.x + self.pos.x,
             center_y=self.foot_r_pos.y + self.pos.x,
-            image_width=10,
-            image_height=10,
             scale=1,
         )
 
         # Get damage sprite
-        self.damage_sprite = arcade.SpriteSolidColor(40, 52,
-                                                     utils.Color.WHITE)
+        self.damage_sprite = textures.Textures.solid_sprite(
+            40, 52, utils.Color.WHITE)
         self.damage_sprite.alpha = 0
 
-        # Body parts list for rendering
-        self.parts = arcade.SpriteList()
+        # Body parts list for rendering, made in OpenGL when first drawn
+        self.parts = arcade.SpriteList(lazy=True)
         self.parts.append(self.body)
         self.parts.append(self.foot_l)
         self.parts.append(self.foot_r)
         self.parts.append(self.damage_sprite)
 
+        # Set when the boss is drawn by an EnemyBatch instead
+        self.batch = None
+        self.slot = -1
+
         # Set up
         self.bullet = weapon.FireBall
         self.last_force = Vec2(0, 0)
         self.hit_damage = int(250)
-        self.l_or_r = 1 if bool(random.getrandbits(1)) else -1
-        self.u_or_d = 1 if bool(random.getrandbits(1)) else -1
         self.player = player
         self.direction = Vec2(0, 0)
         self.is_set_dir = False
-        self.shoot_range = 300
         self.force = Vec2(0, 0)
         self.dash_force = Vec2(0, 0)
         self.cnt = 0
 
+    # Animation in an EnemyBatch, the boss is twice as big
+    bob = 2
+    stride = 2
+
+    def batch_parts(self) -> list:
+        """Part sprites and their offsets from pos, in drawing order."""
+        return [(None, Vec2(0, 0)),  # no shadow
+                (self.body, self.body_pos),
+                (self.foot_l, self.foot_l_pos),
+                (self.foot_r, self.foot_r_pos),
+                (self.damage_sprite, self.body_pos)]
+
     def move(self) -> None:
         """Move all the body parts"""
         self.pos.x = self.center_x - self.collider_pos.x
         self.pos.y = self.center_y - self.collider_pos.y
+        if self.batch is not None:
+            # Placed and animated by the batch
+            self.get_damage_len -= 1
+            self.batch.pos[self.slot] = self.pos.x, self.pos.y
+            self.batch.walking[self.slot] = self.is_walking
+            self.batch.damaged[self.slot] = self.get_damage_len > 0
+            return
 
         self.body.center_x = self.pos.x + self.body_pos.x
         self.body.center_y = self.pos.y + self.body_pos.y
@@ -739,7 +727,7 @@ class BossRed(arcade.Sprite):
             self.walking_frames = self.walking_frames_max
 
         if self.get_damage_len > 0:
-            self.damage_sprite.alpha = 150
+            self.damage_sprite.alpha = DAMAGE_ALPHA
         else:
             self.damage_sprite.alpha = 0
 
@@ -774,28 +762,19 @@ class BossRed(arcade.Sprite):
         force = self.dash_force.scale(5 * self.speed)
         self.physics_engines[0].apply_force(self, (force.x, force.y))
 
-    def shoot_ring(self) -> arcade.SpriteList():
+    def shoot_ring(self, bullets: projectile.BulletSystem) -> None:
         # Shoot
-        bullets = arcade.SpriteList()
         bullet_speed = 5
         damage = 50
         life_span = 90
         aim = Vec2(1, 0)
         for i in range(0, 10):
-            bullet = self.bullet()
-            bullet.life_span = life_span
-            bullet.center_x = self.center_x
-            bullet.center_y = self.center_y
-            bullet.aim = aim.rotate(i * 0.628).scale(bullet_speed)
-            bullet.speed = bullet_speed
-            bullet.damage = damage
-            bullet.change_x = bullet.aim.x
-            bullet.change_y = bullet.aim.y
-            bullets.append(bullet)
-        return bullets
-
-    def shoot_around(self, width: int, height: int) -> arcade.SpriteList():
-        bullets = arcade.SpriteList()
+            bullets.spawn(self.bullet, self.center_x, self.center_y,
+                          aim.rotate(i * 0.628).scale(bullet_speed),
+                          damage, life_span)
+
+    def shoot_around(self, bullets: projectile.BulletSystem,
+                     width: int, height: int, rng: random.Random) -> None:
         for i in range(0, 100):
             if i == 0:
                 pos_x = self.player.pos.x
@@ -803,24 +782,21 @@ class BossRed(arcade.Sprite):
             else:
                 percent = max(0.3, float(self.health) / 2100.0)
                 scale = 300 * percent
-                pos_x = random.randrange(max(int(self.player.center_x - scale), 30),
-                                         min(int(self.player.center_x + scale), width - 30))
-                pos_y = random.randrange(max(int(self.player.center_y - scale), 30),
-                                         min(int(self.player.center_y + scale), height - 30))
-            bullet = weapon.BossFireBall(pos_x, pos_y)
-            bullet.damage = 200
-            bullet.life_span = 90
-            bullets.append(bullet)
-        return bullets
-
-    def register_dir_field(self, dir_field: dict) -> None:
+                pos_x = rng.randrange(max(int(self.player.center_x - scale), 30),
+                                      min(int(self.player.center_x + scale), width - 30))
+                pos_y = rng.randrange(max(int(self.player.center_y - scale), 30),
+                                      min(int(self.player.center_y + scale), height - 30))
+            bullets.spawn(weapon.BossFireBall, pos_x, pos_y, Vec2(0, 0),
+                          200, 90)
+
+    def register_dir_field(self, dir_field: pathfinding.FlowFieldWorker) -> None:
         self.dir_field = dir_field
         self.move_cnt = 0
 
     def follow_dir(self) -> None:
         grid_x = int(self.center_x / utils.Utils.WALL_SIZE)
         grid_y = int(self.center_y / utils.Utils.WALL_SIZE)
-        self.force = self.dir_field[(grid_x, grid_y)]
+        self.force = self.dir_field.direction(grid_x, grid_y)
         self.force = self.force.scale(self.speed)
 
         # Since the character collider are square,
@@ -837,9 +813,9 @@ class BossRed(arcade.Sprite):
     def get_away_dir(self) -> None:
         grid_x = int(self.center_x / utils.Utils.WALL_SIZE)
         grid_y = int(self.center_y / utils.Utils.WALL_SIZE)
-        self.force = self.dir_field[(grid_x, grid_y)]
+        self.force = self.dir_field.direction(grid_x, grid_y)
         if self.move_cnt > 0:
-            self.force = self.dir_field[(grid_x, grid_y)]
+            self.force = self.dir_field.direction(grid_x, grid_y)
             self.move_cnt -= 1
         else:
             self.force = Vec2(-self.force.x, -self.force.y)
@@ -856,3 +832,357 @@ class BossRed(arcade.Sprite):
         self.physics_engines[0].apply_force(
             self, (self.force.x, self.force.y))
         self.last_pos = cur_pos
+
+
+class EnemyTable(registry.Registry):
+    """
+    Every enemy in one table of NumPy columns, a row per enemy kept dense
+    like the registry entities (row i belongs to entities[i]). The
+    registry.Column attributes of an enemy live in its row while it is in
+    the table, so the behaviours run over all the enemies at once.
+    Each enemy class is a kind, its behaviour comes from class attributes.
+    Random pushes are drawn from rng.
+    """
+
+    # Enemy attributes, name: (dtype, shape of one row)
+    COLUMNS = {
+        "health": ("i8", ()),
+        "cd": ("i4", ()),
+        "cd_max": ("i4", ()),
+        "speed": ("f8", ()),
+        "is_walking": (bool, ()),
+        "force": ("f8", (2,)),
+        "dash_force": ("f8", (2,)),
+    }
+    # Kept by the table only
+    DATA = {
+        "kind": ("i4", ()),
+        "body": (object, ()),  # pymunk body
+        "last_pos": ("f8", (2,)),
+    }
+    # Class attributes of an enemy type, stored per kind
+    KIND_ATTRIBUTES = ("steered", "shoot_range", "attack_mode", "dash_part",
+                       "dash_power")
+
+    def __init__(self, capacity: int = 64,
+                 rng: np.random.Generator = None) -> None:
+        super().__init__()
+        self.rng = rng or np.random.default_rng()
+        for name, (dtype, shape) in {**self.COLUMNS, **self.DATA}.items():
+            setattr(self, name, np.zeros((capacity,) + shape, dtype=dtype))
+
+        # Indexed by the kind column
+        self.kinds = {}
+        self.by_kind = {name: np.zeros(0) for name in self.KIND_ATTRIBUTES}
+
+    def reserve(self, count: int) -> None:
+        capacity = len(self.kind)
+        if count <= capacity:
+            return
+        capacity = max(count, capacity * 2)
+        n = len(self.entities)
+        for name in (*self.COLUMNS, *self.DATA):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:n] = old[:n]
+            setattr(self, name, new)
+
+    def get_kind(self, enemy_type: type) -> int:
+        kind = self.kinds.get(enemy_type)
+        if kind is None:
+            kind = len(self.kinds)
+            self.kinds[enemy_type] = kind
+            for name, values in self.by_kind.items():
+                self.by_kind[name] = np.append(values,
+                                               getattr(enemy_type, name))
+        return kind
+
+    def add(self, enemy: arcade.Sprite) -> int:
+        """Add an enemy, it must be in its physics engine already."""
+        n = len(self.entities)
+        self.reserve(n + 1)
+        eid = super().add(enemy)
+        self.kind[n] = self.get_kind(type(enemy))
+        self.body[n] = enemy.physics_engines[0].get_physics_object(
+            enemy).body
+        self.last_pos[n] = 0
+        for name in self.COLUMNS:
+            value = enemy.__dict__.get("_" + name)
+            if isinstance(value, Vec2):
+                value = value.x, value.y
+            getattr(self, name)[n] = 0 if value is None else value
+        enemy.table = self
+        return eid
+
+    def detach(self, enemy: arcade.Sprite, slot: int) -> None:
+        """Hand the columns back to the enemy as it leaves the table."""
+        enemy.table = None
+        self.body[slot] = None
+        for name in self.COLUMNS:
+            value = getattr(self, name)[slot]
+            if value.ndim == 1:
+                value = Vec2(float(value[0]), float(value[1]))
+            else:
+                value = value.item()
+            setattr(enemy, name, value)
+
+    def move(self, src: int, dst: int) -> None:
+        for name in (*self.COLUMNS, *self.DATA):
+            array = getattr(self, name)
+            array[dst] = array[src]
+
+    def of_type(self, enemy_type: type) -> list:
+        """The enemies of a class."""
+        kind = self.kinds.get(enemy_type)
+        if kind is None:
+            return []
+        n = len(self.entities)
+        return [self.entities[i] for i in np.flatnonzero(self.kind[:n] == kind)]
+
+    def apply_forces(self, mask: np.ndarray, forces: np.ndarray) -> None:
+        """Push the bodies of the enemies in mask, by a force each."""
+        for body, force in zip(self.body[:len(mask)][mask], forces.tolist()):
+            body.apply_force_at_local_point(force, (0, 0))
+
+    def steer(self, directions: np.ndarray, target: arcade.Sprite) -> None:
+        """
+        Walk the steered enemies along the direction field towards target,
+        or stand still within their shoot_range, the dashers aiming at
+        target as they stop. A walking enemy that has not moved since the
+        last frame is stuck (the colliders are square, so it can catch on
+        a wall) and is pushed hard in a random diagonal.
+        """
+        n = len(self.entities)
+        if n == 0:
+            return
+        kind = self.kind[:n]
+        steered = self.by_kind["steered"][kind] != 0
+        pos = np.array([body.position for body in self.body[:n]],
+                       dtype=float).reshape(n, 2)
+
+        to_target = np.array([target.center_x, target.center_y]) - pos
+        dist = np.hypot(to_target[:, 0], to_target[:, 1])
+        near = steered & (dist < self.by_kind["shoot_range"][kind])
+        walking = steered & ~near
+        self.is_walking[:n][steered] = walking[steered]
+
+        # Dashers keep their aim until they walk again
+        dash_force = self.dash_force[:n]
+        dasher = self.by_kind["attack_mode"][kind] == DASH
+        aim = (dasher & near & (dist > 0)
+               & (np.hypot(dash_force[:, 0], dash_force[:, 1]) < 0.000001))
+        dash_force[aim] = to_target[aim] / dist[aim, None]
+        dash_force[dasher & walking] = 0
+
+        # Follow the direction field
+        size = utils.Utils.WALL_SIZE
+        grid_x = np.clip((pos[:, 0] // size).astype(int), 0,
+                         directions.shape[0] - 1)
+        grid_y = np.clip((pos[:, 1] // size).astype(int), 0,
+                         directions.shape[1] - 1)
+        speed = self.speed[:n]
+        force = directions[grid_x, grid_y] * speed[:, None]
+
+        moved = pos - self.last_pos[:n]
+        stuck = walking & (np.hypot(moved[:, 0], moved[:, 1]) < 0.0001)
+        if stuck.any():
+            force[stuck] = (self.rng.choice([-1.0, 1.0],
+                                            size=(stuck.sum(), 2))
+                            * 10 * speed[stuck, None])
+
+        self.force[:n][walking] = force[walking]
+        self.last_pos[:n][walking] = pos[walking]
+        self.apply_forces(walking, force[walking])
+
+    def update_attacks(self, bullets: projectile.BulletSystem) -> None:
+        """
+        Run the cooldown of every enemy with an attack. The enemies that
+        stand still restart it when it is over, then shoot or dash.
+        """
+        n = len(self.entities)
+        if n == 0:
+            return
+        kind = self.kind[:n]
+        attack = self.by_kind["attack_mode"][kind]
+        armed = attack != NO_ATTACK
+        cd = self.cd[:n]
+        cd_max = self.cd_max[:n]
+
+        standing = armed & ~self.is_walking[:n]
+        cd[standing & (cd == cd_max)] = 0
+        shoot = standing & (attack == SHOOT) & (cd == 0)
+        dash = (standing & (attack == DASH)
+                & (cd < cd_max * self.by_kind["dash_part"][kind]))
+        for i in np.flatnonzero(shoot):
+            self.entities[i].attack(bullets)
+        if dash.any():
+            power = self.by_kind["dash_power"][kind[dash]] * self.speed[:n][dash]
+            self.apply_forces(dash, self.dash_force[:n][dash] * power[:, None])
+
+        cd[armed] = np.minimum(cd[armed] + 1, cd_max[armed])
+
+
+class EnemyBatch:
+    """
+    Every enemy drawn as instanced quads in one call, five per enemy:
+    shadow, body, feet and damage flash. Enemies are stored in slots of
+    NumPy arrays, removing one moves the last enemy into its slot.
+    The body bob and the walk of the feet are frame counters per enemy,
+    stepped together, and only turned into part offsets when drawn.
+    """
+
+    def __init__(self, capacity: int = 64) -> None:
+        self.enemies = []  # enemy in each slot
+        self.pos = np.zeros((capacity, 2))
+        self.look = np.zeros(capacity, dtype=np.int32)
+        self.body_frame = np.zeros(capacity, dtype=np.int32)
+        self.walk_frame = np.zeros(capacity, dtype=np.int32)
+        self.walking = np.zeros(capacity, dtype=bool)
+        self.damaged = np.zeros(capacity, dtype=bool)
+
+        # One look per enemy class, the parts of its first enemy
+        self.looks = {}
+        self.look_parts = []
+        self.look_bob = []
+        self.look_stride = []
+
+        # Drawing, set up again when a look is added
+        self.batch = None
+
+    def __len__(self) -> int:
+        return len(self.enemies)
+
+    def reserve(self, count: int) -> None:
+        capacity = len(self.look)
+        if count <= capacity:
+            return
+        capacity = max(count, capacity * 2)
+        n = len(self.enemies)
+        for name in ("pos", "look", "body_frame", "walk_frame",
+                     "walking", "damaged"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:n] = old[:n]
+            setattr(self, name, new)
+
+    def get_look(self, enemy: arcade.Sprite) -> int:
+        look = self.looks.get(type(enemy))
+        if look is None:
+            look = len(self.look_parts)
+            self.looks[type(enemy)] = look
+            self.look_parts.append(enemy.batch_parts())
+            self.look_bob.append(enemy.bob)
+            self.look_stride.append(enemy.stride)
+            self.batch = None
+        return look
+
+    def add(self, enemy: arcade.Sprite) -> None:
+        n = len(self.enemies)
+        self.reserve(n + 1)
+        enemy.batch = self
+        enemy.slot = n
+        self.enemies.append(enemy)
+        self.pos[n] = enemy.pos.x, enemy.pos.y
+        self.look[n] = self.get_look(enemy)
+        self.body_frame[n] = len(BODY_ANIM)
+        self.walk_frame[n] = len(L_WALK_X)
+        self.walking[n] = False
+        self.damaged[n] = False
+
+    def remove(self, enemy: arcade.Sprite) -> None:
+        """Remove an enemy in O(1), the last enemy takes its slot."""
+        if enemy.batch is not self:
+            return
+        i = enemy.slot
+        last = len(self.enemies) - 1
+        moved = self.enemies[last]
+        self.enemies[i] = moved
+        moved.slot = i
+        for array in (self.pos, self.look, self.body_frame, self.walk_frame,
+                      self.walking, self.damaged):
+            array[i] = array[last]
+        self.enemies.pop()
+        enemy.batch = None
+        enemy.slot = -1
+
+    def clear(self) -> None:
+        for enemy in self.enemies:
+            enemy.batch = None
+        self.enemies.clear()
+
+    def update(self) -> None:
+        """Step the body and feet animation of every enemy."""
+        n = len(self.enemies)
+        self.body_frame[:n] = (self.body_frame[:n] - 1) % len(BODY_ANIM)
+        walk_max = len(L_WALK_X)
+        self.walk_frame[:n] = np.where(self.walking[:n],
+                                       (self.walk_frame[:n] - 1) % walk_max,
+                                       walk_max)
+
+    def build(self) -> None:
+        """Texture sheet and per look arrays of every part."""
+        images = {}
+        for parts in self.look_parts:
+            for sprite, _ in parts:
+                if sprite is not None:
+                    images[sprite.texture.name] = sprite.texture.image
+        sheet = render.TextureSheet(arcade.get_window().ctx, images)
+
+        looks = len(self.look_parts)
+        self.part_offset = np.zeros((looks, 5, 2))
+        self.part_size = np.zeros((looks, 5, 2), dtype="f4")
+        self.part_uv = np.zeros((looks, 5, 4), dtype="f4")
+        self.part_color = np.ones((looks, 5, 4), dtype="f4")
+        self.look_half = np.zeros((looks, 2))
+        for look, parts in enumerate(self.look_parts):
+            for part, (sprite, offset) in enumerate(parts):
+                self.part_offset[look, part] = offset.x, offset.y
+                if sprite is None:
+                    continue  # zero size, nothing drawn
+                self.part_size[look, part] = sprite.width, sprite.height
+                self.part_uv[look, part] = sheet.uv[sprite.texture.name]
+            self.part_color[look, 4, 3] = DAMAGE_ALPHA / 255
+            extent = (np.abs(self.part_offset[look])
+                      + self.part_size[look] / 2)
+            self.look_half[look] = (extent.max(axis=0)
+                                    + 2 * self.look_stride[look])
+        self.bob_array = np.array(self.look_bob)
+        self.stride_array = np.array(self.look_stride)
+        self.batch = render.QuadBatch(sheet, 5 * len(self.look))
+
+    def draw(self, box: tuple = None) -> None:
+        """Draw the enemies, only those overlapping box if it is given."""
+        n = len(self.enemies)
+        if n == 0:
+            return
+        if self.batch is None:
+            self.build()
+        index = np.arange(n)
+        if box is not None:
+            index = np.flatnonzero(render.in_box(
+                self.pos[:n], self.look_half[self.look[:n]], box))
+        m = len(index)
+        if m == 0:
+            return
+
+        look = self.look[index]
+        offset = self.part_offset[look]
+        # Body bob
+        offset[:, 1, 1] += (BODY_ANIM_ARRAY[self.body_frame[index]
+                                            % len(BODY_ANIM)]
+                            * self.bob_array[look])
+        # Feet walk
+        stride = self.stride_array[look] * self.walking[index]
+        walk = WALK_ARRAY[self.walk_frame[index] % len(L_WALK_X)]
+        offset[:, 2] += walk[:, :2] * stride[:, None]
+        offset[:, 3] += walk[:, 2:] * stride[:, None]
+
+        self.batch.reserve(5 * m)
+        data = self.batch.data[:5 * m].reshape(m, 5)
+        data["pos"] = self.pos[index, None, :] + offset
+        data["size"] = self.part_size[look]
+        data["angle"] = 0
+        data["uv"] = self.part_uv[look]
+        data["color"] = self.part_color[look]
+        data["color"][:, 4, 3] *= self.damaged[index]
+        self.batch.draw(5 * m)
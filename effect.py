@@ -1,7 +1,10 @@
 import arcade
-import math
-import random
+import numpy as np
+import render
+import textures
 import utils
+from arcade.gl import geometry
+from PIL import Image
 
 
 PARTICLE_FADE_RATE = 60
@@ -13,128 +16,297 @@ PARTICLE_COLORS = [arcade.color.ALIZARIN_CRIMSON,
                    arcade.color.LAVA,
                    arcade.color.KU_CRIMSON,
                    arcade.color.DARK_TANGERINE]
+SMOKE_RADIUS = 5
 
+# Particle shapes, drawn in white and tinted by the particle color
+CIRCLE = 0
+SOFT_CIRCLE = 1
+SQUARE = 2
 
-class Smoke(arcade.SpriteCircle):
-    """ This represents a puff of smoke """
+# Fade pass over the whole decal layer
+FADE_VERTEX_SHADER = """
+#version 330
 
-    def __init__(self, size: int) -> None:
-        super().__init__(size, arcade.color.DARK_GRAY, soft=True)
-        self.scale = 1  # smoke scale
+in vec2 in_vert;
 
-    def update(self) -> None:
-        """ Update this particle """
-        if self.alpha <= PARTICLE_FADE_RATE:
-            # Remove faded out particles
-            self.remove_from_sprite_lists()
-        else:
-            # Update values
-            self.alpha -= 42  # smoke fade rate
-            self.center_x += self.change_x
-            self.center_y += self.change_y
-            self.scale += 0.03  # smoke expansion rate
+void main() {
+    gl_Position = vec4(in_vert, 0.0, 1.0);
+}
+"""
+
+FADE_FRAGMENT_SHADER = """
+#version 330
+
+uniform float fade;
+
+out vec4 f_color;
+
+void main() {
+    f_color = vec4(0.0, 0.0, 0.0, fade);
+}
+"""
+
+
+class ParticleSystem:
+    """
+    Effect particles stored as NumPy arrays (struct of arrays), updated
+    together in one vectorized step and drawn in one instanced call.
+    A particle moves and fades while its alpha is above its rest alpha, and
+    is removed when its life (in frames) runs out.
+    At most capacity particles are alive at once, the others are dropped.
+    Random directions, sizes and sparkles are drawn from rng.
+    """
 
+    sheet = None  # shape images, shared by every system
+    shape_uv = None
 
-class Particle(arcade.SpriteCircle):
-    """ Explosion particle """
+    def __init__(self, capacity: int,
+                 rng: np.random.Generator = None) -> None:
+        self.rng = rng or np.random.default_rng()
+        self.capacity = capacity
+        self.count = 0
+        self.pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.size = np.zeros((capacity, 2))
+        self.scale = np.zeros(capacity)
+        self.grow = np.zeros(capacity)
+        self.alpha = np.zeros(capacity)
+        self.fade = np.zeros(capacity)
+        self.rest_alpha = np.zeros(capacity)
+        self.life = np.zeros(capacity, dtype=np.int32)
+        self.shape = np.zeros(capacity, dtype=np.int32)
+        self.color = np.zeros((capacity, 3), dtype=np.float32)
+        self.smokes = np.zeros(capacity, dtype=bool)  # leaves a smoke trail
+        self.sparkle = np.zeros(capacity, dtype=bool)  # drawn white
 
-    def __init__(self, my_list: arcade.SpriteList) -> None:
-        # Choose a random color
-        color = random.choice(PARTICLE_COLORS)
+        # Drawing, set up on the first draw
+        self.batch = None
 
-        # Make the particle
-        super().__init__(PARTICLE_RADIUS, color)
+    def __len__(self) -> int:
+        return self.count
 
-        # Track normal particle texture, so we can 'flip' when we sparkle.
-        self.normal_texture = self.texture
+    def spawn(self, n: int, x: np.ndarray, y: np.ndarray, speed: np.ndarray,
+              shape: int, width: np.ndarray, height: np.ndarray,
+              color: np.ndarray, fade: float, rest_alpha: float, life: int,
+              grow: float = 0, smokes: bool = False) -> slice:
+        """
+        Add n particles moving by speed in random directions, returns the
+        slice they are stored in. Arguments may be scalars or arrays of n.
+        """
+        n = min(n, self.capacity - self.count)
+        new = slice(self.count, self.count + n)
+        direction = np.radians(self.rng.integers(360, size=n))
+        self.pos[new, 0] = x
+        self.pos[new, 1] = y
+        self.vel[new, 0] = np.sin(direction) * speed
+        self.vel[new, 1] = np.cos(direction) * speed
+        self.size[new, 0] = width
+        self.size[new, 1] = height
+        self.scale[new] = 1
+        self.grow[new] = grow
+        self.alpha[new] = 255
+        self.fade[new] = fade
+        self.rest_alpha[new] = rest_alpha
+        self.life[new] = life
+        self.shape[new] = shape
+        self.color[new] = np.asarray(color, dtype=np.float32)[..., :3] / 255
+        self.smokes[new] = smokes
+        self.sparkle[new] = False
+        self.count += n
+        return new
 
-        # Keep track of the list we are in, so we can add a smoke trail
-        self.my_list = my_list
+    def explosion(self, position: arcade.Point, n: int = 18) -> None:
+        """Sparkling particles flying out, each leaving a smoke trail."""
+        colors = np.array(PARTICLE_COLORS)
+        speed = self.rng.random(n) * PARTICLE_SPEED_RANGE + PARTICLE_MIN_SPEED
+        self.spawn(n, position[0], position[1], speed,
+                   CIRCLE, PARTICLE_RADIUS * 2, PARTICLE_RADIUS * 2,
+                   colors[self.rng.integers(len(colors), size=n)],
+                   fade=36, rest_alpha=PARTICLE_FADE_RATE, life=6,
+                   smokes=True)
 
-        # Set direction/speed
-        speed = random.random() * PARTICLE_SPEED_RANGE + PARTICLE_MIN_SPEED
-        direction = random.randrange(360)
-        self.change_x = math.sin(math.radians(direction)) * speed
-        self.change_y = math.cos(math.radians(direction)) * speed
+    def smoke(self, pos: np.ndarray) -> slice:
+        """A still, growing puff of smoke at each position."""
+        return self.spawn(len(pos), pos[:, 0], pos[:, 1], 0,
+                          SOFT_CIRCLE, SMOKE_RADIUS * 2, SMOKE_RADIUS * 2,
+                          arcade.color.DARK_GRAY,
+                          fade=42, rest_alpha=PARTICLE_FADE_RATE, life=5,
+                          grow=0.03)
 
-        # Track original alpha. Used as part of 'sparkle' where we temp set the
-        # alpha back to 255
-        self.my_alpha = 255
+    def blood(self, position: arcade.Point, n: int = 12) -> None:
+        """Blood drops, they stay on the ground for 10 seconds."""
+        self.spawn(n, position[0], position[1], self.rng.random(n) * 8,
+                   SQUARE, self.rng.integers(4, 13, size=n),
+                   self.rng.integers(4, 13, size=n), utils.Color.DARK_RED,
+                   fade=50, rest_alpha=200, life=600)
+
+    def traces(self, position: arcade.Point, n: int = 12) -> None:
+        """Burn marks of an explosion, they stay for 10 seconds."""
+        self.spawn(n, position[0], position[1], self.rng.random(n) * 12,
+                   SQUARE, self.rng.integers(6, 13, size=n),
+                   self.rng.integers(6, 13, size=n), utils.Color.BLACK,
+                   fade=50, rest_alpha=200, life=600)
+
+    def step(self, part: slice) -> np.ndarray:
+        """
+        Move, fade and grow the particles of part that are not at rest.
+        Returns the mask of those that were.
+        """
+        moving = self.alpha[part] > self.rest_alpha[part]
+        self.pos[part][moving] += self.vel[part][moving]
+        self.alpha[part][moving] -= self.fade[part][moving]
+        self.scale[part][moving] += self.grow[part][moving]
+        self.life[part] -= 1
+        return moving
+
+    def remove(self, dead: np.ndarray) -> None:
+        """Remove the particles masked by dead, keeping the others in order."""
+        keep = np.flatnonzero(~dead)
+        n = len(keep)
+        if n == self.count:
+            return
+        for array in (self.pos, self.vel, self.size, self.scale, self.grow,
+                      self.alpha, self.fade, self.rest_alpha, self.life,
+                      self.shape, self.color, self.smokes, self.sparkle):
+            array[:n] = array[keep]
+        self.count = n
 
     def update(self) -> None:
-        """ Update the particle """
-        if self.my_alpha <= PARTICLE_FADE_RATE:
-            # Faded out, remove
-            self.remove_from_sprite_lists()
-        else:
-            # Update
-            self.my_alpha -= 36  # particle fade rate
-            self.alpha = self.my_alpha
-            self.center_x += self.change_x
-            self.center_y += self.change_y
-
-            # Whether a particle sparkles
-            if random.random() <= 0.02:  # sparkle chance
-                self.alpha = 255
-                self.texture = arcade.make_circle_texture(int(self.width),
-                                                          arcade.color.WHITE)
-            else:
-                self.texture = self.normal_texture
-
-            # Leave a smoke particle?
-            if random.random() <= 0.5:  # smoke chance
-                smoke = Smoke(5)
-                smoke.position = self.position
-                self.my_list.append(smoke)
-
-
-class Blood(arcade.SpriteSolidColor):
-    """Bleeding effect particle. """
-
-    def __init__(self) -> None:
-        super().__init__(random.randint(4, 12), random.randint(4, 12), utils.Color.DARK_RED)
-        self.my_alpha = 255
-        self.counter = 600
-
-        # Set direction/speed
-        speed = random.random() * 8
-        direction = random.randrange(360)
-        self.change_x = math.sin(math.radians(direction)) * speed
-        self.change_y = math.cos(math.radians(direction)) * speed
-
-    def update(self):
-        if self.my_alpha > 200:  # alpha threshold
-            self.my_alpha -= 50  # blood particle fade rate
-            self.alpha = self.my_alpha
-            self.center_x += self.change_x
-            self.center_y += self.change_y
-
-        if self.counter <= 0:
-            self.remove_from_sprite_lists()
-        self.counter -= 1
-
-
-class ExplosionTrace(arcade.SpriteSolidColor):
-    """Explosion traces particle. """
-
-    def __init__(self) -> None:
-        super().__init__(random.randint(6, 12), random.randint(6, 12), utils.Color.BLACK)
-        self.my_alpha = 255
-        self.counter = 600
-
-        # Set direction/speed
-        speed = random.random() * 12
-        direction = random.randrange(360)
-        self.change_x = math.sin(math.radians(direction)) * speed
-        self.change_y = math.cos(math.radians(direction)) * speed
-
-    def update(self):
-        if self.my_alpha > 200:  # alpha threshold
-            self.my_alpha -= 50  # blood particle fade rate
-            self.alpha = self.my_alpha
-            self.center_x += self.change_x
-            self.center_y += self.change_y
-
-        if self.counter <= 0:
-            self.remove_from_sprite_lists()
-        self.counter -= 1
+        # Remove the particles whose life ran out
+        self.remove(self.life[:self.count] <= 0)
+        n = self.count
+
+        moving = self.step(slice(0, n))
+
+        # Whether a particle sparkles
+        self.sparkle[:n] = (self.smokes[:n] & moving
+                            & (self.rng.random(n) <= 0.02))
+
+        # Leave a smoke particle, it is updated once as if it was there
+        # already
+        trail = self.smokes[:n] & moving & (self.rng.random(n) <= 0.5)
+        if trail.any():
+            self.step(self.smoke(self.pos[:n][trail]))
+
+    def clear(self) -> None:
+        self.count = 0
+
+    @staticmethod
+    def get_sheet() -> render.TextureSheet:
+        """The shape images, made on the first call."""
+        if ParticleSystem.sheet is None:
+            sheet = render.TextureSheet(arcade.get_window().ctx, {
+                CIRCLE: textures.Textures.circle(
+                    PARTICLE_RADIUS, arcade.color.WHITE).image,
+                SOFT_CIRCLE: textures.Textures.circle(
+                    SMOKE_RADIUS, arcade.color.WHITE, soft=True).image,
+                SQUARE: Image.new("RGBA", (4, 4), (255, 255, 255, 255)),
+            })
+            ParticleSystem.sheet = sheet
+            ParticleSystem.shape_uv = np.array(
+                [sheet.uv[shape] for shape in (CIRCLE, SOFT_CIRCLE, SQUARE)],
+                dtype="f4")
+        return ParticleSystem.sheet
+
+    def fill(self, data: np.ndarray, index) -> None:
+        """Write the particles at index (a slice or indices) into data."""
+        self.get_sheet()
+        sparkle = self.sparkle[index]
+        data["pos"] = self.pos[index]
+        data["size"] = self.size[index] * self.scale[index, None]
+        data["angle"] = 0
+        data["uv"] = ParticleSystem.shape_uv[self.shape[index]]
+        data["color"][:, :3] = self.color[index]
+        data["color"][sparkle, :3] = 1
+        data["color"][:, 3] = np.where(sparkle, 1, self.alpha[index] / 255)
+
+    def draw(self, box: tuple = None) -> None:
+        """Draw the particles, only those overlapping box if it is given."""
+        n = self.count
+        if n == 0:
+            return
+        if self.batch is None:
+            self.batch = render.QuadBatch(self.get_sheet(), self.capacity)
+        index = slice(0, n)
+        if box is not None:
+            index = np.flatnonzero(render.in_box(
+                self.pos[:n], self.size[:n] * self.scale[:n, None] / 2, box))
+            n = len(index)
+            if n == 0:
+                return
+        self.fill(self.batch.data[:n], index)
+        self.batch.draw(n)
+
+
+class DecalLayer:
+    """
+    Off-screen layer over the room that settled particles are painted
+    into once, instead of being updated and drawn every frame. Drawing the
+    layer costs the same however much gore is on the ground.
+    With fade, the whole layer is multiplied by fade every fade_every
+    frames so that old decals slowly disappear, None keeps them.
+    """
+
+    def __init__(self, width: int, height: int, fade: float = 0.9,
+                 fade_every: int = 30) -> None:
+        self.ctx = arcade.get_window().ctx
+        self.fade = fade
+        self.fade_every = fade_every
+        self.counter = 0
+        self.fades = 0  # fade passes to apply on the next draw
+
+        # Half floats, so faded decals reach zero instead of sticking
+        self.layer = render.Layer(width, height, dtype="f2")
+
+        # Particles waiting to be painted, as render.INSTANCE
+        self.batch = render.QuadBatch(ParticleSystem.get_sheet())
+        self.pending = 0
+
+        self.fade_program = self.ctx.program(
+            vertex_shader=FADE_VERTEX_SHADER,
+            fragment_shader=FADE_FRAGMENT_SHADER)
+        self.full_quad = geometry.quad_2d_fs()
+
+    def bake(self, particles: ParticleSystem) -> None:
+        """Take the particles at rest out of particles, to be painted."""
+        n = particles.count
+        settled = particles.alpha[:n] <= particles.rest_alpha[:n]
+        index = np.flatnonzero(settled)
+        if len(index) > 0:
+            self.batch.reserve(self.pending + len(index))
+            particles.fill(
+                self.batch.data[self.pending:self.pending + len(index)], index)
+            self.pending += len(index)
+            particles.remove(settled)
+
+        if self.fade is not None:
+            self.counter += 1
+            if self.counter >= self.fade_every:
+                self.counter = 0
+                self.fades += 1
+
+    def flush(self) -> None:
+        """Apply the pending fades and paint the pending particles."""
+        if self.fades == 0 and self.pending == 0:
+            return
+        with self.layer.activate():
+            if self.fades > 0:
+                # Multiply everything (premultiplied color and alpha)
+                self.ctx.blend_func = self.ctx.ZERO, self.ctx.SRC_ALPHA
+                self.fade_program["fade"] = self.fade ** self.fades
+                self.full_quad.render(self.fade_program)
+                self.ctx.blend_func = self.layer.blend
+                self.fades = 0
+            if self.pending > 0:
+                self.batch.draw(self.pending)
+                self.pending = 0
+
+    def clear(self) -> None:
+        self.layer.clear()
+        self.pending = 0
+        self.fades = 0
+
+    def draw(self) -> None:
+        """Draw the layer over the room, with the current camera."""
+        self.flush()
+        self.layer.draw()
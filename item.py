@@ -85,7 +85,8 @@ def minus_speed(item: Item, player: Player) -> bool:
 class Shop:
     """Shop instance class."""
 
-    def __init__(self, player: Player):
+    def __init__(self, player: Player, rng: random.Random = None):
+        self.rng = rng or random.Random()
         self.pistol = player.weapons[0]
         self.uzi = weapon.Uzi()
         self.shotgun = weapon.Shotgun()
@@ -238,7 +239,7 @@ class Shop:
                         actual_cost, item.quality, item.equip)
 
         # Randomly generate quality with luck
-        rand_quality = random.randrange(0, 99)
+        rand_quality = self.rng.randrange(0, 99)
         actual_quality = 0
         if rand_quality < 5 + wave + player.luck:  # 5% base
             actual_quality = 3
@@ -265,7 +266,7 @@ class Shop:
                     )
 
     def get_items(self, wave: int, player: Player, lang) -> list:
-        tmp_list = random.sample(self.cur_item_list, 4)
+        tmp_list = self.rng.sample(self.cur_item_list, 4)
         items = []
         for i in tmp_list:
             items.append(self.generate_item(i, wave, player, lang))
@@ -0,0 +1,352 @@
+import math
+import heapq
+import threading
+import collections
+import numpy as np
+import utils
+from pyglet.math import Vec2
+
+# Neighbours scanned by the gradient pass, in priority order:
+# on a tie the first neighbour in this list wins.
+NEIGHBOURS = [(-1, 0), (1, 0), (0, -1), (0, 1),
+              (1, 1), (1, -1), (-1, 1), (-1, -1)]
+DIAGONAL = 1 / math.sqrt(2)
+
+# Grid values that block the way: real walls (1) and barrels (3).
+# Placed walls (2) and mines (4) are walked into on purpose.
+BLOCKING = (1, 3)
+
+# More changed cells than this in one update are rebuilt from scratch
+REPAIR_LIMIT = 8
+
+
+class FlowField:
+    """
+    Flow field towards the player for enemy path finding.
+    The room grid, distance grid and direction field are 2D NumPy arrays
+    indexed by [grid_x, grid_y], the same as Room.grid.
+
+    The field is rebuilt only when the player enters another cell. A few
+    changed grid cells (objects placed or destroyed) are repaired in place,
+    touching only the cells whose distance actually changes.
+    """
+
+    def __init__(self, grid_w: int, grid_h: int) -> None:
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.min_dist = -(grid_w * grid_h) - 10
+        self.unreached = grid_w * grid_h + 10
+        # A repair touching more cells than this is slower than a rebuild
+        self.repair_area = grid_w * grid_h // 4
+
+        # Everything is kept with a one cell border, so that neighbour
+        # lookups never need a bounds check. The border acts as a wall.
+        shape = (grid_w + 2, grid_h + 2)
+        self.pad_grid = np.ones(shape, dtype=np.int8)
+        self.grid = self.pad_grid[1:-1, 1:-1]
+        self.pad_steps = np.full(shape, self.unreached, dtype=np.int32)
+        self.pad_dist = np.full(shape, self.min_dist, dtype=np.int32)
+        self.dist = self.pad_dist[1:-1, 1:-1]
+
+        # Unit direction per cell, read by EnemyTable.steer
+        self.dir = np.zeros((grid_w, grid_h, 2), dtype=np.float32)
+        self.dir[:, :, 0] = 1.0
+
+        # Flat index offsets of the 4 neighbours in the padded grid
+        self.stride = grid_h + 2
+        self.offsets = np.array([-self.stride, self.stride, -1, 1],
+                                dtype=np.intp)
+        self.dst = None
+
+    def update(self, p_x: float, p_y: float, grid: np.ndarray) -> np.ndarray:
+        """Bring the distance grid and direction field up to date."""
+        dst = (min(max(math.floor(p_x / utils.Utils.WALL_SIZE), 0),
+                   self.grid_w - 1),
+               min(max(math.floor(p_y / utils.Utils.WALL_SIZE), 0),
+                   self.grid_h - 1))
+        changed = np.argwhere(grid != self.grid)
+
+        if dst != self.dst or len(changed) > REPAIR_LIMIT:
+            # A new destination shifts nearly every distance in the room
+            self.grid[:] = grid
+            self.dst = dst
+            self.rebuild()
+        else:
+            for x, y in changed:
+                self.set_cell(int(x), int(y), int(grid[x, y]))
+        return self.dist
+
+    def direction(self, x: int, y: int) -> Vec2:
+        """Direction to follow from the cell (x, y)."""
+        cell = self.dir[x, y]
+        return Vec2(float(cell[0]), float(cell[1]))
+
+    def index(self, x: int, y: int) -> int:
+        """Flat index of the cell (x, y) in the padded arrays."""
+        return (x + 1) * self.stride + y + 1
+
+    def rebuild(self) -> None:
+        self.wavefront()
+        self.refresh_dist(0, self.grid_w, 0, self.grid_h)
+        self.gradient(0, self.grid_w, 0, self.grid_h)
+
+    def set_cell(self, x: int, y: int, value: int) -> None:
+        """Change one grid cell and repair the field around it."""
+        old = int(self.grid[x, y])
+        self.grid[x, y] = value
+        was_open = old not in BLOCKING
+        is_open = value not in BLOCKING
+        if old == value or (was_open and is_open):
+            return
+        if (x, y) == self.dst:
+            self.rebuild()
+            return
+
+        idx = self.index(x, y)
+        if is_open:
+            changed = self.lower(idx)
+        elif was_open:
+            changed = self.raise_(idx)
+            if changed is None:  # too much to repair
+                self.rebuild()
+                return
+        else:  # wall <-> barrel, only the cell itself is affected
+            changed = []
+        changed.append(idx)
+
+        cells = np.array(changed, dtype=np.intp)
+        xs = cells // self.stride - 1
+        ys = cells % self.stride - 1
+        # Barrels next to a changed cell may change too
+        x0, x1 = max(xs.min() - 1, 0), min(xs.max() + 2, self.grid_w)
+        y0, y1 = max(ys.min() - 1, 0), min(ys.max() + 2, self.grid_h)
+        self.refresh_dist(x0, x1, y0, y1)
+        # And so may the direction of every cell next to those
+        self.gradient(max(x0 - 1, 0), min(x1 + 1, self.grid_w),
+                      max(y0 - 1, 0), min(y1 + 1, self.grid_h))
+
+    def wavefront(self) -> None:
+        """BFS from the destination, one array operation per wave."""
+        passable = np.isin(self.pad_grid, BLOCKING, invert=True).ravel()
+        steps = self.pad_steps.ravel()
+        steps.fill(self.unreached)
+
+        frontier = np.array([self.index(*self.dst)], dtype=np.intp)
+        step = 0
+        while frontier.size > 0:
+            steps[frontier] = step
+            nxt = (frontier[:, None] + self.offsets).ravel()
+            nxt = nxt[passable[nxt] & (steps[nxt] == self.unreached)]
+            frontier = np.unique(nxt)
+            step += 1
+
+    def lower(self, idx: int) -> list:
+        """Cell idx was opened: spread the shorter distances through it."""
+        steps = self.pad_steps.ravel()
+        grid = self.pad_grid.ravel()
+        best = min(int(steps[idx + o]) for o in self.offsets)
+        if best >= self.unreached:
+            return []
+
+        steps[idx] = best + 1
+        changed = [idx]
+        frontier = collections.deque(changed)
+        while frontier:
+            cur = frontier.popleft()
+            step = steps[cur] + 1
+            for o in self.offsets:
+                nxt = cur + o
+                if grid[nxt] not in BLOCKING and steps[nxt] > step:
+                    steps[nxt] = step
+                    frontier.append(nxt)
+                    changed.append(nxt)
+        return changed
+
+    def raise_(self, idx: int) -> list:
+        """
+        Cell idx was blocked: find the cells that only reached the
+        destination through it and route them around.
+        Returns None when the affected area is too large to repair.
+        """
+        steps = self.pad_steps.ravel()
+        step = int(steps[idx])
+        if step >= self.unreached:
+            return []
+        steps[idx] = self.unreached
+
+        # Walk outwards level by level, a cell is affected when none of
+        # its one-step-closer neighbours is left unaffected.
+        frontier = collections.deque(
+            idx + o for o in self.offsets if steps[idx + o] == step + 1)
+        seen = set(frontier)
+        affected = set()
+        while frontier:
+            cur = frontier.popleft()
+            step = steps[cur]
+            if any(steps[cur + o] == step - 1 and cur + o not in affected
+                   for o in self.offsets):
+                continue
+            affected.add(cur)
+            if len(affected) > self.repair_area:
+                return None
+            for o in self.offsets:
+                nxt = cur + o
+                if steps[nxt] == step + 1 and nxt not in seen:
+                    seen.add(nxt)
+                    frontier.append(nxt)
+
+        # Re-route the affected cells from their unaffected neighbours
+        for cur in affected:
+            steps[cur] = self.unreached
+        queue = []
+        for cur in affected:
+            best = min(int(steps[cur + o]) for o in self.offsets)
+            if best < self.unreached:
+                queue.append((best + 1, cur))
+        heapq.heapify(queue)
+        while queue:
+            step, cur = heapq.heappop(queue)
+            if step >= steps[cur]:
+                continue
+            steps[cur] = step
+            for o in self.offsets:
+                nxt = cur + o
+                if nxt in affected and steps[nxt] > step + 1:
+                    heapq.heappush(queue, (step + 1, nxt))
+        return list(affected)
+
+    def refresh_dist(self, x0: int, x1: int, y0: int, y1: int) -> None:
+        """Derive the distance grid of the cells [x0, x1) x [y0, y1)."""
+        px0, px1, py0, py1 = x0 + 1, x1 + 1, y0 + 1, y1 + 1
+        reached = self.pad_steps < self.unreached
+        steps = self.pad_steps[px0:px1, py0:py1]
+        dist = np.where(reached[px0:px1, py0:py1], -steps, self.min_dist)
+
+        # Barrels next to a reachable cell are less bad than a wall
+        near = (reached[px0 - 1:px1 - 1, py0:py1]
+                | reached[px0 + 1:px1 + 1, py0:py1]
+                | reached[px0:px1, py0 - 1:py1 - 1]
+                | reached[px0:px1, py0 + 1:py1 + 1])
+        barrel = ((self.pad_grid[px0:px1, py0:py1] == 3) & near
+                  & ~reached[px0:px1, py0:py1])
+        dist[barrel] = self.min_dist // 2
+        self.pad_dist[px0:px1, py0:py1] = dist
+
+    def gradient(self, x0: int, x1: int, y0: int, y1: int) -> None:
+        """Point the cells [x0, x1) x [y0, y1) at their closest neighbour."""
+        shape = (x1 - x0, y1 - y0)
+        best = np.full(shape, self.min_dist, dtype=np.int32)
+        dir_x = np.ones(shape, dtype=np.float32)
+        dir_y = np.zeros(shape, dtype=np.float32)
+
+        for dx, dy in NEIGHBOURS:
+            neighbour = self.pad_dist[1 + x0 + dx:1 + x1 + dx,
+                                      1 + y0 + dy:1 + y1 + dy]
+            closer = neighbour > best
+            best[closer] = neighbour[closer]
+            scale = DIAGONAL if dx != 0 and dy != 0 else 1.0
+            dir_x[closer] = dx * scale
+            dir_y[closer] = dy * scale
+
+        self.dir[x0:x1, y0:y1, 0] = dir_x
+        self.dir[x0:x1, y0:y1, 1] = dir_y
+
+
+class FlowFieldWorker:
+    """
+    FlowField computed on a worker thread.
+    The worker takes a snapshot of the room grid and the player position,
+    and publishes the result into a back buffer. swap() brings it to the
+    front at a frame boundary, so the game loop never waits for a BFS and
+    enemies never read a half written field.
+    With wait, swap() waits for the field requested on the previous frame
+    instead, so the field in use only depends on the frame and runs can be
+    reproduced. The BFS still overlaps the rest of the frame.
+    If computing a field raises, the worker stops and swap() raises the
+    error in the game loop.
+    """
+
+    def __init__(self, grid_w: int, grid_h: int, wait: bool = False) -> None:
+        # Only ever touched by the worker thread
+        self.field = FlowField(grid_w, grid_h)
+
+        # Front buffer, read by EnemyTable.steer
+        self.dir = self.field.dir.copy()
+        self.dist = self.field.dist.copy()
+
+        self.frame = 0  # frames since the worker started
+        self.field_frame = 0  # frame the front buffer was requested in
+        self.stale_frames = 0  # age of the front buffer in frames
+
+        self.wait = wait
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        self.done = threading.Condition(self.lock)
+        self.job = None  # latest request, older ones are dropped
+        self.busy = False  # the worker is computing a field
+        self.back = None  # finished field waiting to be swapped in
+        self.error = None  # raised by the worker, raised again by swap()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def post(self, p_x: float, p_y: float, grid: np.ndarray) -> None:
+        """Request a field towards (p_x, p_y) on a snapshot of the grid."""
+        with self.lock:
+            self.job = (self.frame, p_x, p_y, grid.copy())
+            self.wake.notify()
+
+    def swap(self) -> None:
+        """Start a new frame with the latest finished field, if any."""
+        self.frame += 1
+        with self.lock:
+            while self.wait and self.running and (self.job is not None
+                                                  or self.busy):
+                self.done.wait()
+            if self.error is not None:
+                raise self.error
+            back, self.back = self.back, None
+        if back is not None:
+            self.field_frame, self.dir, self.dist = back
+        self.stale_frames = self.frame - self.field_frame
+
+    def direction(self, x: int, y: int) -> Vec2:
+        """Direction to follow from the cell (x, y)."""
+        cell = self.dir[x, y]
+        return Vec2(float(cell[0]), float(cell[1]))
+
+    def stop(self) -> None:
+        with self.lock:
+            self.running = False
+            self.wake.notify()
+            self.done.notify_all()
+
+    def run(self) -> None:
+        while True:
+            with self.lock:
+                while self.job is None and self.running:
+                    self.wake.wait()
+                if not self.running:
+                    return
+                job, self.job = self.job, None
+                self.busy = True
+
+            result = error = None
+            try:
+                frame, p_x, p_y, grid = job
+                self.field.update(p_x, p_y, grid)
+                result = (frame, self.field.dir.copy(),
+                          self.field.dist.copy())
+            except Exception as e:
+                error = e
+            finally:
+                with self.lock:
+                    if error is None:
+                        self.back = result
+                    else:
+                        self.error = error
+                        self.running = False
+                    self.busy = False
+                    self.done.notify_all()
+            if error is not None:
+                return
@@ -0,0 +1,46 @@
+import arcade
+
+
+class Pool:
+    """
+    Recycles sprites of one class instead of constructing new ones.
+    acquire() hands out a released sprite when there is one, and reset()
+    sets it up again. A pooled sprite goes back to its pool by itself when
+    it is removed from its sprite lists.
+    """
+
+    def __init__(self, sprite_class: type) -> None:
+        self.sprite_class = sprite_class
+        self.free = []
+
+    def acquire(self, *args) -> arcade.Sprite:
+        if len(self.free) > 0:
+            sprite = self.free.pop()
+        else:
+            sprite = self.sprite_class()
+            sprite.pool = self
+        sprite.in_pool = False
+        sprite.reset(*args)
+        return sprite
+
+    def release(self, sprite: arcade.Sprite) -> None:
+        if sprite.in_pool:
+            return
+        sprite.in_pool = True
+        self.free.append(sprite)
+
+
+class Pooled:
+    """Mixin for sprites handed out by a Pool."""
+
+    pool = None
+    in_pool = False
+
+    def reset(self) -> None:
+        """Set the sprite up as if it was just constructed."""
+        pass
+
+    def remove_from_sprite_lists(self) -> None:
+        super().remove_from_sprite_lists()
+        if self.pool is not None:
+            self.pool.release(self)
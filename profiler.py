@@ -0,0 +1,183 @@
+import json
+import time
+import arcade
+import numpy as np
+import pyglet
+import render
+import utils
+from collections import deque
+from PIL import Image
+
+HISTORY = 240  # frames kept for the graph
+MAX_PHASES = 48
+MAX_EVENTS = 200000  # kept for the trace, the oldest are dropped
+TRACE_PATH = "data/trace.json"
+
+# Graph, in pixels on the GUI camera
+GRAPH_HEIGHT = 160
+BAR_WIDTH = 2
+MS_HEIGHT = GRAPH_HEIGHT / 33.3  # two 60 Hz frames fill the graph
+LEGEND_LINES = 8
+LEGEND_EVERY = 30  # frames between legend updates
+PALETTE = np.array([(230, 25, 75), (60, 180, 75), (255, 225, 25),
+                    (0, 130, 200), (245, 130, 48), (145, 30, 180),
+                    (70, 240, 240), (240, 50, 230), (210, 245, 60),
+                    (250, 190, 212), (0, 128, 128), (220, 190, 255),
+                    (170, 110, 40), (128, 0, 0), (170, 255, 195),
+                    (128, 128, 0)], dtype="f4") / 255
+
+
+class Profiler:
+    """
+    Times the phases of the game loop while enabled: whatever is run
+    through call() or a method wrapped by wrap(). A phase is named
+    "category.phase", such as "tick.physics" or "draw.enemies".
+    The time of each phase per frame is kept for the last HISTORY frames
+    and drawn as a stacked bar graph, every timed call is kept for a
+    Chrome trace (chrome://tracing, Perfetto) written by export().
+    Disabled, a phase costs a single flag check.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.names = []  # phase of each column
+        self.columns = {}  # phase -> column
+        self.current = np.zeros(MAX_PHASES)  # ms of this frame per phase
+        self.history = np.zeros((HISTORY, MAX_PHASES))
+        self.frame = 0  # frames recorded
+        self.events = deque(maxlen=MAX_EVENTS)  # (phase, start, duration)
+        self.origin = time.perf_counter_ns()
+
+        # Drawing, set up on the first draw
+        self.batch = None
+        self.legend_batch = None
+        self.legend = []
+
+    def toggle(self) -> None:
+        self.enabled = not self.enabled
+
+    def record(self, phase: str, start: int, end: int) -> None:
+        """Add a timed call of phase, from start to end in ns."""
+        column = self.columns.get(phase)
+        if column is None:
+            if len(self.names) == MAX_PHASES:
+                return
+            column = len(self.names)
+            self.columns[phase] = column
+            self.names.append(phase)
+        self.current[column] += (end - start) / 1e6
+        self.events.append((phase, start, end - start))
+
+    def call(self, phase: str, method, *args):
+        """Call method with args, timed as phase."""
+        if not self.enabled:
+            return method(*args)
+        start = time.perf_counter_ns()
+        result = method(*args)
+        self.record(phase, start, time.perf_counter_ns())
+        return result
+
+    def wrap(self, phase: str, method):
+        """method timed as phase, such as for Simulation.instrument."""
+        def timed(*args, **kwargs):
+            if not self.enabled:
+                return method(*args, **kwargs)
+            start = time.perf_counter_ns()
+            result = method(*args, **kwargs)
+            self.record(phase, start, time.perf_counter_ns())
+            return result
+        return timed
+
+    def next_frame(self) -> None:
+        """Close the frame, its phase times go into the history."""
+        if not self.enabled:
+            return
+        self.history[self.frame % HISTORY] = self.current
+        self.current[:] = 0
+        self.frame += 1
+
+    def clear(self) -> None:
+        self.history[:] = 0
+        self.current[:] = 0
+        self.frame = 0
+        self.events.clear()
+
+    def export(self, path: str = TRACE_PATH) -> None:
+        """Write the timed calls as Chrome trace events, times in us."""
+        events = [{"name": phase, "cat": phase.split(".")[0], "ph": "X",
+                   "ts": (start - self.origin) / 1000,
+                   "dur": duration / 1000, "pid": 0, "tid": 0}
+                  for phase, start, duration in self.events]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events,
+                       "displayTimeUnit": "ms"}, file)
+
+    def frames(self) -> np.ndarray:
+        """The recorded history, oldest frame first."""
+        n = min(self.frame, HISTORY)
+        start = self.frame % HISTORY if self.frame > HISTORY else 0
+        return np.roll(self.history, -start, axis=0)[:n, :len(self.names)]
+
+    def update_legend(self, x: float, y: float, frames: np.ndarray) -> None:
+        """The slowest phases on average, in their graph color."""
+        for text in self.legend:
+            text.delete()
+        self.legend = []
+        mean = frames.mean(axis=0)
+        total = frames.sum(axis=1).mean()
+        lines = [f"frame {total:.2f} ms"]
+        colors = [utils.Color.WHITE]
+        for column in np.argsort(-mean)[:LEGEND_LINES]:
+            lines.append(f"{self.names[column]} {mean[column]:.2f} ms")
+            colors.append(tuple(
+                int(c * 255) for c in PALETTE[column % len(PALETTE)]))
+        for i, (line, color) in enumerate(zip(lines, colors)):
+            self.legend.append(pyglet.text.Label(
+                line, font_name="Cubic 11", font_size=10, x=x, y=y - i * 14,
+                color=color + (255,), batch=self.legend_batch))
+
+    def draw(self, x: float, y: float) -> None:
+        """Draw the graph with its bottom left corner at (x, y)."""
+        if not self.enabled or self.frame == 0:
+            return
+        if self.batch is None:
+            sheet = render.TextureSheet(arcade.get_window().ctx, {
+                0: Image.new("RGBA", (1, 1), (255, 255, 255, 255))})
+            self.batch = render.QuadBatch(sheet)
+            self.legend_batch = pyglet.graphics.Batch()
+        frames = self.frames()
+        n, phases = frames.shape
+
+        count = n * phases + 2
+        self.batch.reserve(count)
+        data = self.batch.data[:count]
+        data["angle"] = 0
+        data["uv"] = self.batch.sheet.uv[0]
+
+        # Background, and the line of a 60 Hz frame over the bars
+        width = HISTORY * BAR_WIDTH
+        data["pos"][0] = x + width / 2, y + GRAPH_HEIGHT / 2
+        data["size"][0] = width, GRAPH_HEIGHT
+        data["color"][0] = 0, 0, 0, 0.5
+        data["pos"][-1] = x + width / 2, y + MS_HEIGHT * 1000 / 60
+        data["size"][-1] = width, 1
+        data["color"][-1] = 1, 1, 1, 0.8
+
+        # One quad per phase per frame, stacked from the bottom
+        heights = frames * MS_HEIGHT
+        bottoms = np.cumsum(heights, axis=1) - heights
+        bars = data[1:-1]
+        bars["pos"][:, 0] = (x + (np.arange(n)[:, None] + 0.5) * BAR_WIDTH
+                             ).repeat(phases, axis=1).ravel()
+        bars["pos"][:, 1] = (y + bottoms + heights / 2).ravel()
+        bars["size"][:, 0] = BAR_WIDTH
+        bars["size"][:, 1] = heights.ravel()
+        bars["color"][:, :3] = np.tile(
+            PALETTE[np.arange(phases) % len(PALETTE)], (n, 1))
+        bars["color"][:, 3] = 0.9
+        self.batch.draw(count)
+
+        if self.frame % LEGEND_EVERY == 1 or len(self.legend) == 0:
+            self.update_legend(x + width + 10, y + GRAPH_HEIGHT - 10, frames)
+        with arcade.get_window().ctx.pyglet_rendering():
+            self.legend_batch.draw()
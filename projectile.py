@@ -0,0 +1,142 @@
+import arcade
+import numpy as np
+import render
+from pyglet.math import Vec2
+
+
+class BulletKind:
+    """What every bullet of one kind shares: image, hit box and life span."""
+
+    kinds = []  # every kind, indexed by BulletKind.index
+
+    def __init__(self, filename: str, width: int, height: int,
+                 life_span: int = 20) -> None:
+        self.filename = filename
+        self.width = width
+        self.height = height
+        self.life_span = life_span
+        self.index = len(BulletKind.kinds)
+        BulletKind.kinds.append(self)
+
+
+class BulletSystem:
+    """
+    Bullets stored as preallocated NumPy arrays (struct of arrays).
+    All bullets are moved and aged in one step, the dead ones are culled
+    together at the end of the frame, and the arrays are only copied to
+    the GPU to be drawn. Bullet i is alive for i < count.
+    """
+
+    def __init__(self, capacity: int = 256) -> None:
+        self.count = 0
+        self.pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.damage = np.zeros(capacity, dtype=np.int32)
+        self.life_span = np.zeros(capacity, dtype=np.int32)
+        self.kind = np.zeros(capacity, dtype=np.int32)
+        self.alpha = np.zeros(capacity, dtype=np.float32)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+        # Drawing, set up on the first draw
+        self.batch = None
+        self.kind_size = None
+        self.kind_uv = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def reserve(self, count: int) -> None:
+        """Grow the arrays to hold at least count bullets."""
+        capacity = len(self.alive)
+        if count <= capacity:
+            return
+        capacity = max(count, capacity * 2)
+        for name in ("pos", "vel", "damage", "life_span",
+                     "kind", "alpha", "alive"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def spawn(self, kind: BulletKind, x: float, y: float, aim: Vec2,
+              damage: int, life_span: int = None) -> int:
+        """Add a bullet moving by aim every frame, returns its index."""
+        self.reserve(self.count + 1)
+        i = self.count
+        self.pos[i] = x, y
+        self.vel[i] = aim.x, aim.y
+        self.damage[i] = damage
+        self.life_span[i] = kind.life_span if life_span is None else life_span
+        self.kind[i] = kind.index
+        self.alpha[i] = 255
+        self.alive[i] = True
+        self.count += 1
+        return i
+
+    def get_kind(self, i: int) -> BulletKind:
+        return BulletKind.kinds[self.kind[i]]
+
+    def half_size(self, i: int) -> tuple:
+        """Half width and height of the hit box of bullet i."""
+        kind = BulletKind.kinds[self.kind[i]]
+        return kind.width / 2, kind.height / 2
+
+    def update(self) -> None:
+        """Move and age every bullet."""
+        n = self.count
+        self.pos[:n] += self.vel[:n]
+        self.life_span[:n] -= 1
+
+    def kill(self, i: int) -> None:
+        """Mark bullet i dead, it is removed by the next cull()."""
+        self.alive[i] = False
+
+    def cull(self) -> None:
+        """Drop the dead and expired bullets, keeping the others in order."""
+        n = self.count
+        keep = np.flatnonzero(self.alive[:n] & (self.life_span[:n] > 0))
+        n = len(keep)
+        if n == self.count:
+            return
+        for array in (self.pos, self.vel, self.damage, self.life_span,
+                      self.kind, self.alpha, self.alive):
+            array[:n] = array[keep]
+        self.count = n
+
+    def clear(self) -> None:
+        self.count = 0
+
+    def draw(self, box: tuple = None) -> None:
+        """Draw the bullets, only those overlapping box if it is given."""
+        n = self.count
+        if n == 0:
+            return
+        if self.batch is None:
+            kinds = BulletKind.kinds
+            sheet = render.TextureSheet.from_files(
+                arcade.get_window().ctx,
+                sorted({kind.filename for kind in kinds}))
+            self.batch = render.QuadBatch(sheet, len(self.alive))
+            self.kind_size = np.array([sheet.size[kind.filename]
+                                       for kind in kinds], dtype="f4")
+            self.kind_uv = np.array([sheet.uv[kind.filename]
+                                     for kind in kinds], dtype="f4")
+
+        index = slice(0, n)
+        if box is not None:
+            index = np.flatnonzero(render.in_box(
+                self.pos[:n], self.kind_size[self.kind[:n]] / 2, box))
+            n = len(index)
+            if n == 0:
+                return
+
+        self.batch.reserve(n)
+        data = self.batch.data[:n]
+        kind = self.kind[index]
+        data["pos"] = self.pos[index]
+        data["size"] = self.kind_size[kind]
+        data["angle"] = 0
+        data["uv"] = self.kind_uv[kind]
+        data["color"][:, :3] = 1
+        data["color"][:, 3] = self.alpha[index] / 255
+        self.batch.draw(n)
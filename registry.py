@@ -0,0 +1,113 @@
+from pyglet.math import Vec2
+
+
+class Registry:
+    """
+    Live entities with stable integer ids, stored densely in a list.
+    Removing an entity moves the last one into its slot, so it is O(1).
+    kill() only marks an entity dead: the dead stay in place, skipped by
+    whoever checks entity.alive, until flush() removes them all at once in
+    the removal phase of the frame.
+    """
+
+    def __init__(self) -> None:
+        self.next_id = 0
+        self.entities = []  # live (and not yet flushed) entities
+        self.slots = {}  # id -> index in entities
+        self.dead = []
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def __iter__(self):
+        return iter(self.entities)
+
+    def add(self, entity) -> int:
+        """Register an entity, returns its id."""
+        entity.eid = self.next_id
+        entity.alive = True
+        self.next_id += 1
+        self.slots[entity.eid] = len(self.entities)
+        self.entities.append(entity)
+        return entity.eid
+
+    def get(self, eid: int):
+        """Entity of an id, None if it was removed."""
+        slot = self.slots.get(eid)
+        if slot is None:
+            return None
+        return self.entities[slot]
+
+    def kill(self, entity) -> bool:
+        """Mark an entity dead, False if it already was."""
+        if not entity.alive:
+            return False
+        entity.alive = False
+        self.dead.append(entity)
+        return True
+
+    def flush(self) -> list:
+        """Remove the entities killed since the last flush and return them."""
+        dead = self.dead
+        self.dead = []
+        for entity in dead:
+            slot = self.slots.pop(entity.eid)
+            self.detach(entity, slot)
+            last = self.entities.pop()
+            if last is not entity:
+                self.entities[slot] = last
+                self.slots[last.eid] = slot
+                self.move(len(self.entities), slot)
+        return dead
+
+    def detach(self, entity, slot: int) -> None:
+        """Called when entity leaves slot, for subclasses."""
+
+    def move(self, src: int, dst: int) -> None:
+        """Called when the entity in slot src moves to dst, for subclasses."""
+
+    def clear(self) -> None:
+        for slot, entity in enumerate(self.entities):
+            self.detach(entity, slot)
+        self.entities.clear()
+        self.slots.clear()
+        self.dead.clear()
+
+
+class Column:
+    """
+    Attribute of an entity that lives in the column of the same name of
+    its table (entity.table, a Registry holding NumPy arrays) while the
+    entity is in one, and on the entity otherwise. Columns of width 2 are
+    read as a Vec2.
+    """
+
+    def __init__(self, width: int = 1) -> None:
+        self.width = width
+
+    def __set_name__(self, owner, name: str) -> None:
+        self.name = name
+        self.private = "_" + name
+
+    def __get__(self, entity, owner=None):
+        if entity is None:
+            return self
+        table = entity.__dict__.get("table")
+        if table is None:
+            try:
+                return entity.__dict__[self.private]
+            except KeyError:
+                raise AttributeError(self.name) from None
+        value = getattr(table, self.name)[table.slots[entity.eid]]
+        if self.width == 2:
+            return Vec2(float(value[0]), float(value[1]))
+        return value.item()
+
+    def __set__(self, entity, value) -> None:
+        table = entity.__dict__.get("table")
+        if table is None:
+            entity.__dict__[self.private] = value
+            return
+        if self.width == 2:
+            value = value.x, value.y
+        getattr(table, self.name)[table.slots[entity.eid]] = value
@@ -0,0 +1,287 @@
+import arcade
+import numpy as np
+from contextlib import contextmanager
+import textures
+from arcade.gl import BufferDescription, geometry
+from PIL import Image
+
+VERTEX_SHADER = """
+#version 330
+
+uniform Projection {
+    uniform mat4 matrix;
+} proj;
+
+in vec2 in_vert;
+in vec2 in_pos;
+in vec2 in_size;
+in float in_angle;
+in vec4 in_uv;
+in vec4 in_color;
+
+out vec2 v_uv;
+out vec4 v_color;
+
+void main() {
+    float angle = radians(in_angle);
+    mat2 rotate = mat2(cos(angle), sin(angle), -sin(angle), cos(angle));
+    vec2 pos = in_pos + rotate * (in_vert * in_size);
+    gl_Position = proj.matrix * vec4(pos, 0.0, 1.0);
+    // Image rows are stored top first
+    v_uv = in_uv.xy + vec2(in_vert.x + 0.5, 0.5 - in_vert.y) * in_uv.zw;
+    v_color = in_color;
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 330
+
+uniform sampler2D sheet;
+
+in vec2 v_uv;
+in vec4 v_color;
+
+out vec4 f_color;
+
+void main() {
+    vec4 color = texture(sheet, v_uv) * v_color;
+    if (color.a == 0.0) {
+        discard;
+    }
+    f_color = color;
+}
+"""
+
+# One quad instance: centre, size, angle (degrees), uv rect, RGBA in 0-1
+INSTANCE = np.dtype([
+    ("pos", "f4", 2),
+    ("size", "f4", 2),
+    ("angle", "f4"),
+    ("uv", "f4", 4),
+    ("color", "f4", 4),
+])
+
+SHEET_WIDTH = 2048
+
+# Layer texture drawn over the world with the camera projection
+LAYER_VERTEX_SHADER = """
+#version 330
+
+uniform Projection {
+    uniform mat4 matrix;
+} proj;
+
+in vec2 in_vert;
+in vec2 in_uv;
+
+out vec2 v_uv;
+
+void main() {
+    gl_Position = proj.matrix * vec4(in_vert, 0.0, 1.0);
+    v_uv = in_uv;
+}
+"""
+
+LAYER_FRAGMENT_SHADER = """
+#version 330
+
+uniform sampler2D layer;
+
+in vec2 v_uv;
+
+out vec4 f_color;
+
+void main() {
+    f_color = texture(layer, v_uv);
+}
+"""
+
+
+class TextureSheet:
+    """
+    Images packed into one GL texture, so that everything drawn from it
+    takes a single draw call. Images are looked up by key.
+    """
+
+    def __init__(self, ctx: arcade.ArcadeContext, images: dict) -> None:
+        # Shelf packing: fill rows left to right, tallest images first
+        width = max([SHEET_WIDTH] + [image.width for image in images.values()])
+        places = {}
+        x = y = shelf = 0
+        for key in sorted(images, key=lambda key: -images[key].height):
+            image = images[key]
+            if x + image.width > width:
+                x = 0
+                y += shelf + 1
+                shelf = 0
+            places[key] = (x, y)
+            x += image.width + 1
+            shelf = max(shelf, image.height)
+        height = y + shelf
+
+        sheet = Image.new("RGBA", (width, max(height, 1)))
+        self.uv = {}
+        self.size = {}
+        for key, (x, y) in places.items():
+            image = images[key]
+            sheet.paste(image, (x, y))
+            self.uv[key] = (x / sheet.width, y / sheet.height,
+                            image.width / sheet.width,
+                            image.height / sheet.height)
+            self.size[key] = image.size
+
+        self.texture = ctx.texture(sheet.size, components=4,
+                                   data=sheet.tobytes())
+        self.texture.filter = ctx.NEAREST, ctx.NEAREST
+
+    @staticmethod
+    def from_files(ctx: arcade.ArcadeContext, files: list) -> "TextureSheet":
+        """Sheet of image files from the texture registry, keyed by path."""
+        images = {name: textures.Textures.get(name).image.convert("RGBA")
+                  for name in files}
+        return TextureSheet(ctx, images)
+
+
+class QuadBatch:
+    """
+    Textured quads drawn as instances in one call.
+    Fill data[:count] (a NumPy array of INSTANCE) and call draw(count),
+    the array is copied to the GPU buffer only then.
+    """
+
+    def __init__(self, sheet: TextureSheet, capacity: int = 256) -> None:
+        self.ctx = arcade.get_window().ctx
+        self.sheet = sheet
+        self.data = np.zeros(capacity, dtype=INSTANCE)
+
+        self.program = self.ctx.program(vertex_shader=VERTEX_SHADER,
+                                        fragment_shader=FRAGMENT_SHADER)
+        self.program["sheet"] = 0
+        corners = np.array([-0.5, -0.5, 0.5, -0.5, -0.5, 0.5, 0.5, 0.5],
+                           dtype="f4")
+        self.quad = self.ctx.buffer(data=corners.tobytes())
+        self.instances = self.ctx.buffer(reserve=self.data.nbytes)
+        self.geometry = self.ctx.geometry(
+            [
+                BufferDescription(self.quad, "2f", ["in_vert"]),
+                BufferDescription(self.instances, "2f 2f 1f 4f 4f",
+                                  ["in_pos", "in_size", "in_angle",
+                                   "in_uv", "in_color"],
+                                  instanced=True),
+            ],
+            mode=self.ctx.TRIANGLE_STRIP,
+        )
+
+    def reserve(self, count: int) -> None:
+        """Make room for at least count instances, keeping the data."""
+        if count <= len(self.data):
+            return
+        data = np.zeros(max(count, len(self.data) * 2), dtype=INSTANCE)
+        data[:len(self.data)] = self.data
+        self.data = data
+        self.instances.orphan(self.data.nbytes)
+
+    def draw(self, count: int) -> None:
+        if count == 0:
+            return
+        self.instances.write(self.data[:count].tobytes())
+        self.sheet.texture.use(0)
+        self.ctx.enable(self.ctx.BLEND)
+        self.geometry.render(self.program, instances=count)
+
+
+def in_box(pos: np.ndarray, half_size: np.ndarray, box: tuple) -> np.ndarray:
+    """
+    Mask of the quads (centres pos, half sizes half_size) overlapping the
+    world box (left, right, bottom, top).
+    """
+    left, right, bottom, top = box
+    return ((pos[:, 0] + half_size[:, 0] >= left)
+            & (pos[:, 0] - half_size[:, 0] <= right)
+            & (pos[:, 1] + half_size[:, 1] >= bottom)
+            & (pos[:, 1] - half_size[:, 1] <= top))
+
+
+class CulledSprites:
+    """
+    Sprite list holding only the sprites shown this frame. Sprites are
+    appended when they come into view and removed when they leave it, so
+    drawing it only draws and uploads what is on screen.
+    """
+
+    def __init__(self) -> None:
+        self.sprite_list = arcade.SpriteList()
+        self.shown = {}
+
+    def show(self, sprites) -> None:
+        """Hold exactly the given sprites, in their order of arrival."""
+        shown = dict.fromkeys(sprites)
+        for sprite in self.shown:
+            # Sprites removed from every list are already gone from this one
+            if sprite not in shown and self.sprite_list in sprite.sprite_lists:
+                self.sprite_list.remove(sprite)
+        for sprite in shown:
+            if self.sprite_list not in sprite.sprite_lists:
+                self.sprite_list.append(sprite)
+        self.shown = shown
+
+    def draw(self) -> None:
+        self.sprite_list.draw()
+
+
+class Layer:
+    """
+    Off-screen texture covering the world from (0, 0) to (width, height).
+    Whatever is drawn inside activate() lands on it in world coordinates,
+    and draw() puts it back with the current camera as a single quad.
+    The color is kept premultiplied by alpha, so transparent parts of the
+    layer blend like the sprites drawn into it would have.
+    """
+
+    def __init__(self, width: int, height: int, dtype: str = "f1") -> None:
+        self.ctx = arcade.get_window().ctx
+        self.width = int(width)
+        self.height = int(height)
+        self.texture = self.ctx.texture((self.width, self.height),
+                                        components=4, dtype=dtype)
+        self.texture.filter = self.ctx.NEAREST, self.ctx.NEAREST
+        self.fbo = self.ctx.framebuffer(color_attachments=[self.texture])
+        self.fbo.clear()
+
+        # Blending into the layer: straight alpha in, premultiplied out
+        self.blend = (self.ctx.SRC_ALPHA, self.ctx.ONE_MINUS_SRC_ALPHA,
+                      self.ctx.ONE, self.ctx.ONE_MINUS_SRC_ALPHA)
+
+        self.program = self.ctx.program(vertex_shader=LAYER_VERTEX_SHADER,
+                                        fragment_shader=LAYER_FRAGMENT_SHADER)
+        self.program["layer"] = 0
+        self.quad = geometry.quad_2d(size=(self.width, self.height),
+                                     pos=(self.width / 2, self.height / 2))
+
+    @contextmanager
+    def activate(self):
+        """Draw into the layer, in world coordinates."""
+        projection = self.ctx.projection_2d_matrix
+        with self.fbo.activate():
+            self.ctx.projection_2d = 0, self.width, 0, self.height
+            self.ctx.enable(self.ctx.BLEND)
+            self.ctx.blend_func = self.blend
+            try:
+                yield self
+            finally:
+                self.ctx.blend_func = self.ctx.BLEND_DEFAULT
+                self.ctx.projection_2d_matrix = projection
+
+    def clear(self, color: tuple = (0, 0, 0, 0)) -> None:
+        self.fbo.clear(color)
+
+    def draw(self) -> None:
+        """
+        Draw the layer with the current camera, only the part in the
+        viewport is rasterized.
+        """
+        self.texture.use(0)
+        self.ctx.enable(self.ctx.BLEND)
+        self.ctx.blend_func = self.ctx.ONE, self.ctx.ONE_MINUS_SRC_ALPHA
+        self.quad.render(self.program)
+        self.ctx.blend_func = self.ctx.BLEND_DEFAULT
@@ -0,0 +1,232 @@
+import sys
+import time
+import struct
+import character
+import profiler
+import room
+import simulation
+
+REPLAY_PATH = "data/replay.bin"  # the last game played
+MAGIC = b"BH2R"
+VERSION = 1
+
+# Input of the player read by a tick, one bit each
+FLAGS = ("move_up", "move_down", "move_left", "move_right", "is_attack",
+         "change_weapon_left", "change_weapon_right")
+# What follows the flags of a record
+SKILL = 1 << 8  # the skill is used
+MOUSE = 1 << 9  # the mouse moved: x, y as doubles
+EVENTS = 1 << 10  # shop actions: a count, then (action, index) bytes
+REPEAT = 1 << 11  # the same flags for a count of more ticks
+EXTRAS = SKILL | MOUSE | EVENTS
+MAX_REPEAT = 0xFFFF
+
+HEADER = struct.Struct("<4sHQ")  # magic, version, seed
+WORD = struct.Struct("<H")
+MOUSE_POS = struct.Struct("<dd")
+EVENT = struct.Struct("<BB")
+
+
+def write_name(file, name: str) -> None:
+    data = name.encode()
+    file.write(struct.pack("<B", len(data)) + data)
+
+
+class Recorder(simulation.Observer):
+    """
+    Writes the input of the player to a log as a simulation runs, one
+    record per tick. The log starts with the seed, the player class and
+    the room class of the run, which is all Replay needs to play it again.
+    Ticks that change nothing but the flags of the last one are only
+    counted, so a log grows by a few bytes a second.
+    """
+
+    def __init__(self, sim: simulation.Simulation,
+                 path: str = REPLAY_PATH) -> None:
+        self.sim = sim
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, sim.rng.seed))
+        write_name(self.file, type(sim.player).__name__)
+        write_name(self.file, type(sim.room).__name__)
+
+        self.mouse = None  # last mouse position written
+        self.events = []  # shop actions since the last tick
+        self.word = None  # flags of the last record, None if it had extras
+        self.repeat = 0  # ticks with these flags not written yet
+
+    def on_shop(self, action: int, index: int) -> None:
+        self.events.append((action, index))
+
+    def on_tick(self) -> None:
+        player = self.sim.player
+        word = 0
+        for bit, name in enumerate(FLAGS):
+            if getattr(player, name):
+                word |= 1 << bit
+        if self.sim.skill:
+            word |= SKILL
+        mouse = (self.sim.mouse_pos.x, self.sim.mouse_pos.y)
+        if mouse != self.mouse:
+            word |= MOUSE
+        if len(self.events) > 0:
+            word |= EVENTS
+
+        if word == self.word and self.repeat < MAX_REPEAT:
+            self.repeat += 1
+            return
+        self.write_repeat()
+
+        data = WORD.pack(word)
+        if word & MOUSE:
+            data += MOUSE_POS.pack(*mouse)
+            self.mouse = mouse
+        if word & EVENTS:
+            data += struct.pack("<B", len(self.events))
+            data += b"".join(EVENT.pack(*event) for event in self.events)
+            self.events.clear()
+        self.file.write(data)
+        self.word = None if word & EXTRAS else word
+
+    def write_repeat(self) -> None:
+        if self.repeat > 0:
+            self.file.write(WORD.pack(self.word | REPEAT)
+                            + WORD.pack(self.repeat))
+            self.repeat = 0
+
+    def flush(self) -> None:
+        if self.file.closed:
+            return
+        self.write_repeat()
+        self.file.flush()
+
+    def close(self) -> None:
+        if self.file.closed:
+            return
+        self.write_repeat()
+        self.file.close()
+
+    def on_round_start(self, round: int) -> None:
+        self.flush()
+
+    def on_game_win(self) -> None:
+        self.flush()
+
+    def on_game_over(self) -> None:
+        self.flush()
+
+    def on_stop(self) -> None:
+        self.close()
+
+
+class Replay:
+    """
+    A log written by a Recorder, played back by a headless simulation as
+    fast as it runs. With the same seed and the same input, the game goes
+    exactly as it did.
+    """
+
+    def __init__(self, path: str = REPLAY_PATH) -> None:
+        with open(path, "rb") as file:
+            self.data = file.read()
+        magic, version, self.seed = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} replay")
+        self.offset = HEADER.size
+        self.player = getattr(character, self.read_name())
+        self.map = getattr(room, self.read_name())
+        self.start = self.offset
+
+    def read_name(self) -> str:
+        size = self.data[self.offset]
+        name = self.data[self.offset + 1:self.offset + 1 + size].decode()
+        self.offset += 1 + size
+        return name
+
+    def read(self, fmt: struct.Struct) -> tuple:
+        values = fmt.unpack_from(self.data, self.offset)
+        self.offset += fmt.size
+        return values
+
+    def records(self):
+        """The input of each tick, as (word, mouse or None, events)."""
+        self.offset = self.start
+        while self.offset < len(self.data):
+            word, = self.read(WORD)
+            if word & REPEAT:
+                count, = self.read(WORD)
+                for _ in range(count):
+                    yield word & ~REPEAT, None, ()
+                continue
+            mouse = self.read(MOUSE_POS) if word & MOUSE else None
+            events = ()
+            if word & EVENTS:
+                count = self.data[self.offset]
+                self.offset += 1
+                events = [self.read(EVENT) for _ in range(count)]
+            yield word, mouse, events
+
+    def play(self, observers: list = (), ticks: int = None,
+             profile: profiler.Profiler = None) -> simulation.Simulation:
+        """
+        Run the replay (at most ticks of it) in a new simulation told to
+        observers, returns the simulation once stopped. With profile, the
+        phases of each tick are timed, a tick per frame.
+        """
+        sim = simulation.Simulation(self.player, self.map, self.seed)
+        sim.observers.extend(observers)
+        if profile is not None:
+            sim.instrument(
+                lambda phase, method: profile.wrap("tick." + phase, method))
+        shop = {
+            simulation.SHOP_OPEN: lambda index: sim.open_shop(),
+            simulation.SHOP_REFRESH: lambda index: sim.refresh_shop(),
+            simulation.SHOP_BUY: sim.buy_item,
+            simulation.SHOP_CLOSE: lambda index: sim.close_shop(),
+        }
+        for done, (word, mouse, events) in enumerate(self.records()):
+            if ticks is not None and done >= ticks:
+                break
+            # In the order they were done in: the shop between two ticks,
+            # then the input read by the next one
+            for action, index in events:
+                shop[action](index)
+            for bit, name in enumerate(FLAGS):
+                setattr(sim.player, name, bool(word & (1 << bit)))
+            if mouse is not None:
+                sim.mouse_pos.x, sim.mouse_pos.y = mouse
+            if word & SKILL:
+                sim.use_skill()
+            sim.tick()
+            if profile is not None:
+                profile.next_frame()
+        sim.stop()
+        return sim
+
+
+def main():
+    """
+    Play a replay headless: python replay.py [path] [trace path]
+    With a trace path, the ticks are profiled into a Chrome trace.
+    """
+
+    path = sys.argv[1] if len(sys.argv) > 1 else REPLAY_PATH
+    profile = None
+    if len(sys.argv) > 2:
+        profile = profiler.Profiler()
+        profile.enabled = True
+    replay = Replay(path)
+    start = time.perf_counter()
+    sim = replay.play(profile=profile)
+    elapsed = time.perf_counter() - start
+    print(f"{replay.player.__name__} in {replay.map.__name__}, "
+          f"seed {replay.seed}")
+    print(f"{sim.ticks} ticks in {elapsed:.2f}s "
+          f"({sim.ticks / max(elapsed, 1e-9):.0f} ticks/s)")
+    print(f"round {sim.round}, score {sim.score}, "
+          f"health {sim.player.health}")
+    if profile is not None:
+        profile.export(sys.argv[2])
+
+
+if __name__ == "__main__":
+    main()
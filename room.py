@@ -1,6 +1,9 @@
 import arcade
 import math
+import numpy as np
 import utils
+import textures
+import render
 from pyglet.math import Vec2
 
 WALL_SIZE = 30
@@ -30,13 +33,14 @@ class WallCorner(Wall):
 
     def __init__(self, x: float = 0, y: float = 0) -> None:
         super().__init__(x, y)
-        self.texture = arcade.load_texture("graphics/room/WallCorner.png")
+        self.texture = textures.Textures.get("graphics/room/WallCorner.png")
         self.shadow = arcade.Sprite(
             center_x=self.pos.x - 3,
             center_y=self.pos.y - 3,
             scale=1,
         )
-        self.shadow.texture = arcade.make_soft_square_texture(
+        self.shadow.texture = textures.Textures.make(
+            arcade.make_soft_square_texture,
             30, utils.Color.LIGHT_BLACK, 150, 150)
 
 
@@ -45,14 +49,15 @@ class WallSideHorizontal(Wall):
 
     def __init__(self, x: float = 0, y: float = 0) -> None:
         super().__init__(x, y)
-        self.texture = arcade.load_texture("graphics/room/WallSide.png")
+        self.texture = textures.Textures.get("graphics/room/WallSide.png")
         self.shadow = arcade.Sprite(
             center_x=self.pos.x,
             center_y=self.pos.y - 3,
             scale=1,
         )
-        self.shadow.texture = arcade.make_soft_square_texture(
-            30,  utils.Color.LIGHT_BLACK, 150, 150)
+        self.shadow.texture = textures.Textures.make(
+            arcade.make_soft_square_texture,
+            30, utils.Color.LIGHT_BLACK, 150, 150)
 
 
 class WallSideVertical(Wall):
@@ -60,14 +65,15 @@ class WallSideVertical(Wall):
 
     def __init__(self, x: float = 0, y: float = 0) -> None:
         super().__init__(x, y)
-        self.texture = arcade.load_texture("graphics/room/WallSide.png")
+        self.texture = textures.Textures.get("graphics/room/WallSide.png")
         self.angle = -90
         self.shadow = arcade.Sprite(
             center_x=self.pos.x - 3,
             center_y=self.pos.y,
             scale=1,
         )
-        self.shadow.texture = arcade.make_soft_square_texture(
+        self.shadow.texture = textures.Textures.make(
+            arcade.make_soft_square_texture,
             30, utils.Color.LIGHT_BLACK, 150, 150)
 
 
@@ -82,34 +88,90 @@ class Room:
 
         self.grid_w = int(self.width / WALL_SIZE)
         self.grid_h = int(self.height / WALL_SIZE)
-        self.grid = {(i, j): 0 for i in range(self.grid_w)
-                     for j in range(self.grid_h)}
+        self.grid = np.zeros((self.grid_w, self.grid_h), dtype=np.int8)
 
         self.spawn_pos = []
-        self.walls = arcade.SpriteList()
-        self.shadows = arcade.SpriteList()
+        # Lazy sprite lists make no OpenGL objects until drawn, so rooms
+        # can be made without a window by the simulation
+        self.walls = arcade.SpriteList(lazy=True)
+        self.shadows = arcade.SpriteList(lazy=True)
+
+        # Ground, shadows and walls never change, they are drawn once into
+        # layers and drawn again for the window size they were made for
+        self.ground_layer = None
+        self.wall_layer = None
+        self.layer_size = None
 
     def set_up_shadow(self) -> None:
         for wall in self.walls:
             self.shadows.append(wall.shadow)
 
+    def update_layers(self) -> None:
+        """Draw the room into its layers, again if the resolution changed."""
+        size = arcade.get_window().get_size()
+        if self.layer_size == size:
+            return
+        self.layer_size = size
+
+        if self.ground_layer is None:
+            self.ground_layer = render.Layer(self.width, self.height)
+            self.wall_layer = render.Layer(self.width, self.height)
+        self.ground_layer.clear(utils.Color.GROUND_WHITE + (255,))
+        self.wall_layer.clear()
+        with self.wall_layer.activate() as layer:
+            self.shadows.draw(blend_function=layer.blend)
+            self.walls.draw(blend_function=layer.blend)
+
     def draw_ground(self) -> None:
-        arcade.draw_rectangle_filled(
-            self.pos.x, self.pos.y, self.width, self.height, utils.Color.GROUND_WHITE
-        )
+        self.update_layers()
+        self.ground_layer.draw()
 
     def draw_walls(self) -> None:
-        self.shadows.draw()
-        self.walls.draw()
+        self.update_layers()
+        self.wall_layer.draw()
+
+    def in_grid(self, x: int, y: int) -> bool:
+        return 0 <= x < self.grid_w and 0 <= y < self.grid_h
+
+    def is_wall(self, x: int, y: int) -> bool:
+        """Whether the cell (x, y) is a room wall, outside the room counts."""
+        return not self.in_grid(x, y) or self.grid[x, y] == 1
 
     def setup_grid(self) -> None:
         for wall in self.walls:
-            if (wall.grid_idx[0] < self.grid_w and wall.grid_idx[1] < self.grid_h
-                    and wall.grid_idx[0] >= 0 and wall.grid_idx[1] >= 0):
+            if self.in_grid(wall.grid_idx[0], wall.grid_idx[1]):
                 x = wall.grid_idx[0]
                 y = wall.grid_idx[1]
                 self.grid[x, y] = 1
 
+    def sweep_walls(self, x0: float, y0: float, dx: float, dy: float,
+                    half_w: float, half_h: float) -> float:
+        """
+        Fraction of the move of a box from (x0, y0) by (dx, dy) at which it
+        first touches a room wall, math.inf if it does not. Walls fill their
+        whole cell, so only the wall cells under the swept box are tested.
+        """
+        left = min(x0, x0 + dx) - half_w
+        right = max(x0, x0 + dx) + half_w
+        bottom = min(y0, y0 + dy) - half_h
+        top = max(y0, y0 + dy) + half_h
+
+        first = math.inf
+        for x in range(math.floor(left / WALL_SIZE),
+                       math.floor(right / WALL_SIZE) + 1):
+            for y in range(math.floor(bottom / WALL_SIZE),
+                           math.floor(top / WALL_SIZE) + 1):
+                if not self.is_wall(x, y):
+                    continue
+                hit = utils.Utils.sweep_box(x0, y0, dx, dy, half_w, half_h,
+                                            x * WALL_SIZE,
+                                            (x + 1) * WALL_SIZE,
+                                            y * WALL_SIZE,
+                                            (y + 1) * WALL_SIZE)
+                if hit is not None:
+                    first = min(first, hit[0])
+        return first
+
 
 class StartRoom(Room):
     """Room for start menu."""
@@ -118,7 +180,7 @@ class StartRoom(Room):
         super().__init__(width, height)
 
         # Set boundary corner walls
-        self.walls = arcade.SpriteList()
+        self.walls = arcade.SpriteList(lazy=True)
         self.walls.append(WallCorner(HALF_WALL_SIZE, HALF_WALL_SIZE))
         self.walls.append(WallCorner(
             HALF_WALL_SIZE, self.height - HALF_WALL_SIZE))
@@ -142,19 +204,21 @@ class StartRoom(Room):
                 self.width - HALF_WALL_SIZE, HALF_WALL_SIZE + i * WALL_SIZE))
 
         self.set_up_shadow()
+        self.setup_grid()
 
 
 class GameRoom0(Room):
     """Game room No. 0"""
 
-    layout_sprite = arcade.Sprite("graphics/room/GameRoom0.png")
+    layout_sprite = arcade.Sprite(
+        texture=textures.Textures.get("graphics/room/GameRoom0.png"))
     name = "Blank room"
 
     def __init__(self, width: float = 2100, height: float = 1200) -> None:
         super().__init__(width, height)
 
         # Set boundary corner walls
-        self.walls = arcade.SpriteList()
+        self.walls = arcade.SpriteList(lazy=True)
         self.walls.append(WallCorner(HALF_WALL_SIZE, HALF_WALL_SIZE))
         self.walls.append(WallCorner(
             HALF_WALL_SIZE, self.height - HALF_WALL_SIZE))
@@ -221,14 +285,15 @@ class GameRoom0(Room):
 class GameRoom1(Room):
     """Game room No. 1"""
 
-    layout_sprite = arcade.Sprite("graphics/room/GameRoom1.png")
+    layout_sprite = arcade.Sprite(
+        texture=textures.Textures.get("graphics/room/GameRoom1.png"))
     name = "Blank room with a block"
 
     def __init__(self, width: float = 2100, height: float = 1200) -> None:
         super().__init__(width, height)
 
         # Set boundary corner walls
-        self.walls = arcade.SpriteList()
+        self.walls = arcade.SpriteList(lazy=True)
         self.walls.append(WallCorner(HALF_WALL_SIZE, HALF_WALL_SIZE))
         self.walls.append(WallCorner(
             HALF_WALL_SIZE, self.height - HALF_WALL_SIZE))
@@ -301,14 +366,15 @@ class GameRoom1(Room):
 class GameRoom2(Room):
     """Game room No. 2"""
 
-    layout_sprite = arcade.Sprite("graphics/room/GameRoom2.png")
+    layout_sprite = arcade.Sprite(
+        texture=textures.Textures.get("graphics/room/GameRoom2.png"))
     name = "Room sliced horizontally"
 
     def __init__(self, width: float = 2100, height: float = 1200) -> None:
         super().__init__(width, height)
 
         # Set boundary corner walls
-        self.walls = arcade.SpriteList()
+        self.walls = arcade.SpriteList(lazy=True)
         self.walls.append(WallCorner(HALF_WALL_SIZE, HALF_WALL_SIZE))
         self.walls.append(WallCorner(
             HALF_WALL_SIZE, self.height - HALF_WALL_SIZE))
@@ -0,0 +1,992 @@
+import arcade
+import utils
+import character
+import weapon
+import item
+import pathfinding
+import spatial
+import projectile
+import pool
+import math
+import numpy as np
+from pyglet.math import Vec2
+from arcade.pymunk_physics_engine import PymunkPhysicsEngine
+
+# Shop actions, see Observer.on_shop
+SHOP_OPEN = 0
+SHOP_REFRESH = 1
+SHOP_BUY = 2
+SHOP_CLOSE = 3
+
+# What tick() does, in order, as (phase, object attribute of the
+# simulation or "" for itself, method). See Simulation.instrument.
+PHASES = (
+    ("path_finding", "dir_field", "swap"),
+    ("physics", "physics_engine", "step"),
+    ("player", "player", "update"),
+    ("player_attack", "", "update_player_attack"),
+    ("spatial_hash", "", "update_spatial_hash"),
+    ("player_bullets", "", "process_player_bullet"),
+    ("explosions", "", "process_player_explosion"),
+    ("enemy_removal", "", "remove_dead_enemies"),
+    ("level", "", "manage_level"),
+    ("enemy_attack", "", "update_enemy_attack"),
+    ("enemy_bullets", "", "process_enemy_bullet"),
+    ("boss", "", "update_boss"),
+    ("explosion_sprites", "explosions_list", "update"),
+    ("path_finding", "dir_field", "post"),
+)
+
+
+class Observer:
+    """
+    What a Simulation tells the outside about, such as the game view
+    drawing and playing sounds. Every method does nothing by default.
+    """
+
+    def on_blood(self, position: arcade.Point) -> None:
+        pass
+
+    def on_explosion(self, position: arcade.Point) -> None:
+        pass
+
+    def on_weapon_used(self, wp: weapon.Weapon) -> None:
+        pass
+
+    def on_enemy_added(self, enemy: arcade.Sprite) -> None:
+        pass
+
+    def on_enemies_removed(self, dead: list) -> None:
+        pass
+
+    def on_round_start(self, round: int) -> None:
+        pass
+
+    def on_game_win(self) -> None:
+        pass
+
+    def on_game_over(self) -> None:
+        pass
+
+    def on_tick(self) -> None:
+        """A tick starts, the input of the player is set."""
+        pass
+
+    def on_shop(self, action: int, index: int) -> None:
+        """A shop action is asked for, index is the item bought."""
+        pass
+
+    def on_stop(self) -> None:
+        pass
+
+
+class Simulation:
+    """
+    The game itself, without a window: the room, characters, weapons and
+    items, stepped one fixed TICK per tick(). Nothing here draws or plays
+    a sound, the observers are told about what happened instead, so the
+    game can run headless at any speed.
+    Every random number comes from the streams of self.rng, so two
+    simulations with the same seed and the same inputs play the same game.
+    """
+
+    TICK = 1 / 60  # seconds of game time per tick, counters are in ticks
+    MAX_TICKS = 8  # per advance() by default, slower frames lose time
+
+    def __init__(self, player: type, map: type, seed: int = None) -> None:
+        self.observers = []
+
+        # Random streams of the run
+        self.rng = utils.Rng(seed)
+        self.spawn_rng = self.rng.get(utils.Rng.SPAWN)
+        self.luck_rng = self.rng.get(utils.Rng.LUCK)
+        self.weapon_rng = self.rng.get(utils.Rng.WEAPON)
+
+        # Gameplay set up
+        self.round: int = 0
+        self.multiplier: int = 1
+        self.score: int = 0
+        self.money_pool: int = 0
+        self.spawn_cnt: int = -1
+        self.pool_size: int = 0
+        self.counter: int = -250  # 60 ticks = 1s
+        self.total_time = 0
+        self.ticks = 0
+        self.time_left = 0  # game time not ticked yet, see advance()
+        self.last_kill_time = 0
+        self.shop_enabled = False  # Enable if money_pool >= round * 100
+        self.all_item_list = []
+        self.over = False  # won or lost
+
+        # Input of the player, the rest is set on the player itself
+        self.mouse_pos = Vec2(0, 0)  # where the player aims, in the room
+        self.skill = False  # use the skill on the next tick
+
+        # Shop of the current round
+        self.shop_items = []
+        self.refresh_cost = 0
+        self.lang = utils.Language.EN  # of the item descriptions
+
+        # GameObject lists, never drawn as they are
+        # Every enemy, of any type, is in the enemy table
+        self.enemies = character.EnemyTable(
+            rng=self.rng.numpy(utils.Rng.AI))
+        self.player_bullets = projectile.BulletSystem()
+        self.player_object_list = arcade.SpriteList(lazy=True)
+        self.player_mine_list = arcade.SpriteList(lazy=True)
+        self.enemy_bullets = projectile.BulletSystem()
+        self.explosions_list = arcade.SpriteList(lazy=True)
+        self.boss_bullets = projectile.BulletSystem()
+
+        # Explosion sprites are recycled
+        self.explosion_pool = pool.Pool(weapon.Explosion)
+
+        # Create the physics engine
+        damping = 0.01
+        gravity = (0, 0)
+        self.physics_engine = PymunkPhysicsEngine(gravity, damping)
+
+        # Game room setup
+        self.room = map()
+
+        # Collision spatial hashes, walls are looked up in the room grid
+        self.enemy_hash = spatial.SpatialHash(alive=lambda enemy: enemy.alive)
+        self.object_hash = spatial.SpatialHash()
+
+        # Path-finding, each tick uses the field requested on the last one
+        self.dir_field = pathfinding.FlowFieldWorker(self.room.grid_w,
+                                                     self.room.grid_h,
+                                                     wait=True)
+        self.dist_grid = self.dir_field.dist
+
+        # Set up the player
+        self.player = player(
+            float(self.room.width / 2), float(self.room.height / 2), self.physics_engine)
+        self.player.register_mouse_pos(self.mouse_pos)
+
+        # Set up the shop
+        self.shop = item.Shop(self.player, self.rng.get(utils.Rng.LOOT))
+
+        self.physics_engine.add_sprite(
+            self.player,
+            friction=0,
+            moment_of_inertia=PymunkPhysicsEngine.MOMENT_INF,
+            damping=0.001,
+            collision_type="player",
+            elasticity=0.1
+        )
+        self.physics_engine.add_sprite_list(
+            self.room.walls,
+            friction=0,
+            collision_type="wall",
+            body_type=PymunkPhysicsEngine.STATIC,
+        )
+
+    def notify(self, event: str, *args) -> None:
+        """Call the event method of every observer."""
+        for observer in self.observers:
+            getattr(observer, event)(*args)
+
+    def advance(self, delta_time: float, max_ticks: int = MAX_TICKS) -> int:
+        """
+        Tick once per TICK of delta_time, carrying the rest over to the
+        next call, returns the ticks run. At most max_ticks are run, the
+        time left over then is dropped so that a slow machine slows the
+        game down instead of falling further behind.
+        """
+        self.time_left += delta_time
+        ticks = 0
+        while self.time_left >= self.TICK and ticks < max_ticks:
+            self.tick()
+            self.time_left -= self.TICK
+            ticks += 1
+        if ticks == max_ticks:
+            self.time_left = min(self.time_left, self.TICK)
+        return ticks
+
+    def tick(self) -> None:
+        """Step the game by one TICK."""
+        self.notify("on_tick")
+        if self.skill:
+            self.skill = False
+            self.player.use_skill()
+
+        # Swap in the latest path finding field at the tick boundary
+        self.dir_field.swap()
+        self.dist_grid = self.dir_field.dist
+
+        self.physics_engine.step(self.TICK)
+        self.total_time += self.TICK
+        self.ticks += 1
+        self.counter += 1
+
+        # Update player
+        self.player.update()
+        self.update_player_attack()
+        self.update_spatial_hash()
+        self.process_player_bullet()
+        self.process_player_explosion()
+        self.remove_dead_enemies()
+
+        # Update level
+        self.manage_level()
+        self.update_enemy_attack()
+        self.process_enemy_bullet()
+        self.update_boss()
+
+        self.explosions_list.update()
+
+        # Check game over
+        if self.player.health <= 0 and not self.over:
+            self.over = True
+            self.notify("on_game_over")
+
+        # Request the next path finding field from the worker
+        self.dir_field.post(self.player.center_x,
+                            self.player.center_y,
+                            self.room.grid)
+
+    def run(self, ticks: int) -> int:
+        """Tick until the game is over or ticks ran out, returns the ticks."""
+        for done in range(ticks):
+            if self.over:
+                return done
+            self.tick()
+        return ticks
+
+    def stop(self) -> None:
+        """Stop the path finding worker, the simulation is not used again."""
+        self.dir_field.stop()
+        self.notify("on_stop")
+
+    def instrument(self, wrap) -> None:
+        """
+        Replace the method of each of the PHASES by wrap(phase, method),
+        which must call method with the arguments it is called with.
+        """
+        for phase, owner, name in PHASES:
+            obj = getattr(self, owner) if owner else self
+            setattr(obj, name, wrap(phase, getattr(obj, name)))
+
+    def use_skill(self) -> None:
+        self.skill = True
+
+    def open_shop(self, lang=None) -> None:
+        """Pay the money pool to the player and roll the shop items."""
+        self.notify("on_shop", SHOP_OPEN, 0)
+        if lang is not None:
+            self.lang = lang
+        self.pool_size = 110 * self.round + 5 * self.round * self.round
+        self.player.money += self.money_pool
+        self.money_pool = 0
+        self.refresh_cost = self.round * self.round
+
+        # Add items based on the current round
+        self.shop.update_item_list(self.round, self.player)
+        self.shop_items = self.shop.get_items(self.round, self.player,
+                                              self.lang)
+
+    def refresh_shop(self) -> bool:
+        """Roll new shop items, False if the player cannot pay for it."""
+        self.notify("on_shop", SHOP_REFRESH, 0)
+        if self.player.money < self.refresh_cost:
+            return False
+        self.player.money -= self.refresh_cost
+        self.refresh_cost += self.round
+        self.shop_items = self.shop.get_items(self.round, self.player,
+                                              self.lang)
+        return True
+
+    def buy_item(self, index: int) -> bool:
+        """Buy a shop item, False if it cannot be bought."""
+        self.notify("on_shop", SHOP_BUY, index)
+        item = self.shop_items[index]
+        if self.player.money < item.cost:
+            return False
+        if not item.equip(item, self.player):
+            return False
+        self.player.money -= item.cost
+        self.all_item_list.append((int(item.quality), str(item.image_path)))
+        return True
+
+    def close_shop(self) -> None:
+        self.notify("on_shop", SHOP_CLOSE, 0)
+        # Update player weapon reference
+        self.player.change_weapon(0)
+
+    def update_player_attack(self) -> None:
+        if self.player.is_attack:
+            if self.player.cd == self.player.cd_max:
+                self.player.cd = 0
+
+            if self.player.cd == 0 and self.player.energy - self.player.current_weapon.cost >= 0:
+                if self.player.current_weapon.is_gun:
+                    self.player.energy = max(
+                        0, self.player.energy - self.player.current_weapon.cost)
+                    self.player.attack(self.player_bullets)
+                    self.notify("on_weapon_used", self.player.current_weapon)
+                else:
+                    object = self.player.place()
+                    place_point = self.player.pos + \
+                        self.player.current_weapon.aim_pos.normalize().scale(30)
+                    grid_x = math.floor(place_point.x / 30)
+                    grid_y = math.floor(place_point.y / 30)
+
+                    if not self.room.in_grid(grid_x, grid_y):
+                        return
+
+                    if self.room.grid[grid_x, grid_y] == 0:
+                        object.center_x = grid_x * 30 + \
+                            float(utils.Utils.HALF_WALL_SIZE)
+                        object.center_y = grid_y * 30 + \
+                            float(utils.Utils.HALF_WALL_SIZE)
+                        object.grid_idx = (grid_x, grid_y)
+                        if object.object_type != 2:  # not a mine
+                            self.player_object_list.append(object)
+                            self.physics_engine.add_sprite(object,
+                                                           friction=0,
+                                                           collision_type="object",
+                                                           body_type=PymunkPhysicsEngine.STATIC)
+                        else:
+                            self.player_mine_list.append(object)
+
+                        # Differentiate the number from the real wall
+                        self.room.grid[grid_x, grid_y] = 2 + object.object_type
+                        self.notify("on_weapon_used",
+                                    self.player.current_weapon)
+                        # Consume energy only when object is placed
+                        self.player.energy = max(
+                            0, self.player.energy - self.player.current_weapon.cost)
+
+        self.player.cd = min(self.player.cd + 1, self.player.cd_max)
+
+    def update_spatial_hash(self) -> None:
+        # Enemies move every frame and are cheaper to rebuild than to track
+        self.enemy_hash.build([self.enemies])
+        self.object_hash.build([self.player_object_list])
+
+    def sweep_bullet(self, bullets: projectile.BulletSystem, i: int,
+                     target_hash: spatial.SpatialHash = None,
+                     target: arcade.Sprite = None) -> tuple:
+        """
+        Stop bullet i at the first thing it touches along its move this
+        frame, so fast bullets cannot skip over anything. It can hurt the
+        sprites in target_hash, or the single target sprite.
+        Returns the targets and player objects it touches at that moment,
+        and whether it touches a room wall.
+        """
+        x, y = bullets.pos[i]
+        dx, dy = bullets.vel[i]
+        x0, y0 = x - dx, y - dy
+        half_w, half_h = bullets.half_size(i)
+
+        target_hits = []
+        if target_hash is not None:
+            target_hits = target_hash.sweep(x0, y0, dx, dy, half_w, half_h)
+        elif target is not None:
+            hit = utils.Utils.sweep_box(x0, y0, dx, dy, half_w, half_h,
+                                        target.left, target.right,
+                                        target.bottom, target.top)
+            if hit is not None:
+                target_hits.append((hit[0], hit[1], target))
+        object_hits = self.object_hash.sweep(x0, y0, dx, dy, half_w, half_h)
+        first = min([self.room.sweep_walls(x0, y0, dx, dy, half_w, half_h)]
+                    + [hits[0][0] for hits in (target_hits, object_hits)
+                       if len(hits) > 0])
+        if first > 1:
+            return [], [], False
+
+        # Move back to the point of contact
+        bullets.pos[i] = x0 + dx * first, y0 + dy * first
+        targets = [hit[2] for hit in target_hits if hit[0] <= first <= hit[1]]
+        objects = [hit[2] for hit in object_hits if hit[0] <= first <= hit[1]]
+        return targets, objects, len(targets) == 0 and len(objects) == 0
+
+    def process_player_bullet(self) -> None:
+        bullets = self.player_bullets
+        bullets.update()
+        self.player_object_list.update()
+        self.player_mine_list.update()
+
+        # Bullets shot by explosions in this loop start moving next frame
+        for i in range(bullets.count):
+            kind = bullets.get_kind(i)
+            damage = int(bullets.damage[i])
+
+            if kind == weapon.ExplosionSeed:
+                if bullets.life_span[i] <= 0:
+                    self.set_explosion(tuple(bullets.pos[i]))
+                else:
+                    continue
+
+            # Check hit with enemy
+            hit_list, object_list, hit_wall = self.sweep_bullet(
+                bullets, i, target_hash=self.enemy_hash)
+            position = tuple(bullets.pos[i])
+            aim_x, aim_y = bullets.vel[i]
+
+            for enemy in hit_list:
+                enemy.health -= damage
+                self.set_blood(enemy.position)
+                self.player.energy += (damage/10)
+                self.physics_engine.apply_force(
+                    enemy, (aim_x * utils.Utils.BULLET_FORCE, aim_y * utils.Utils.BULLET_FORCE))
+                enemy.get_damage_len = utils.Utils.GET_DAMAGE_LEN
+                if enemy.health <= 0:
+                    self.kill_enemy(enemy)
+
+            if len(hit_list) > 0:
+                if kind == weapon.Missile:
+                    if self.player.is_rocket_multi:
+                        self.set_multi_explosion(position)
+                    else:
+                        self.set_explosion(position)
+                bullets.kill(i)
+                continue
+
+            # Check hit with player objects
+            hit_list = object_list
+
+            for object in hit_list:
+                if object.object_type == 0:  # Wall object
+                    object.health -= damage
+                    if object.health <= 0:
+                        self.room.grid[object.grid_idx[0],
+                                       object.grid_idx[1]] = 0
+                        object.remove_from_sprite_lists()
+                if object.object_type == 1:  # Barrel object
+                    object.health -= damage
+                    if object.health <= 0:
+                        if self.player.is_barrel_multi:
+                            self.set_multi_explosion(object.position)
+                        else:
+                            self.set_explosion(object.position)
+                        self.room.grid[object.grid_idx[0],
+                                       object.grid_idx[1]] = 0
+                        object.remove_from_sprite_lists()
+
+            if len(hit_list) > 0:
+                if kind == weapon.Missile:
+                    if self.player.is_rocket_multi:
+                        self.set_multi_explosion(position)
+                    else:
+                        self.set_explosion(position)
+                bullets.kill(i)
+                continue
+
+            # Check hit with room walls
+            if hit_wall:
+                if kind == weapon.Missile:
+                    if self.player.is_rocket_multi:
+                        self.set_multi_explosion(position)
+                    else:
+                        self.set_explosion(position)
+                bullets.kill(i)
+                continue
+
+            if bullets.life_span[i] <= 0:
+                if kind == weapon.Missile:
+                    if self.player.is_rocket_multi:
+                        self.set_multi_explosion(position)
+                    else:
+                        self.set_explosion(position)
+
+        # Drop the hit and expired bullets at once
+        bullets.cull()
+
+    def process_player_explosion(self) -> None:
+        for explosion in self.explosions_list:
+            if explosion.life_span == 5:
+                hit_list = self.enemy_hash.check_for_collision(explosion)
+
+                for enemy in hit_list:
+                    if isinstance(enemy, character.BossRed):
+                        continue  # explosions do not hurt the boss
+                    enemy.health -= self.player.explosion_damage
+                    self.set_blood(enemy.position)
+                    self.player.energy += (self.player.explosion_damage/10)
+                    aim_x = (enemy.center_x - explosion.center_x) * \
+                        utils.Utils.BULLET_FORCE
+                    aim_y = (enemy.center_y - explosion.center_y) * \
+                        utils.Utils.BULLET_FORCE
+                    self.physics_engine.apply_force(enemy, (aim_x, aim_y))
+                    enemy.get_damage_len = utils.Utils.GET_DAMAGE_LEN
+                    if enemy.health <= 0:
+                        self.kill_enemy(enemy)
+
+                hit_list = self.object_hash.check_for_collision(explosion)
+
+                for object in hit_list:
+                    if object.object_type == 0:  # Wall object
+                        object.health -= self.player.explosion_damage
+                        if object.health <= 0:
+                            self.room.grid[object.grid_idx[0],
+                                           object.grid_idx[1]] = 0
+                            object.remove_from_sprite_lists()
+                    if object.object_type == 1:  # Barrel object
+                        object.health -= self.player.explosion_damage
+                        if object.health <= 0:
+                            if self.player.is_barrel_multi:
+                                self.set_multi_explosion(object.position)
+                            else:
+                                self.set_explosion(object.position)
+                            self.room.grid[object.grid_idx[0],
+                                           object.grid_idx[1]] = 0
+                            object.remove_from_sprite_lists()
+
+    def update_enemy_attack(self) -> None:
+        # Contact with the player, mines and walls, for every enemy type
+        self.check_hit_player()
+        self.check_trigger_mine()
+        self.check_hit_wall()
+
+        # Shooting and dashing, by the attack of each type
+        self.enemies.update_attacks(self.enemy_bullets)
+
+    def process_enemy_bullet(self) -> None:
+        bullets = self.enemy_bullets
+        bullets.update()
+
+        for i in range(bullets.count):
+            damage = int(bullets.damage[i])
+
+            # The player dodges the bullet by luck
+            chance = self.luck_rng.randrange(0, 100)
+            target = self.player if chance >= self.player.luck else None
+            hit_list, object_list, hit_wall = self.sweep_bullet(
+                bullets, i, target=target)
+            aim_x, aim_y = bullets.vel[i]
+
+            # Check hit with player
+            if len(hit_list) > 0:
+                self.player.get_damage(damage)
+                self.physics_engine.apply_force(
+                    self.player, (aim_x * utils.Utils.BULLET_FORCE,
+                                  aim_y * utils.Utils.BULLET_FORCE))
+                self.player.get_damage_len = utils.Utils.GET_DAMAGE_LEN
+                self.set_blood(self.player.position)
+                bullets.kill(i)
+                continue
+
+            # Check hit with player objects
+            hit_list = object_list
+
+            for object in hit_list:
+                if object.object_type == 0:  # Wall object
+                    object.health -= damage
+                    if object.health <= 0:
+                        self.room.grid[object.grid_idx[0],
+                                       object.grid_idx[1]] = 0
+                        object.remove_from_sprite_lists()
+                if object.object_type == 1:  # Barrel object
+                    object.health -= damage
+                    if object.health <= 0:
+                        if self.player.is_barrel_multi:
+                            self.set_multi_explosion(object.position)
+                        else:
+                            self.set_explosion(object.position)
+                        self.room.grid[object.grid_idx[0],
+                                       object.grid_idx[1]] = 0
+                        object.remove_from_sprite_lists()
+
+            if len(hit_list) > 0:
+                bullets.kill(i)
+                continue
+
+            # Check hit with room walls
+            if hit_wall:
+                bullets.kill(i)
+
+        # Drop the hit and expired bullets at once
+        bullets.cull()
+
+    def update_boss(self) -> None:
+        # Update boss actions
+        for boss in self.enemies.of_type(character.BossRed):
+            if not boss.is_walking:  # only appear in phase 1
+                if boss.cd == boss.cd_max:
+                    boss.cd = 0
+                if boss.cd < 40:
+                    boss.dash()
+                    if boss.cd % 15 == 0:
+                        boss.shoot_ring(self.enemy_bullets)
+            if boss.health <= 2100:  # phase 2
+                if boss.cd == boss.cd_max:
+                    boss.cd = 0
+                if boss.cd == 0:
+                    boss.shoot_around(self.boss_bullets,
+                                      self.room.width,
+                                      self.room.height,
+                                      self.weapon_rng)
+
+            boss.cd = min(boss.cd + 1, boss.cd_max)
+
+        # Process boss bullets, they stand still and only hurt on the
+        # frame their life span reaches 4
+        bullets = self.boss_bullets
+        bullets.update()
+        n = bullets.count
+        bullets.alpha[:n] = np.where(bullets.life_span[:n] == 4, 255, 150)
+        for i in np.flatnonzero(bullets.life_span[:n] == 4):
+            damage = int(bullets.damage[i])
+
+            # Check hit with player
+            chance = self.luck_rng.randrange(0, 100)
+            target = self.player if chance >= self.player.luck else None
+            hit_list, object_list, _ = self.sweep_bullet(bullets, i,
+                                                         target=target)
+            if len(hit_list) > 0:
+                self.player.get_damage(damage)
+                self.player.get_damage_len = utils.Utils.GET_DAMAGE_LEN
+                self.set_blood(self.player.position)
+                bullets.kill(i)
+                continue
+
+            # Check hit with player objects
+            hit_list = object_list
+
+            for object in hit_list:
+                if object.object_type == 0:  # Wall object
+                    object.health -= damage
+                    if object.health <= 0:
+                        self.room.grid[object.grid_idx[0],
+                                       object.grid_idx[1]] = 0
+                        object.remove_from_sprite_lists()
+                if object.object_type == 1:  # Barrel object
+                    object.health -= damage
+                    if object.health <= 0:
+                        if self.player.is_barrel_multi:
+                            self.set_multi_explosion(object.position)
+                        else:
+                            self.set_explosion(object.position)
+                        self.room.grid[object.grid_idx[0],
+                                       object.grid_idx[1]] = 0
+                        object.remove_from_sprite_lists()
+
+            if len(hit_list) > 0:
+                bullets.kill(i)
+
+        bullets.cull()
+
+    def kill_enemy(self, enemy: character.Character) -> None:
+        """
+        Mark an enemy dead, it is removed with the others killed this
+        tick in remove_dead_enemies.
+        """
+        if self.enemies.kill(enemy):
+            self.player.health_recover()
+
+    def remove_dead_enemies(self) -> None:
+        """Remove the enemies killed this tick and count them."""
+        dead = self.enemies.flush()
+        if len(dead) == 0:
+            return
+
+        for enemy in dead:
+            enemy.physics_engines.clear()  # to avoid key error
+            self.physics_engine.remove_sprite(enemy)
+            enemy.parts.clear()
+
+        for enemy in dead:
+            self.count_kill(enemy)
+        if self.money_pool >= self.pool_size:
+            self.shop_enabled = True
+
+        self.notify("on_enemies_removed", dead)
+
+    def count_kill(self, enemy: character.Character) -> None:
+        """Add the score and money of a killed enemy."""
+        # Update score
+        self.score += enemy.health_max * self.multiplier
+
+        # Update money pool
+        self.money_pool += int(enemy.health_max/10 + self.multiplier)
+
+        if self.last_kill_time == 0:
+            self.last_kill_time = self.total_time
+            return
+
+        # Update score multiplier
+        if self.total_time - self.last_kill_time < 1.0:
+            self.multiplier = min(9, self.multiplier + 1)
+
+        self.last_kill_time = self.total_time
+
+    def touching_enemies(self, sprite: arcade.Sprite) -> list:
+        """Enemies colliding with sprite, the boss only hurts by fire."""
+        return [enemy for enemy in self.enemy_hash.check_for_collision(sprite)
+                if not isinstance(enemy, character.BossRed)]
+
+    def check_hit_player(self) -> None:
+        if self.counter % 10 != 0:  # check every 1/6 s
+            return
+
+        for enemy in self.touching_enemies(self.player):
+            # Check player luck
+            chance = self.luck_rng.randrange(0, 100)
+            if chance < self.player.luck:
+                continue
+
+            self.player.get_damage(enemy.hit_damage)
+            push = enemy.force.normalize().scale(utils.Utils.ENEMY_FORCE)
+            self.physics_engine.apply_force(self.player, (push.x, push.y))
+            self.player.get_damage_len = utils.Utils.GET_DAMAGE_LEN
+            self.set_blood(self.player.position)
+
+    def check_trigger_mine(self) -> None:
+        for mine in list(self.player_mine_list):
+            if len(self.touching_enemies(mine)) == 0:
+                continue
+            if self.player.is_mine_multi:
+                self.set_multi_explosion(mine.position)
+            else:
+                self.set_explosion(mine.position)
+            mine.remove_from_sprite_lists()
+            self.room.grid[mine.grid_idx[0],
+                           mine.grid_idx[1]] = 0
+
+    def check_hit_wall(self) -> None:
+        if self.counter % 20 != 0:  # check every 1/6 s
+            return
+        for obj in list(self.player_object_list):
+            if obj.object_type != 0:
+                continue
+            for enemy in self.touching_enemies(obj):
+                obj.health -= enemy.hit_damage
+                if obj.health <= 0:
+                    self.room.grid[obj.grid_idx[0],
+                                   obj.grid_idx[1]] = 0
+                    obj.remove_from_sprite_lists()
+                    break
+
+    def set_explosion(self, position: arcade.Point) -> None:
+        # Explosion sprites are recycled
+        explosion = self.explosion_pool.acquire(position[0], position[1])
+        self.explosions_list.append(explosion)
+        self.notify("on_explosion", position)
+
+    def set_multi_explosion(self, position: arcade.Point) -> None:
+        self.set_explosion(position)
+        for _ in range(3):
+            speed = 2
+            direction = self.weapon_rng.randrange(360)
+            change_x = math.sin(math.radians(direction)) * speed
+            change_y = math.cos(math.radians(direction)) * speed
+            self.player_bullets.spawn(weapon.ExplosionSeed,
+                                      position[0], position[1],
+                                      Vec2(change_x, change_y), 0, 20)
+
+    def set_blood(self, position: arcade.Point) -> None:
+        self.notify("on_blood", position)
+
+    def manage_level(self) -> None:
+        # Round
+        if self.counter == 0:
+            self.spawn_cnt = 0
+            self.pool_size = 80
+
+        # Score multiplier
+        if self.total_time - self.last_kill_time > 1.0 and self.multiplier > 1:
+            self.multiplier = 1
+
+        # Spawn enemy and round up
+        self.spawn_enemy()
+        if len(self.enemies) == 0 and self.spawn_cnt == 0:
+            self.round += 1
+            self.counter = 0  # reset the counter
+            self.spawn_cnt = self.round * 8  # num of enemies: round * 8
+            if self.round < 21:
+                self.notify("on_round_start", self.round)
+            if self.round == 21:  # Game win
+                self.over = True
+                self.notify("on_game_win")
+
+        # Update enemies
+        for enemy in self.enemies:
+            enemy.update()
+        self.enemies.steer(self.dir_field.dir, self.player)
+
+    def spawn_enemy(self) -> None:
+        """Spawn enemy with different rounds."""
+
+        # Testing
+        if utils.Utils.IS_TESTING:
+            if self.spawn_cnt > 0:
+                # self.set_boss(character.BossRed)
+                self.generate_enemy(1, character.EnemyWhite)
+                self.generate_enemy(1, character.EnemyWhite)
+                self.generate_enemy(1, character.EnemyRed)
+                self.generate_enemy(1, character.EnemyRed)
+                self.generate_enemy(1, character.EnemyCrack)
+                self.generate_enemy(1, character.EnemyCrack)
+                self.generate_enemy(1, character.EnemyBigMouth)
+                self.generate_enemy(1, character.EnemyBigMouth)
+                self.generate_enemy(1, character.EnemyCrash)
+                self.generate_enemy(1, character.EnemyCrash)
+                self.generate_enemy(1, character.EnemyTank)
+                self.generate_enemy(1, character.EnemyTank)
+                self.spawn_cnt = 0
+            return
+
+        if self.round <= 2:
+            if self.counter % 30 == 0:
+                self.generate_enemy(1, character.EnemyWhite)
+
+        if self.round > 2 and self.round <= 4:
+            if self.counter % 30 == 0:
+                if self.counter < 3600 and self.spawn_cnt > self.round:
+                    self.generate_enemy(1, character.EnemyWhite)
+                else:
+                    self.generate_enemy(1, character.EnemyRed)
+
+        if self.round == 5:
+            if self.counter % 30 == 0:
+                if self.counter < 3600 and self.spawn_cnt > 8:
+                    self.generate_enemy(1, character.EnemyWhite)
+                elif self.spawn_cnt > 2:
+                    self.generate_enemy(1, character.EnemyRed)
+                else:
+                    self.set_mini_boss(character.EnemyBigMouth)
+
+        if self.round > 5 and self.round <= 7:
+            if self.counter % 30 == 0:
+                if self.counter < 1800 and self.spawn_cnt > 20:
+                    self.generate_enemy(1, character.EnemyWhite)
+                else:
+                    self.generate_enemy(
+                        2, character.EnemyCrack)
+            if self.counter % 80 == 0:
+                self.generate_enemy(1, character.EnemyRed)
+
+        if self.round > 7 and self.round <= 9:
+            if self.counter % 30 == 0 and self.spawn_cnt > 30:
+                if self.counter < 1800:
+                    self.generate_enemy(3, character.EnemyWhite)
+                else:
+                    self.generate_enemy(
+                        3, character.EnemyCrack)
+            if self.counter % 80 == 0:
+                self.generate_enemy(1, character.EnemyRed)
+            if self.counter % 90 == 0:
+                self.generate_enemy(
+                    1, character.EnemyBigMouth)
+                self.generate_enemy(
+                    2, character.EnemyCrack)
+
+        if self.round == 10:
+            if self.counter % 30 == 0:
+                if self.counter < 3600 and self.spawn_cnt > 20:
+                    self.generate_enemy(1, character.EnemyCrack)
+                elif self.spawn_cnt > 2:
+                    self.generate_enemy(1, character.EnemyBigMouth)
+                else:
+                    self.set_mini_boss(character.EnemyTank)
+
+        if self.round > 10 and self.round <= 14:
+            if self.counter % 30 == 0:
+                if self.counter < 1800 and self.spawn_cnt > 39:
+                    self.generate_enemy(1, character.EnemyCrack)
+                else:
+                    self.generate_enemy(
+                        1, character.EnemyCrash)
+            if self.counter % 100 == 0:
+                self.generate_enemy(1, character.EnemyBigMouth)
+
+        if self.round > 14 and self.round <= 19:
+            if self.counter == 300:
+                self.generate_enemy(3, character.EnemyWhite)
+            if self.counter == 500:
+                self.generate_enemy(3, character.EnemyRed)
+
+            if self.counter % 30 == 0 and self.counter < 2000:
+                if self.spawn_cnt > 60:
+                    self.generate_enemy(
+                        1, character.EnemyCrash)
+                elif self.spawn_cnt <= 100 and self.spawn_cnt > 70:
+                    self.generate_enemy(2, character.EnemyCrack)
+            if self.counter % 100 == 0:
+                self.generate_enemy(1, character.EnemyBigMouth)
+            if self.counter % 100 == 0 and self.counter >= 2000:
+                self.generate_enemy(3, character.EnemyTank)
+
+        if self.round == 20:
+            if self.counter == 3000:
+                self.set_boss(character.BossRed)
+            if self.counter == 300:
+                self.generate_enemy(3, character.EnemyWhite)
+            if self.counter == 500:
+                self.generate_enemy(3, character.EnemyRed)
+            if self.counter % 30 == 0 and self.counter < 2000:
+                if self.spawn_cnt > 60:
+                    self.generate_enemy(
+                        1, character.EnemyCrash)
+                elif self.spawn_cnt <= 100 and self.spawn_cnt > 70:
+                    self.generate_enemy(2, character.EnemyCrack)
+            if self.counter % 100 == 0:
+                self.generate_enemy(1, character.EnemyBigMouth)
+            if self.counter % 100 == 0 and self.counter >= 2000:
+                self.generate_enemy(3, character.EnemyTank)
+
+    def set_one_enemy(self, pos, enemy_type) -> None:
+        """Set up a single enemy."""
+        if self.spawn_cnt <= 0:
+            return
+        enemy = enemy_type(
+            pos.x, pos.y, self.physics_engine, self.player)
+        enemy.register_dir_field(self.dir_field)
+        self.physics_engine.add_sprite(enemy,
+                                       friction=0,
+                                       moment_of_intertia=PymunkPhysicsEngine.MOMENT_INF,
+                                       damping=0.001,
+                                       collision_type="enemy")
+        self.enemies.add(enemy)
+        self.notify("on_enemy_added", enemy)
+        self.spawn_cnt -= 1
+
+    def generate_enemy(self, spawn_mode, enemy_type) -> None:
+        if spawn_mode == 1:  # generate one enemy
+            pos = self.spawn_rng.choice(self.room.spawn_pos)
+            self.set_one_enemy(pos, enemy_type)
+        elif spawn_mode == 2:  # generate at random place
+            pos = Vec2(0, 0)
+            pos.x = self.spawn_rng.randrange(60, self.room.width - 60)
+            pos.y = self.spawn_rng.randrange(60, self.room.height - 60)
+            self.set_one_enemy(pos, enemy_type)
+        else:  # generate one wave of enemies
+            for pos in self.room.spawn_pos:
+                self.set_one_enemy(pos, enemy_type)
+
+    def set_mini_boss(self, enemy_type) -> None:
+        """Set up a mini boss."""
+        if self.spawn_cnt <= 0:
+            return
+        pos = self.spawn_rng.choice(self.room.spawn_pos)
+        enemy = enemy_type(
+            pos.x, pos.y, self.physics_engine, self.player)
+        enemy.register_dir_field(self.dir_field)
+        enemy.health *= 5
+        enemy.speed += 200
+        enemy.cd_max -= 20
+        self.physics_engine.add_sprite(enemy,
+                                       friction=0,
+                                       moment_of_intertia=PymunkPhysicsEngine.MOMENT_INF,
+                                       damping=0.001,
+                                       collision_type="enemy")
+        self.enemies.add(enemy)
+        self.notify("on_enemy_added", enemy)
+        self.spawn_cnt -= 1
+
+    def set_boss(self, enemy_type) -> None:
+        self.spawn_cnt -= 1
+        pos = self.spawn_rng.choice(self.room.spawn_pos)
+        boss = enemy_type(
+            pos.x, pos.y, self.physics_engine, self.player)
+        boss.register_dir_field(self.dir_field)
+        self.physics_engine.add_sprite(boss,
+                                       friction=0,
+                                       moment_of_intertia=PymunkPhysicsEngine.MOMENT_INF,
+                                       damping=0.001,
+                                       collision_type="enemy",
+                                       mass=4)
+        self.enemies.add(boss)
+        self.notify("on_enemy_added", boss)
@@ -0,0 +1,97 @@
+import math
+import arcade
+import utils
+
+
+def in_sprite_lists(sprite: arcade.Sprite) -> bool:
+    return len(sprite.sprite_lists) > 0
+
+
+class SpatialHash:
+    """
+    Uniform grid of sprites on the same WALL_SIZE cells as Room.grid.
+    A sprite is stored in every cell its bounding box overlaps, so a query
+    only tests the sprites sharing a cell with it instead of a whole list.
+    Sprites for which alive returns False since the last build are skipped,
+    by default those removed from their sprite lists.
+    """
+
+    def __init__(self, cell_size: int = utils.Utils.WALL_SIZE,
+                 alive=None) -> None:
+        self.cell_size = cell_size
+        self.cells = {}
+        self.alive = alive or in_sprite_lists
+
+    def cell_range(self, left: float, right: float,
+                   bottom: float, top: float) -> tuple:
+        """Cells overlapped by a box, as a range of x and a range of y."""
+        size = self.cell_size
+        return (range(math.floor(left / size), math.floor(right / size) + 1),
+                range(math.floor(bottom / size), math.floor(top / size) + 1))
+
+    def clear(self) -> None:
+        self.cells.clear()
+
+    def add(self, sprite: arcade.Sprite) -> None:
+        xs, ys = self.cell_range(sprite.left, sprite.right,
+                                 sprite.bottom, sprite.top)
+        for x in xs:
+            for y in ys:
+                self.cells.setdefault((x, y), []).append(sprite)
+
+    def build(self, sprite_lists: list) -> None:
+        """Rebuild the hash from the given sprite lists."""
+        self.cells.clear()
+        for sprite_list in sprite_lists:
+            for sprite in sprite_list:
+                self.add(sprite)
+
+    def query_box(self, left: float, right: float,
+                  bottom: float, top: float) -> list:
+        """Sprites sharing a cell with the box, each one once."""
+        found = {}
+        xs, ys = self.cell_range(left, right, bottom, top)
+        if len(xs) * len(ys) > len(self.cells):
+            # Large box (such as the screen): go through the used cells
+            for (x, y), sprites in self.cells.items():
+                if x in xs and y in ys:
+                    for sprite in sprites:
+                        found[sprite] = None
+            return list(found)
+        for x in xs:
+            for y in ys:
+                for sprite in self.cells.get((x, y), ()):
+                    found[sprite] = None
+        return list(found)
+
+    def sweep(self, x0: float, y0: float, dx: float, dy: float,
+              half_w: float, half_h: float) -> list:
+        """
+        Sprites touched by a box of half size (half_w, half_h) moving from
+        (x0, y0) by (dx, dy), as (enter, exit, sprite) sorted by the enter
+        fraction of the move.
+        """
+        candidates = self.query_box(min(x0, x0 + dx) - half_w,
+                                    max(x0, x0 + dx) + half_w,
+                                    min(y0, y0 + dy) - half_h,
+                                    max(y0, y0 + dy) + half_h)
+        hits = []
+        for other in candidates:
+            if not self.alive(other):
+                continue
+            hit = utils.Utils.sweep_box(x0, y0, dx, dy, half_w, half_h,
+                                        other.left, other.right,
+                                        other.bottom, other.top)
+            if hit is not None:
+                hits.append((hit[0], hit[1], other))
+        hits.sort(key=lambda hit: hit[0])
+        return hits
+
+    def check_for_collision(self, sprite: arcade.Sprite) -> list:
+        """
+        Same as arcade.check_for_collision_with_list, through the hash.
+        """
+        return [other for other in self.query_box(sprite.left, sprite.right,
+                                                  sprite.bottom, sprite.top)
+                if self.alive(other) and arcade.check_for_collision(sprite,
+                                                                    other)]
@@ -0,0 +1,85 @@
+import os
+import arcade
+from typing import Callable
+from arcade.texture_atlas import AllocatorException
+
+GRAPHICS_DIR = "graphics"
+SOLID_SIZE = 8
+
+
+class Textures:
+    """
+    Registry of every image under graphics/, keyed by its path.
+    preload() reads them all once at start up and adds them to the default
+    texture atlas, so creating a sprite never touches the disk or the
+    arcade texture cache.
+    """
+
+    cache = {}  # (lower case path, flipped) -> arcade.Texture
+    procedural = {}  # (generator name, arguments) -> arcade.Texture
+
+    @staticmethod
+    def get(path: str, flipped_horizontally: bool = False) -> arcade.Texture:
+        """Texture of an image, loaded on the first request if not preloaded."""
+        key = (path.lower(), flipped_horizontally)
+        texture = Textures.cache.get(key)
+        if texture is None:
+            texture = arcade.load_texture(
+                path, flipped_horizontally=flipped_horizontally)
+            Textures.cache[key] = texture
+        return texture
+
+    @staticmethod
+    def make(generator: Callable, *args) -> arcade.Texture:
+        """
+        Texture made by a generator such as arcade.make_soft_square_texture,
+        made once for every set of arguments and shared afterwards.
+        """
+        key = (generator.__name__, args)
+        texture = Textures.procedural.get(key)
+        if texture is None:
+            texture = generator(*args)
+            Textures.procedural[key] = texture
+        return texture
+
+    @staticmethod
+    def circle(radius: int, color: arcade.Color,
+               soft: bool = False) -> arcade.Texture:
+        """Texture of arcade.SpriteCircle(radius, color, soft)."""
+        if soft:
+            return Textures.make(arcade.make_soft_circle_texture,
+                                 radius * 2, color)
+        return Textures.make(arcade.make_circle_texture, radius * 2, color)
+
+    @staticmethod
+    def solid_sprite(width: int, height: int,
+                     color: arcade.Color) -> arcade.Sprite:
+        """
+        Same as arcade.SpriteSolidColor, but every sprite of a color shares
+        one small texture stretched to its size.
+        """
+        texture = Textures.make(arcade.Texture.create_filled,
+                                "solid-" + "-".join(map(str, color)),
+                                (SOLID_SIZE, SOLID_SIZE), color)
+        sprite = arcade.Sprite(texture=texture)
+        sprite.width = width
+        sprite.height = height
+        return sprite
+
+    @staticmethod
+    def preload(ctx: arcade.ArcadeContext) -> None:
+        """Load every image under graphics/ into the default atlas."""
+        for root, _, files in os.walk(GRAPHICS_DIR):
+            for name in sorted(files):
+                if name.lower().endswith(".png"):
+                    Textures.get(os.path.join(root, name).replace(os.sep, "/"))
+
+        atlas = ctx.default_atlas
+        for texture in Textures.cache.values():
+            if atlas.has_texture(texture):
+                continue
+            try:
+                atlas.add(texture)
+            except AllocatorException:
+                atlas.resize((atlas.width * 2, atlas.height * 2))
+                atlas.add(texture)
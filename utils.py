@@ -1,9 +1,10 @@
 
 from pyglet.math import Vec2
 import arcade.gui
+import numpy as np
 import pickle
-import math
-import collections
+import random
+import zlib
 
 
 class Color:
@@ -51,6 +52,33 @@ class Utils:
         d = 0.001 if d == 0 else d
         return v.y / d
 
+    @staticmethod
+    def sweep_box(x: float, y: float, dx: float, dy: float,
+                  half_w: float, half_h: float,
+                  left: float, right: float,
+                  bottom: float, top: float) -> tuple:
+        """
+        Move a box of half size (half_w, half_h) from (x, y) by (dx, dy)
+        against the box [left, right] x [bottom, top] (ray vs AABB).
+        Returns the (enter, exit) fractions of the move, or None on a miss.
+        """
+        enter, exit = 0.0, 1.0
+        for pos, d, low, high in ((x, dx, left - half_w, right + half_w),
+                                  (y, dy, bottom - half_h, top + half_h)):
+            if d == 0:
+                if pos < low or pos > high:
+                    return None
+                continue
+            t_low = (low - pos) / d
+            t_high = (high - pos) / d
+            if t_low > t_high:
+                t_low, t_high = t_high, t_low
+            enter = max(enter, t_low)
+            exit = min(exit, t_high)
+            if enter > exit:
+                return None
+        return enter, exit
+
     @staticmethod
     def round_to_multiple(number: int, multiple: int) -> int:
         """Round n to the nearest multiple of m."""
@@ -73,59 +101,46 @@ class Utils:
                                window.lang_idx)
             pickle.dump(settings, setting_file)
 
-    @staticmethod
-    def field_path_finding(p_x: float,
-                           p_y: float,
-                           grid: dict,
-                           grid_w: int,
-                           grid_h: int,
-                           dir_field: dict) -> dict:
-        min_dist = -(grid_w * grid_h) - 10
-        # Destination position
-        dst_x = math.floor(p_x / Utils.WALL_SIZE)
-        dst_y = math.floor(p_y / Utils.WALL_SIZE)
-        dst = (dst_x, dst_y)
-
-        # BFS
-        frontier = collections.deque()
-        frontier.append(dst)
-        dist_grid = dict()
-        dist_grid[dst] = 0
-
-        while len(frontier) > 0:
-            cur = frontier.popleft()
-            for next in [(cur[0] - 1, cur[1]),
-                         (cur[0] + 1, cur[1]),
-                         (cur[0], cur[1] - 1),
-                         (cur[0], cur[1] + 1)]:
-                if next not in dist_grid:
-                    if next[0] < 0 or next[0] >= grid_w:
-                        dist_grid[next] = min_dist
-                    elif next[1] < 0 or next[1] >= grid_h:
-                        dist_grid[next] = min_dist
-                    elif grid[next] == 1:  # a real wall in the map
-                        dist_grid[next] = min_dist
-                    elif grid[next] == 3:  # barrel
-                        dist_grid[next] = min_dist / 2
-                    else:
-                        frontier.append(next)
-                        dist_grid[next] = dist_grid[cur] - 1
-
-        # Calculate gradient for vector field
-        for k in grid:
-            max_dis = min_dist
-            dir = Vec2(1.0, 0)
-            for pos in [(k[0] - 1, k[1]), (k[0] + 1, k[1]),
-                        (k[0], k[1] - 1), (k[0], k[1] + 1),
-                        (k[0] + 1, k[1] + 1), (k[0] + 1, k[1] - 1),
-                        (k[0] - 1, k[1] + 1), (k[0] - 1, k[1] - 1)]:
-                if dist_grid.get(pos, min_dist) > max_dis:
-                    max_dis = dist_grid[pos]
-                    dir = Vec2(pos[0] - k[0], pos[1] - k[1])
-
-            dir_field[k] = dir.normalize()
-
-        return dist_grid
+
+class Rng:
+    """
+    Random number streams of one run, one per subsystem, all derived from
+    the run seed. A subsystem drawing more or fewer numbers (more
+    particles, say) leaves the others unchanged, so the seed alone
+    reproduces a run.
+    """
+
+    SPAWN = "spawn"  # where and when enemies appear
+    LOOT = "loot"  # shop items and their quality
+    LUCK = "luck"  # rolls against the player's luck
+    AI = "ai"  # enemy behaviour
+    WEAPON = "weapon"  # spread of shots and explosions
+    PARTICLES = "particles"  # effects, they do not change the game
+
+    def __init__(self, seed: int = None) -> None:
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.streams = {}
+        self.np_streams = {}
+
+    def get(self, name: str) -> random.Random:
+        """The random.Random stream of a subsystem."""
+        stream = self.streams.get(name)
+        if stream is None:
+            # String seeds are hashed the same way on every run
+            stream = random.Random(f"{self.seed}/{name}")
+            self.streams[name] = stream
+        return stream
+
+    def numpy(self, name: str) -> np.random.Generator:
+        """The NumPy stream of a subsystem, for vectorized code."""
+        stream = self.np_streams.get(name)
+        if stream is None:
+            stream = np.random.default_rng(
+                [self.seed, zlib.crc32(name.encode())])
+            self.np_streams[name] = stream
+        return stream
 
 
 class Style:
@@ -1,18 +1,27 @@
 import arcade
 import arcade.gui
 import utils
+import textures
+import audio
 import room
 import character
 import weapon
-import item
 import effect
+import projectile
+import simulation
+import render
+import profiler
+import replay
 import math
 import random
+import numpy as np
+import pyglet
 from pyglet.math import Vec2
 from arcade.pymunk_physics_engine import PymunkPhysicsEngine
 
 FADE_RATE = 8
 CAMERA_SPEED = 1
+CULL_MARGIN = 64
 
 
 class FadingView(arcade.View):
@@ -69,7 +78,7 @@ class DefaultView(FadingView):
         arcade.set_background_color(utils.Color.GROUND_WHITE)
         self.w, self.h = self.window.get_size()
         self.title = arcade.Sprite(
-            filename="graphics/ui/TitleLogo.png",
+            texture=textures.Textures.get("graphics/ui/TitleLogo.png"),
             scale=1,
             center_x=self.w / 2,
             center_y=self.h / 2 + 20,
@@ -125,7 +134,7 @@ class StartView(FadingView):
         # Sprite lists
         self.wall_list = None
         self.player = None
-        self.player_bullet_list = None
+        self.player_bullets = None
 
         # Physics engine so we don't run into walls.
         self.physics_engine = None
@@ -149,7 +158,7 @@ class StartView(FadingView):
             damping=damping, gravity=gravity)
 
         # GameObject lists
-        self.player_bullet_list = arcade.SpriteList()
+        self.player_bullets = projectile.BulletSystem()
 
         # Set up room background and player
         room_w = utils.Utils.round_to_multiple(self.w, 30)
@@ -188,7 +197,7 @@ class StartView(FadingView):
         self.start_sprite_list = arcade.SpriteList()
         self.start_sprite_list.append(
             arcade.Sprite(
-                filename="graphics/ui/MoveGuide.png",
+                texture=textures.Textures.get("graphics/ui/MoveGuide.png"),
                 scale=0.3,
                 center_x=200,
                 center_y=200
@@ -196,7 +205,7 @@ class StartView(FadingView):
         )
         self.start_sprite_list.append(
             arcade.Sprite(
-                filename="graphics/ui/ShootGuide.png",
+                texture=textures.Textures.get("graphics/ui/ShootGuide.png"),
                 scale=0.3,
                 center_x=self.w - 200,
                 center_y=200,
@@ -204,7 +213,7 @@ class StartView(FadingView):
         )
         self.start_sprite_list.append(
             arcade.Sprite(
-                filename="graphics/ui/PauseGuide.png",
+                texture=textures.Textures.get("graphics/ui/PauseGuide.png"),
                 scale=0.3,
                 center_x=200,
                 center_y=self.h - 100,
@@ -212,7 +221,7 @@ class StartView(FadingView):
         )
         self.start_sprite_list.append(
             arcade.Sprite(
-                filename="graphics/ui/WeaponChangeGuide.png",
+                texture=textures.Textures.get("graphics/ui/WeaponChangeGuide.png"),
                 scale=0.3,
                 center_x=200,
                 center_y=self.h - 200,
@@ -220,7 +229,7 @@ class StartView(FadingView):
         )
         self.start_sprite_list.append(
             arcade.Sprite(
-                filename="graphics/ui/ShopGuide.png",
+                texture=textures.Textures.get("graphics/ui/ShopGuide.png"),
                 scale=0.3,
                 center_x=self.w - 200,
                 center_y=self.h - 100,
@@ -245,7 +254,8 @@ class StartView(FadingView):
         self.manager = arcade.gui.UIManager()
         self.manager.enable()
         self.vertical_box = arcade.gui.UIBoxLayout(x=200)
-        title = arcade.Sprite(filename="graphics/ui/TitleLogo.png", scale=1)
+        title = arcade.Sprite(
+            texture=textures.Textures.get("graphics/ui/TitleLogo.png"), scale=1)
         title_ui = arcade.gui.UISpriteWidget(
             sprite=title, width=400, height=200)
         self.vertical_box.add(title_ui.with_space_around(bottom=0))
@@ -282,7 +292,7 @@ class StartView(FadingView):
         self.room.draw_walls()
         self.start_sprite_list.draw()
         self.player.draw()
-        self.player_bullet_list.draw()
+        self.player_bullets.draw()
         self.manager.draw()
         self.about_text_shadow.draw()
         self.about_text.draw()
@@ -304,30 +314,25 @@ class StartView(FadingView):
 
             if self.player.cd == 0 and self.player.energy - self.player.current_weapon.cost >= 0:
                 self.player.energy -= self.player.current_weapon.cost
-                bullets = self.player.attack()
+                self.player.attack(self.player_bullets)
                 self.player.current_weapon.play_sound(
                     self.window.effect_volume)
-                for bullet in bullets:
-                    bullet.change_x = bullet.aim.x
-                    bullet.change_y = bullet.aim.y
-                    self.player_bullet_list.append(bullet)
 
         self.player.cd = min(self.player.cd + 1, self.player.cd_max)
 
     def process_player_bullet(self) -> None:
-        self.player_bullet_list.update()
+        bullets = self.player_bullets
+        bullets.update()
 
-        for bullet in self.player_bullet_list:
-            bullet.life_span -= 1
+        for i in range(bullets.count):
+            x, y = bullets.pos[i]
+            dx, dy = bullets.vel[i]
+            half_w, half_h = bullets.half_size(i)
+            if self.room.sweep_walls(x - dx, y - dy, dx, dy,
+                                     half_w, half_h) <= 1:
+                bullets.kill(i)
 
-            hit_list = arcade.check_for_collision_with_list(
-                bullet, self.wall_list)
-
-            if len(hit_list) > 0:
-                bullet.remove_from_sprite_lists()
-
-            if bullet.life_span <= 0:
-                bullet.remove_from_sprite_lists()
+        bullets.cull()
 
     def on_key_press(self, key, modifiers) -> None:
         """Called whenever a key is pressed."""
@@ -596,6 +601,9 @@ class SelectionView(FadingView):
 
     def on_click_next(self, event) -> None:
         utils.Utils.clear_ui_manager(self.manager)
+        if self.window.game_view is not None:
+            # Stop the path finding worker of the last game
+            self.window.game_view.sim.stop()
         self.window.game_view = GameView()
         self.window.game_view.setup(
             self.char_list[self.cur_char_idx], self.cur_map)
@@ -934,38 +942,30 @@ class OptionView(arcade.View):
         self.setup(self.last_view)
 
 
-class GameView(FadingView):
-    """Main game view."""
+class GameView(FadingView, simulation.Observer):
+    """Main game view, draws the simulation and plays its sounds."""
 
     def __init__(self):
         super().__init__()
         self.mouse_x = None
         self.mouse_y = None
-        self.mouse_pos = Vec2(0, 0)
-        self.mouse_sprite = arcade.Sprite("graphics/ui/Cursor.png")
-        self.physics_engine = None
+        self.mouse_sprite = arcade.Sprite(
+            texture=textures.Textures.get("graphics/ui/Cursor.png"))
         self.manager = None
 
-        # Sprite lists
-        self.wall_list = None
-        self.player = None
-        self.player_bullet_list = None
-        self.enemy_white_list = None
-        self.enemy_red_list = None
-        self.enemy_crack_list = None
-        self.enemy_big_mouth_list = None
-        self.enemy_crash_list = None
-        self.enemy_tank_list = None
-        self.enemy_sprite_list = None
-        self.enemy_bullet_list = None
-        self.explosions_list = None
-        self.blood_list = None
+        # The game, this view draws it and plays its sounds
+        self.sim = None
+        self.time_scale = 1.0  # game seconds per real second
+        self.max_ticks = simulation.Simulation.MAX_TICKS  # per frame
 
-        # Track the current state of what key is pressed
-        self.left_pressed = False
-        self.right_pressed = False
-        self.up_pressed = False
-        self.down_pressed = False
+        # Times the phases of on_update and on_draw, toggled with F3
+        self.profiler = profiler.Profiler()
+
+        # Visuals
+        self.enemy_batch = None
+        self.blood_list = None
+        self.decals = None
+        self.explosion_visual_list = None
 
         self.camera_sprites = arcade.Camera(self.w, self.h)
         self.camera_gui = arcade.Camera(self.w, self.h)
@@ -977,53 +977,66 @@ class GameView(FadingView):
         self.window.play_game_music(1)
 
         # Gameplay set up
-        self.round: int = 0
-        self.multiplier: int = 1
-        self.score: int = 0
-        self.money_pool: int = 0
-        self.spawn_cnt: int = -1
-        self.pool_size: int = 0
-        self.round_text = arcade.Text("", self.w / 2,
-                                      self.h - 50, utils.Color.BLACK,
-                                      16, 2, "left", "Cubic 11")
-        self.multiplier_text = arcade.Text("", self.w - 200,
-                                           self.h - 140, utils.Color.MUL_GREEN,
-                                           40, 2, "left", "FFF Forward")
-        self.score_text = arcade.Text("Score: " + str(self.score), self.w - 240,
-                                      self.h - 50, utils.Color.BLACK,
-                                      16, 2, "left", "Cubic 11")
+        self.sim = simulation.Simulation(player, map)
+        self.sim.observers.append(self)
+
+        # Record the input, the game can then be played again headless
+        self.sim.observers.append(replay.Recorder(self.sim))
+        self.sim.instrument(
+            lambda phase, method: self.profiler.wrap("tick." + phase, method))
+
+        # Every UI text is laid out only when it changes, and drawn in
+        # one batch
+        self.ui_text_batch = pyglet.graphics.Batch()
+        self.round_text = pyglet.text.Label(
+            "", x=self.w / 2, y=self.h - 50,
+            color=utils.Color.BLACK + (255,),
+            font_name="Cubic 11", font_size=16,
+            batch=self.ui_text_batch)
+        self.multiplier_text = pyglet.text.Label(
+            "", x=self.w - 200, y=self.h - 140,
+            color=utils.Color.MUL_GREEN,
+            font_name="FFF Forward", font_size=40,
+            batch=self.ui_text_batch)
+        self.score_text = pyglet.text.Label(
+            "Score: " + str(self.sim.score), x=self.w - 240, y=self.h - 50,
+            color=utils.Color.BLACK + (255,),
+            font_name="Cubic 11", font_size=16,
+            batch=self.ui_text_batch)
+        self.health_text = pyglet.text.Label(
+            "", x=100, y=self.h - 50,
+            color=utils.Color.HEALTH_RED + (255,),
+            font_name="Cubic 11", font_size=16,
+            batch=self.ui_text_batch)
+        self.energy_text = pyglet.text.Label(
+            "", x=100, y=self.h - 80,
+            color=utils.Color.ENERGY_BLUE + (255,),
+            font_name="Cubic 11", font_size=16,
+            batch=self.ui_text_batch)
+        self.health_shown = None
+        self.energy_shown = None
+        self.weapons_shown = None
 
         self.window.set_mouse_visible(False)
-        self.counter: int = -250  # assume 60 frames -> 60 = 1s
-        self.total_time = 0
-        self.last_kill_time = 0
-        self.shop_enabled = False  # Enable if money_pool >= round * 100
-        self.all_item_list = []
 
         # UI set up
         self.ui_sprite_list = arcade.SpriteList()
         self.health_sprite = arcade.Sprite(
-            filename="graphics/ui/Health.png",
+            texture=textures.Textures.get("graphics/ui/Health.png"),
             center_x=72,
             center_y=self.h - 40,
-            image_width=25,
-            image_height=25,
             scale=1,
         )
         self.energy_sprite = arcade.Sprite(
-            filename="graphics/ui/Energy.png",
+            texture=textures.Textures.get("graphics/ui/Energy.png"),
             center_x=72,
             center_y=self.h - 70,
-            image_width=25,
-            image_height=25,
             scale=1,
         )
         self.weapon_slot_sprite = arcade.Sprite(
-            filename="graphics/ui/WeaponSlot.png",
+            texture=textures.Textures.get("graphics/ui/WeaponSlot.png"),
             center_x=150,
             center_y=self.h - 120,
-            image_width=80,
-            image_height=40,
             scale=1,
         )
         self.ui_sprite_list.append(self.health_sprite)
@@ -1031,24 +1044,26 @@ class GameView(FadingView):
         self.ui_sprite_list.append(self.weapon_slot_sprite)
         # Money UI
         self.money_ui = arcade.Sprite(
-            filename="graphics/ui/Coin.png",
+            texture=textures.Textures.get("graphics/ui/Coin.png"),
             center_x=self.w/2 + 320,
             center_y=60,
             scale=1,
         )
         self.money_ui.alpha = 0
-        self.buy_text = arcade.Text("", self.w/2 + 340,
-                                    52, utils.Color.BLACK,
-                                    14, 2, "left", "Cubic 11")
-        self.money_container = arcade.SpriteSolidColor(
+        self.buy_text = pyglet.text.Label(
+            "", x=self.w/2 + 340, y=52,
+            color=utils.Color.BLACK + (255,),
+            font_name="Cubic 11", font_size=14,
+            batch=self.ui_text_batch)
+        self.money_container = textures.Textures.solid_sprite(
             600, 16, utils.Color.BLACK)
         self.money_container.center_x = self.w / 2
         self.money_container.center_y = 60
-        self.money_fill = arcade.SpriteSolidColor(
+        self.money_fill = textures.Textures.solid_sprite(
             594, 10, utils.Color.DARK_GRAY)
         self.money_fill.center_x = self.w / 2
         self.money_fill.center_y = 60
-        self.money_pool_ui = arcade.SpriteSolidColor(
+        self.money_pool_ui = textures.Textures.solid_sprite(
             1, 10, utils.Color.YELLOW)
         self.money_pool_ui.center_x = self.w / 2 - 297
         self.money_pool_ui.center_y = 60
@@ -1074,101 +1089,66 @@ class GameView(FadingView):
         self.ui_sprite_list.append(self.last_weapon_sprite)
         self.ui_sprite_list.append(self.next_weapon_sprite)
 
-        self.on_damage_filter = arcade.SpriteSolidColor(self.w + 10,
-                                                        self.h + 10,
-                                                        utils.Color.RED_LIGHT_TRANS)
+        self.on_damage_filter = textures.Textures.solid_sprite(
+            self.w + 10, self.h + 10, utils.Color.RED_LIGHT_TRANS)
         self.on_damage_filter.center_x = self.w / 2
         self.on_damage_filter.center_y = self.h / 2
         self.on_damage_filter.visible = False
-        self.on_explosion_filter = arcade.SpriteSolidColor(self.w + 10,
-                                                           self.h + 10,
-                                                           utils.Color.WHITE_TRANSPARENT)
+        self.on_explosion_filter = textures.Textures.solid_sprite(
+            self.w + 10, self.h + 10, utils.Color.WHITE_TRANSPARENT)
         self.on_explosion_filter.center_x = self.w / 2
         self.on_explosion_filter.center_y = self.h / 2
         self.on_explosion_filter.visible = False
         self.ui_sprite_list.append(self.on_damage_filter)
         self.ui_sprite_list.append(self.on_explosion_filter)
 
-        # GameObject lists
-        self.wall_list = arcade.SpriteList()
-        self.enemy_white_list = arcade.SpriteList()
-        self.enemy_crack_list = arcade.SpriteList()
-        self.enemy_big_mouth_list = arcade.SpriteList()
-        self.enemy_crash_list = arcade.SpriteList()
-        self.enemy_tank_list = arcade.SpriteList()
-        self.enemy_red_list = arcade.SpriteList()
-        self.player_bullet_list = arcade.SpriteList()
-        self.player_object_list = arcade.SpriteList()
-        self.player_mine_list = arcade.SpriteList()
-        self.enemy_bullet_list = arcade.SpriteList()
-        self.explosions_list = arcade.SpriteList()
-        self.blood_list = arcade.SpriteList()
-        self.enemy_sprite_list = arcade.SpriteList()
-        self.explosion_visual_list = arcade.SpriteList()
-        self.boss_list = arcade.SpriteList()
-        self.boss_bullet_list = arcade.SpriteList()
+        # Effects, they do not change the game
+        particle_rng = self.sim.rng.numpy(utils.Rng.PARTICLES)
+        self.blood_list = effect.ParticleSystem(1800, particle_rng)
+        self.explosion_visual_list = effect.ParticleSystem(2140, particle_rng)
+        self.enemy_batch = character.EnemyBatch()
 
-        # Create the physics engine
-        damping = 0.01
-        gravity = (0, 0)
-        self.physics_engine = PymunkPhysicsEngine(gravity, damping)
+        # Settled blood and explosion traces are painted on the ground
+        self.decals = effect.DecalLayer(self.sim.room.width,
+                                        self.sim.room.height)
 
-        # Game room setup
-        self.room = map()
-        self.wall_list = self.room.walls
+        # What is drawn of the sprite lists
+        self.visible_objects = render.CulledSprites()
+        self.visible_mines = render.CulledSprites()
 
         # Path-finding
-        self.dir_field = dict()
-        self.dist_grid = None
         if utils.Utils.IS_TESTING_PF:
             self.dir_field_visual = arcade.SpriteList()
             self.dir_visual_dict = dict()
-            for pos in self.room.grid:
-                self.dir_visual_dict[pos] = arcade.SpriteSolidColor(
+            for pos in np.ndindex(self.sim.room.grid.shape):
+                self.dir_visual_dict[pos] = textures.Textures.solid_sprite(
                     30, 30, (0, 255, 0, 150))
                 self.dir_visual_dict[pos].center_x = pos[0] * 30 + 15
                 self.dir_visual_dict[pos].center_y = pos[1] * 30 + 15
                 self.dir_field_visual.append(self.dir_visual_dict[pos])
 
-        # Set up the player
-        self.player = player(
-            float(self.room.width / 2), float(self.room.height / 2), self.physics_engine)
-        self.player.register_mouse_pos(self.mouse_pos)
-
-        # Set up the shop
-        self.shop = item.Shop(self.player)
-
-        self.physics_engine.add_sprite(
-            self.player,
-            friction=0,
-            moment_of_inertia=PymunkPhysicsEngine.MOMENT_INF,
-            damping=0.001,
-            collision_type="player",
-            elasticity=0.1
-        )
-        self.physics_engine.add_sprite_list(
-            self.room.walls,
-            friction=0,
-            collision_type="wall",
-            body_type=PymunkPhysicsEngine.STATIC,
-        )
-
     def on_draw(self) -> None:
         self.clear()
         self.camera_sprites.use()
-
-        self.room.draw_ground()
-        self.blood_list.draw()
-        self.player_mine_list.draw()
-        self.room.draw_walls()
-        self.player.draw()
-        self.enemy_sprite_list.draw()
-        self.player_bullet_list.draw()
-        self.player_object_list.draw()
-        self.enemy_bullet_list.draw()
-        self.explosions_list.draw()
-        self.explosion_visual_list.draw()
-        self.boss_bullet_list.draw()
+        call = self.profiler.call
+
+        # Only what overlaps the camera is drawn
+        box = self.get_view_box()
+        call("draw.culling", self.update_visible, box)
+
+        call("draw.ground", self.sim.room.draw_ground)
+        call("draw.decals", self.decals.draw)
+        call("draw.blood", self.blood_list.draw, box)
+        call("draw.mines", self.visible_mines.draw)
+        call("draw.walls", self.sim.room.draw_walls)
+        call("draw.player", self.sim.player.draw)
+        call("draw.enemies", self.enemy_batch.draw, box)
+        call("draw.player_bullets", self.sim.player_bullets.draw, box)
+        call("draw.objects", self.visible_objects.draw)
+        call("draw.enemy_bullets", self.sim.enemy_bullets.draw, box)
+        # Explosions are invisible colliders, they are not drawn
+        call("draw.explosions", self.explosion_visual_list.draw, box)
+        call("draw.boss_bullets", self.sim.boss_bullets.draw, box)
 
         if utils.Utils.IS_TESTING_PF:
             self.dir_field_visual.draw()
@@ -1181,66 +1161,47 @@ class GameView(FadingView):
             self.mouse_sprite.draw()
 
         # Render the GUI
-        self.draw_ui()
+        call("draw.ui", self.draw_ui)
+        self.profiler.draw(20, self.h / 2 - profiler.GRAPH_HEIGHT / 2)
 
     def on_update(self, delta_time) -> None:
-        self.physics_engine.step()
-        self.total_time += delta_time
-        self.counter += 1
-        self.window.explosion_sound_cnt = max(
-            self.window.explosion_sound_cnt - 1,
-            0
-        )
-
-        # Update player
-        self.player.update()
-        self.update_player_attack()
-        self.process_player_bullet()
-        self.process_player_explosion()
-
-        # Update level
-        self.manage_level()
-        self.enemy_sprite_list.update()
-        self.update_enemy_attack()
-        self.process_enemy_bullet()
-        self.update_boss()
+        # A frame is an update and the draw after it
+        self.profiler.next_frame()
 
-        self.explosions_list.update()
-        self.blood_list.update()
+        # The game runs at a fixed rate, whatever the frame rate is
+        ticks = self.sim.advance(delta_time * self.time_scale,
+                                 self.max_ticks)
+        self.profiler.call("update.audio", audio.Sounds.tick, ticks)
+        self.profiler.call("update.effects", self.update_effects, ticks)
 
+        self.update_level_ui()
         self.scroll_to_player()
 
-        # Check game over
-        if self.player.health <= 0:
-            self.window.game_over_view.setup(self.all_item_list, self.score)
-            self.window.show_view(self.window.game_over_view)
-            self.window.play_game_over_sound()
-
         # Check player getting damage
-        if self.player.get_damage_len > 0:
+        if self.sim.player.get_damage_len > 0:
             self.on_damage_filter.visible = True
         else:
             self.on_damage_filter.visible = False
 
         # Check explosion
-        if len(self.explosions_list) > 0:
+        if len(self.sim.explosions_list) > 0:
             self.on_explosion_filter.visible = True
         else:
             self.on_explosion_filter.visible = False
 
-            # Update path finding field (function still in testing)
-        if self.counter % 30 == 0:
-            self.dist_grid = utils.Utils.field_path_finding(self.player.center_x,
-                                                            self.player.center_y,
-                                                            self.room.grid,
-                                                            self.room.grid_w,
-                                                            self.room.grid_h,
-                                                            self.dir_field)
         if utils.Utils.IS_TESTING_PF:
             for pos in self.dir_visual_dict:
-                alpha = min(255, -self.dist_grid.get(pos, -255) * 3)
+                alpha = min(255, -int(self.sim.dist_grid[pos]) * 3)
                 self.dir_visual_dict[pos].alpha = alpha
 
+    def update_effects(self, ticks: int) -> None:
+        # Effects are counted in ticks too
+        for _ in range(ticks):
+            self.enemy_batch.update()
+            self.explosion_visual_list.update()
+            self.blood_list.update()
+            self.decals.bake(self.blood_list)
+
     def on_show_view(self) -> None:
         self.window.set_mouse_visible(False)
         self.manager = None
@@ -1249,19 +1210,25 @@ class GameView(FadingView):
         """Called whenever a key is pressed."""
 
         if key == arcade.key.W:
-            self.player.move_up = True
+            self.sim.player.move_up = True
         elif key == arcade.key.S:
-            self.player.move_down = True
+            self.sim.player.move_down = True
         elif key == arcade.key.A:
-            self.player.move_left = True
+            self.sim.player.move_left = True
         elif key == arcade.key.D:
-            self.player.move_right = True
+            self.sim.player.move_right = True
 
         # Change weapon
         if key == arcade.key.Q:
-            self.player.change_weapon_left = True
+            self.sim.player.change_weapon_left = True
         if key == arcade.key.E:
-            self.player.change_weapon_right = True
+            self.sim.player.change_weapon_right = True
+
+        # Profiler graph, and its trace written to a file
+        if key == arcade.key.F3:
+            self.profiler.toggle()
+        if key == arcade.key.F4:
+            self.profiler.export()
 
         # Pause game
         if key == arcade.key.ESCAPE:
@@ -1270,7 +1237,7 @@ class GameView(FadingView):
             self.window.show_view(self.window.option_view)
 
         # Buy item
-        if key == arcade.key.B and self.shop_enabled:
+        if key == arcade.key.B and self.sim.shop_enabled:
             self.window.shop_view.setup(self)
             self.window.show_view(self.window.shop_view)
 
@@ -1281,56 +1248,78 @@ class GameView(FadingView):
 
             if key == arcade.key.X:
                 self.window.game_over_view.setup(
-                    self.all_item_list, self.score)
+                    self.sim.all_item_list, self.sim.score)
                 self.window.show_view(self.window.game_over_view)
 
             if key == arcade.key.V:
-                self.window.game_win_view.setup(self.all_item_list, self.score)
+                self.window.game_win_view.setup(self.sim.all_item_list, self.sim.score)
                 self.window.show_view(self.window.game_win_view)
 
     def on_key_release(self, key, modifiers) -> None:
 
         if key == arcade.key.W:
-            self.player.move_up = False
+            self.sim.player.move_up = False
         elif key == arcade.key.S:
-            self.player.move_down = False
+            self.sim.player.move_down = False
         elif key == arcade.key.A:
-            self.player.move_left = False
+            self.sim.player.move_left = False
         elif key == arcade.key.D:
-            self.player.move_right = False
+            self.sim.player.move_right = False
 
     def on_mouse_motion(self, x, y, dx, dy) -> None:
         """Mouse movement."""
 
         self.mouse_x = x
         self.mouse_y = y
-        self.mouse_pos.x = self.mouse_x + self.camera_sprites.position.x
-        self.mouse_pos.y = self.mouse_y + self.camera_sprites.position.y
+        self.sim.mouse_pos.x = self.mouse_x + self.camera_sprites.position.x
+        self.sim.mouse_pos.y = self.mouse_y + self.camera_sprites.position.y
         self.mouse_sprite.center_x = self.mouse_x
         self.mouse_sprite.center_y = self.mouse_y
 
     def on_mouse_press(self, x: int, y: int, button: int, modifiers: int) -> None:
         if button == arcade.MOUSE_BUTTON_LEFT:
-            self.player.is_attack = True
+            self.sim.player.is_attack = True
         if button == arcade.MOUSE_BUTTON_RIGHT:
-            self.player.use_skill()
+            self.sim.use_skill()
 
     def on_mouse_release(self, x: int, y: int, button: int, modifiers: int) -> None:
         if button == arcade.MOUSE_BUTTON_LEFT:
-            self.player.is_attack = False
+            self.sim.player.is_attack = False
+
+    def get_view_box(self) -> tuple:
+        """
+        World box seen by the camera as (left, right, bottom, top), with a
+        margin for the camera shake and the sprites partly in view.
+        """
+        x, y = self.camera_sprites.position
+        return (x - CULL_MARGIN, x + self.w + CULL_MARGIN,
+                y - CULL_MARGIN, y + self.h + CULL_MARGIN)
+
+    def update_visible(self, box: tuple) -> None:
+        """Keep the sprite lists drawn to the sprites overlapping box."""
+        # Placed objects are found through the gameplay hash, enemies are
+        # culled by their batch
+        self.visible_objects.show(
+            obj for obj in self.sim.object_hash.query_box(*box)
+            if obj.sprite_lists)
+        left, right, bottom, top = box
+        self.visible_mines.show(
+            mine for mine in self.sim.player_mine_list
+            if mine.right >= left and mine.left <= right
+            and mine.top >= bottom and mine.bottom <= top)
 
     def scroll_to_player(self) -> None:
-        x = self.player.pos.x - float(self.w / 2)
-        if self.player.pos.x < float(self.w / 2):
+        x = self.sim.player.pos.x - float(self.w / 2)
+        if self.sim.player.pos.x < float(self.w / 2):
             x = 0
-        elif self.player.pos.x > float(self.room.width - self.w / 2):
-            x = float(self.room.width - self.w)
+        elif self.sim.player.pos.x > float(self.sim.room.width - self.w / 2):
+            x = float(self.sim.room.width - self.w)
 
-        y = self.player.pos.y - float(self.h / 2)
-        if self.player.pos.y < float(self.h / 2):
+        y = self.sim.player.pos.y - float(self.h / 2)
+        if self.sim.player.pos.y < float(self.h / 2):
             y = 0
-        elif self.player.pos.y > float(self.room.height - self.h / 2):
-            y = float(self.room.height - self.h)
+        elif self.sim.player.pos.y > float(self.sim.room.height - self.h / 2):
+            y = float(self.sim.room.height - self.h)
 
         self.camera_sprites.move_to((x, y), CAMERA_SPEED)
 
@@ -1372,6 +1361,8 @@ class GameView(FadingView):
         self.multiplier_text.y = self.h - 140
         self.score_text.x = self.w - 240
         self.score_text.y = self.h - 50
+        self.health_text.y = self.h - 50
+        self.energy_text.y = self.h - 80
         self.money_container.center_x = self.w / 2
         self.money_fill.center_x = self.w / 2
         self.money_ui.center_x = self.w/2 + 320
@@ -1387,46 +1378,43 @@ class GameView(FadingView):
         self.on_explosion_filter.center_x = self.w / 2
         self.on_explosion_filter.center_y = self.h / 2
 
-    def draw_ui(self) -> None:
+    def set_weapon_slot(self, slot: arcade.Sprite,
+                        wp: weapon.Weapon) -> None:
+        slot.texture = wp.texture_list[0]
+        if wp.is_gun:
+            slot.scale = 2
+        else:
+            slot.scale = 0.8
+
+    def update_ui(self) -> None:
+        """Change the UI texts and weapon slots, only when they changed."""
         # Health
-        arcade.draw_text(text=int(self.player.health),
-                         start_x=100,
-                         start_y=self.h - 50,
-                         color=utils.Color.HEALTH_RED,
-                         font_size=16,
-                         width=2,
-                         align="left",
-                         font_name="Cubic 11")
+        health = int(self.sim.player.health)
+        if health != self.health_shown:
+            self.health_shown = health
+            self.health_text.text = str(health)
 
         # Energy
-        arcade.draw_text(text=int(self.player.energy),
-                         start_x=100,
-                         start_y=self.h - 80,
-                         color=utils.Color.ENERGY_BLUE,
-                         font_size=16,
-                         width=2,
-                         align="left",
-                         font_name="Cubic 11")
+        energy = int(self.sim.player.energy)
+        if energy != self.energy_shown:
+            self.energy_shown = energy
+            self.energy_text.text = str(energy)
 
         # Weapon slot
-        wp_size = len(self.player.weapons)
-        self.cur_weapon_sprite.texture = self.player.current_weapon.texture_list[0]
-        if self.player.current_weapon.is_gun:
-            self.cur_weapon_sprite.scale = 2
-        else:
-            self.cur_weapon_sprite.scale = 0.8
-        last_index = (self.player.weapon_index - 1) % wp_size
-        self.last_weapon_sprite.texture = self.player.weapons[last_index].texture_list[0]
-        if self.player.weapons[last_index].is_gun:
-            self.last_weapon_sprite.scale = 2
-        else:
-            self.last_weapon_sprite.scale = 0.8
-        next_index = (self.player.weapon_index + 1) % wp_size
-        self.next_weapon_sprite.texture = self.player.weapons[next_index].texture_list[0]
-        if self.player.weapons[next_index].is_gun:
-            self.next_weapon_sprite.scale = 2
-        else:
-            self.next_weapon_sprite.scale = 0.8
+        weapons = (self.sim.player.weapon_index,
+                   tuple(map(id, self.sim.player.weapons)))
+        if weapons == self.weapons_shown:
+            return
+        self.weapons_shown = weapons
+        wp_size = len(self.sim.player.weapons)
+        self.set_weapon_slot(self.cur_weapon_sprite,
+                             self.sim.player.current_weapon)
+        last_index = (self.sim.player.weapon_index - 1) % wp_size
+        self.set_weapon_slot(self.last_weapon_sprite,
+                             self.sim.player.weapons[last_index])
+        next_index = (self.sim.player.weapon_index + 1) % wp_size
+        self.set_weapon_slot(self.next_weapon_sprite,
+                             self.sim.player.weapons[next_index])
 
         # Change weapon ui according to the number of weapons
         if wp_size == 1:
@@ -1439,814 +1427,104 @@ class GameView(FadingView):
             self.last_weapon_sprite.alpha = 120
             self.next_weapon_sprite.alpha = 120
 
+    def draw_ui(self) -> None:
+        self.update_ui()
         self.ui_sprite_list.draw()
 
-        # Round
-        self.round_text.draw()
+        # Health, energy, round, score and money
+        with self.window.ctx.pyglet_rendering():
+            self.ui_text_batch.draw()
 
-        # Score
-        self.score_text.draw()
-        self.multiplier_text.draw()
+    def update_level_ui(self) -> None:
+        # Round count down
+        counter = self.sim.counter
+        if counter <= -190:
+            self.round_text.text = "3"
+        elif counter > -190 and counter <= -130:
+            self.round_text.text = "2"
+        elif counter > -130 and counter <= -70:
+            self.round_text.text = "1"
+        elif counter > -70 and counter < -10:
+            self.round_text.text = "Start !!!"
 
-        # Money
-        self.buy_text.draw()
+        # Score multiplier, reset by the game a second after the last kill
+        if self.sim.multiplier == 1 and self.multiplier_text.text != "":
+            self.multiplier_text.text = ""
+            self.multiplier_text.font_size = 30
+            self.multiplier_text.color = utils.Color.MUL_GREEN
 
-    def update_player_attack(self) -> None:
-        if self.player.is_attack:
-            if self.player.cd == self.player.cd_max:
-                self.player.cd = 0
+        # It shrinks by one every 3 ticks after a kill, at any frame rate
+        elapsed = self.sim.total_time - self.sim.last_kill_time
+        if self.sim.multiplier > 1 and elapsed < 1.0:
+            size = (30 + self.sim.multiplier
+                    - round(elapsed / self.sim.TICK) // 3)
+            if self.multiplier_text.font_size != size:
+                self.multiplier_text.font_size = size
 
-            if self.player.cd == 0 and self.player.energy - self.player.current_weapon.cost >= 0:
-                if self.player.current_weapon.is_gun:
-                    self.player.energy = max(
-                        0, self.player.energy - self.player.current_weapon.cost)
-                    bullets = self.player.attack()
-                    self.player.current_weapon.play_sound(
-                        self.window.effect_volume)
-                    for bullet in bullets:
-                        bullet.change_x = bullet.aim.x
-                        bullet.change_y = bullet.aim.y
-                        self.player_bullet_list.append(bullet)
-                else:
-                    object = self.player.place()
-                    place_point = self.player.pos + \
-                        self.player.current_weapon.aim_pos.normalize().scale(30)
-                    grid_x = math.floor(place_point.x / 30)
-                    grid_y = math.floor(place_point.y / 30)
-
-                    try:
-                        self.room.grid[grid_x, grid_y]
-                    except KeyError:
-                        return
-
-                    if self.room.grid[grid_x, grid_y] == 0:
-                        object.center_x = grid_x * 30 + \
-                            float(utils.Utils.HALF_WALL_SIZE)
-                        object.center_y = grid_y * 30 + \
-                            float(utils.Utils.HALF_WALL_SIZE)
-                        object.grid_idx = (grid_x, grid_y)
-                        if object.object_type != 2:  # not a mine
-                            self.player_object_list.append(object)
-                            self.physics_engine.add_sprite(object,
-                                                           friction=0,
-                                                           collision_type="object",
-                                                           body_type=PymunkPhysicsEngine.STATIC)
-                        else:
-                            self.player_mine_list.append(object)
-
-                        # Differentiate the number from the real wall
-                        self.room.grid[grid_x, grid_y] = 2 + object.object_type
-                        self.player.current_weapon.play_sound(
-                            self.window.effect_volume)
-                        # Consume energy only when object is placed
-                        self.player.energy = max(
-                            0, self.player.energy - self.player.current_weapon.cost)
+    def on_blood(self, position: arcade.Point) -> None:
+        self.blood_list.blood(position)
 
-        self.player.cd = min(self.player.cd + 1, self.player.cd_max)
+    def on_explosion(self, position: arcade.Point) -> None:
+        self.explosion_visual_list.explosion(position)
+        self.shake_camera()
+        self.window.play_explosion_sound()
 
-    def process_player_bullet(self) -> None:
-        self.player_bullet_list.update()
-        self.player_object_list.update()
-        self.player_mine_list.update()
-
-        for bullet in self.player_bullet_list:
-            bullet.life_span -= 1
-
-            if type(bullet) == weapon.ExplosionSeed:
-                if bullet.life_span <= 0:
-                    self.set_explosion(bullet.position)
-                else:
-                    continue
-
-            # Check hit with enemy
-            hit_list = arcade.check_for_collision_with_lists(
-                bullet,
-                [
-                    self.enemy_white_list,
-                    self.enemy_red_list,
-                    self.enemy_crack_list,
-                    self.enemy_big_mouth_list,
-                    self.enemy_crash_list,
-                    self.enemy_tank_list,
-                    self.boss_list,
-                ],
-            )
+        # Set explosion traces
+        self.blood_list.traces(position)
+
+    def on_weapon_used(self, wp: weapon.Weapon) -> None:
+        wp.play_sound(self.window.effect_volume)
+
+    def on_enemy_added(self, enemy: arcade.Sprite) -> None:
+        self.enemy_batch.add(enemy)
+
+    def on_enemies_removed(self, dead: list) -> None:
+        for enemy in dead:
+            self.enemy_batch.remove(enemy)
+
+        # Update the UI once for all the kills
+        self.score_text.text = "Score: " + str(self.sim.score)
 
-            for enemy in hit_list:
-                enemy.health -= bullet.damage
-                self.set_blood(enemy.position)
-                self.player.energy += (bullet.damage/10)
-                self.physics_engine.apply_force(
-                    enemy, (bullet.aim.x * utils.Utils.BULLET_FORCE, bullet.aim.y * utils.Utils.BULLET_FORCE))
-                enemy.get_damage_len = utils.Utils.GET_DAMAGE_LEN
-                if enemy.health <= 0:
-                    self.player.health_recover()
-                    self.remove_enemy(enemy)
-
-            if len(hit_list) > 0:
-                if type(bullet) == weapon.Missile:
-                    if self.player.is_rocket_multi:
-                        self.set_multi_explosion(bullet.position)
-                    else:
-                        self.set_explosion(bullet.position)
-                bullet.remove_from_sprite_lists()
-                continue
-
-            # Check hit with player objects
-            hit_list = arcade.check_for_collision_with_list(
-                bullet, self.player_object_list)
-
-            for object in hit_list:
-                if object.object_type == 0:  # Wall object
-                    object.health -= bullet.damage
-                    if object.health <= 0:
-                        self.room.grid[object.grid_idx[0],
-                                       object.grid_idx[1]] = 0
-                        object.remove_from_sprite_lists()
-                if object.object_type == 1:  # Barrel object
-                    object.health -= bullet.damage
-                    if object.health <= 0:
-                        if self.player.is_barrel_multi:
-                            self.set_multi_explosion(object.position)
-                        else:
-                            self.set_explosion(object.position)
-                        self.room.grid[object.grid_idx[0],
-                                       object.grid_idx[1]] = 0
-                        object.remove_from_sprite_lists()
-
-            if len(hit_list) > 0:
-                if type(bullet) == weapon.Missile:
-                    if self.player.is_rocket_multi:
-                        self.set_multi_explosion(bullet.position)
-                    else:
-                        self.set_explosion(bullet.position)
-                bullet.remove_from_sprite_lists()
-                continue
-
-            # Check hit with room walls
-            hit_list = arcade.check_for_collision_with_list(
-                bullet, self.wall_list)
-
-            if len(hit_list) > 0:
-                if type(bullet) == weapon.Missile:
-                    if self.player.is_rocket_multi:
-                        self.set_multi_explosion(bullet.position)
-                    else:
-                        self.set_explosion(bullet.position)
-                bullet.remove_from_sprite_lists()
-                continue
-
-            if bullet.life_span <= 0:
-                if type(bullet) == weapon.Missile:
-                    if self.player.is_rocket_multi:
-                        self.set_multi_explosion(bullet.position)
-                    else:
-                        self.set_explosion(bullet.position)
-                bullet.remove_from_sprite_lists()
-
-    def process_player_explosion(self) -> None:
-        # Update explosion visual
-        self.explosion_visual_list.update()
-
-        # Process explosion
-        for explosion in self.explosions_list:
-            if explosion.life_span == 5:
-                hit_list = arcade.check_for_collision_with_lists(
-                    explosion,
-                    [
-                        self.enemy_white_list,
-                        self.enemy_red_list,
-                        self.enemy_crack_list,
-                        self.enemy_big_mouth_list,
-                        self.enemy_crash_list,
-                        self.enemy_tank_list,
-                    ],
-                )
-
-                for enemy in hit_list:
-                    enemy.health -= self.player.explosion_damage
-                    self.set_blood(enemy.position)
-                    self.player.energy += (self.player.explosion_damage/10)
-                    aim_x = (enemy.center_x - explosion.center_x) * \
-                        utils.Utils.BULLET_FORCE
-                    aim_y = (enemy.center_y - explosion.center_y) * \
-                        utils.Utils.BULLET_FORCE
-                    self.physics_engine.apply_force(enemy, (aim_x, aim_y))
-                    enemy.get_damage_len = utils.Utils.GET_DAMAGE_LEN
-                    if enemy.health <= 0:
-                        self.player.health_recover()
-                        self.remove_enemy(enemy)
-
-                hit_list = arcade.check_for_collision_with_list(
-                    explosion, self.player_object_list)
-
-                for object in hit_list:
-                    if object.object_type == 0:  # Wall object
-                        object.health -= self.player.explosion_damage
-                        if object.health <= 0:
-                            self.room.grid[object.grid_idx[0],
-                                           object.grid_idx[1]] = 0
-                            object.remove_from_sprite_lists()
-                    if object.object_type == 1:  # Barrel object
-                        object.health -= self.player.explosion_damage
-                        if object.health <= 0:
-                            if self.player.is_barrel_multi:
-                                self.set_multi_explosion(object.position)
-                            else:
-                                self.set_explosion(object.position)
-                            self.room.grid[object.grid_idx[0],
-                                           object.grid_idx[1]] = 0
-                            object.remove_from_sprite_lists()
-
-    def update_enemy_attack(self) -> None:
-        # Enemy White
-        for enemy in self.enemy_white_list:
-            self.check_hit_player(enemy)
-            self.check_trigger_mine(enemy)
-            self.check_hit_wall(enemy)
-
-        # Enemy Red
-        for enemy in self.enemy_red_list:
-            self.check_hit_player(enemy)
-            self.check_trigger_mine(enemy)
-            self.check_hit_wall(enemy)
-            if enemy.is_walking == False:
-                if enemy.cd == enemy.cd_max:
-                    enemy.cd = 0
-                if enemy.cd == 0:
-                    bullet = enemy.attack()
-                    self.enemy_bullet_list.append(bullet)
-            enemy.cd = min(enemy.cd + 1, enemy.cd_max)
-
-        # Enemy Crack
-        for enemy in self.enemy_crack_list:
-            self.check_hit_player(enemy)
-            self.check_trigger_mine(enemy)
-            self.check_hit_wall(enemy)
-
-        # Enemy Big Mouth
-        for enemy in self.enemy_big_mouth_list:
-            self.check_hit_player(enemy)
-            self.check_trigger_mine(enemy)
-            self.check_hit_wall(enemy)
-            if enemy.is_walking == False:
-                if enemy.cd == enemy.cd_max:
-                    enemy.cd = 0
-                if enemy.cd == 0:
-                    bullets = enemy.attack()
-                    self.enemy_bullet_list.extend(bullets)
-            enemy.cd = min(enemy.cd + 1, enemy.cd_max)
-
-        # Enemy Crash
-        for enemy in self.enemy_crash_list:
-            self.check_hit_player(enemy)
-            self.check_trigger_mine(enemy)
-            self.check_hit_wall(enemy)
-            if enemy.is_walking == False:
-                if enemy.cd == enemy.cd_max:
-                    enemy.cd = 0
-                if enemy.cd < enemy.cd_max / 2:
-                    enemy.dash()
-            enemy.cd = min(enemy.cd + 1, enemy.cd_max)
-
-        # Enemy Tank
-        for enemy in self.enemy_tank_list:
-            self.check_hit_player(enemy)
-            self.check_trigger_mine(enemy)
-            self.check_hit_wall(enemy)
-            if enemy.is_walking == False:
-                if enemy.cd == enemy.cd_max:
-                    enemy.cd = 0
-                if enemy.cd < enemy.cd_max * 2 / 3:
-                    enemy.dash()
-            enemy.cd = min(enemy.cd + 1, enemy.cd_max)
-
-    def process_enemy_bullet(self) -> None:
-        self.enemy_bullet_list.update()
-
-        for bullet in self.enemy_bullet_list:
-            bullet.life_span -= 1
-
-            # Check hit with player
-            chance = random.randrange(0, 100)
-            if chance >= self.player.luck and arcade.check_for_collision(bullet, self.player):
-                self.player.get_damage(bullet.damage)
-                bullet.remove_from_sprite_lists()
-                self.physics_engine.apply_force(
-                    self.player, (bullet.aim.x * utils.Utils.BULLET_FORCE,
-                                  bullet.aim.y * utils.Utils.BULLET_FORCE))
-                self.player.get_damage_len = utils.Utils.GET_DAMAGE_LEN
-                self.set_blood(self.player.position)
-                bullet.remove_from_sprite_lists()
-                continue
-
-            # Check hit with player objects
-            hit_list = arcade.check_for_collision_with_list(
-                bullet, self.player_object_list)
-
-            for object in hit_list:
-                if object.object_type == 0:  # Wall object
-                    object.health -= bullet.damage
-                    if object.health <= 0:
-                        self.room.grid[object.grid_idx[0],
-                                       object.grid_idx[1]] = 0
-                        object.remove_from_sprite_lists()
-                if object.object_type == 1:  # Barrel object
-                    object.health -= bullet.damage
-                    if object.health <= 0:
-                        if self.player.is_barrel_multi:
-                            self.set_multi_explosion(object.position)
-                        else:
-                            self.set_explosion(object.position)
-                        self.room.grid[object.grid_idx[0],
-                                       object.grid_idx[1]] = 0
-                        object.remove_from_sprite_lists()
-
-            if len(hit_list) > 0:
-                bullet.remove_from_sprite_lists()
-                continue
-
-            # Check hit with room walls
-            hit_list = arcade.check_for_collision_with_list(
-                bullet, self.wall_list)
-
-            if len(hit_list) > 0:
-                bullet.remove_from_sprite_lists()
-                continue
-
-            if bullet.life_span <= 0:
-                bullet.remove_from_sprite_lists()
-
-    def update_boss(self) -> None:
-        # Update boss actions
-        for boss in self.boss_list:
-            if type(boss) == character.BossRed:
-                self.check_hit_player(boss)
-                self.check_trigger_mine(boss)
-                self.check_hit_wall(boss)
-                if boss.is_walking == False:  # only appear in phase 1
-                    if boss.cd == boss.cd_max:
-                        boss.cd = 0
-                    if boss.cd < 40:
-                        boss.dash()
-                        if boss.cd % 15 == 0:
-                            bullets = boss.shoot_ring()
-                            self.enemy_bullet_list.extend(bullets)
-                if boss.health <= 2100:  # phase 2
-                    if boss.cd == boss.cd_max:
-                        boss.cd = 0
-                    if boss.cd == 0:
-                        bullets = boss.shoot_around(self.room.width,
-                                                    self.room.height)
-                        self.boss_bullet_list.extend(bullets)
-
-                boss.cd = min(boss.cd + 1, boss.cd_max)
-
-        # Process boss bullets
-        for bullet in self.boss_bullet_list:
-            if bullet.life_span == 5:
-                bullet.alpha = 255
-                # Check hit with player
-                chance = random.randrange(0, 100)
-                if chance >= self.player.luck and arcade.check_for_collision(bullet, self.player):
-                    self.player.get_damage(bullet.damage)
-                    bullet.remove_from_sprite_lists()
-                    self.player.get_damage_len = utils.Utils.GET_DAMAGE_LEN
-                    self.set_blood(self.player.position)
-                    bullet.remove_from_sprite_lists()
-                    continue
-
-                # Check hit with player objects
-                hit_list = arcade.check_for_collision_with_list(
-                    bullet, self.player_object_list)
-
-                for object in hit_list:
-                    if object.object_type == 0:  # Wall object
-                        object.health -= bullet.damage
-                        if object.health <= 0:
-                            self.room.grid[object.grid_idx[0],
-                                           object.grid_idx[1]] = 0
-                            object.remove_from_sprite_lists()
-                    if object.object_type == 1:  # Barrel object
-                        object.health -= bullet.damage
-                        if object.health <= 0:
-                            if self.player.is_barrel_multi:
-                                self.set_multi_explosion(object.position)
-                            else:
-                                self.set_explosion(object.position)
-                            self.room.grid[object.grid_idx[0],
-                                           object.grid_idx[1]] = 0
-                            object.remove_from_sprite_lists()
-
-                if len(hit_list) > 0:
-                    bullet.remove_from_sprite_lists()
-                    continue
-            else:
-                bullet.alpha = 150
-            if bullet.life_span <= 1:
-                bullet.remove_from_sprite_lists()
-            bullet.life_span -= 1
-
-    def remove_enemy(self, enemy: character.Character) -> None:
-        enemy.physics_engines.clear()  # to avoid key error
-        for part in enemy.parts:
-            self.enemy_sprite_list.remove(part)
-        self.physics_engine.remove_sprite(enemy)
-        enemy.parts.clear()
-        enemy.remove_from_sprite_lists()
-
-        # Update score
-        self.score += enemy.health_max * self.multiplier
-        self.score_text.text = "Score: " + str(self.score)
-
-        # Update money pool
-        self.money_pool += int(enemy.health_max/10 + self.multiplier)
         self.money_pool_len = 594.0 * \
-            float(self.money_pool) / float(self.pool_size)
+            float(self.sim.money_pool) / float(self.sim.pool_size)
         self.money_pool_len = min(594.0, self.money_pool_len)
         if self.money_pool_len > 1.0:
             self.money_pool_ui.visible = True
         self.money_pool_x = self.w/2 - 297 + (self.money_pool_len/2)
         self.money_pool_ui.width = self.money_pool_len
         self.money_pool_ui.center_x = self.money_pool_x
-        if self.money_pool >= self.pool_size:
-            self.shop_enabled = True
+        if self.sim.money_pool >= self.sim.pool_size:
             self.money_ui.alpha = 255
             self.buy_text.text = "[B]"
 
-        if self.last_kill_time == 0:
-            self.last_kill_time = self.total_time
-            return
-
-        # Update score multiplier
-        if self.total_time - self.last_kill_time < 1.0:
-            self.multiplier = min(9, self.multiplier + 1)
-
-        if self.multiplier > 1:
-            self.multiplier_text.text = "x " + str(self.multiplier)
-            self.multiplier_text.font_size = 30 + self.multiplier
-            if self.multiplier < 4:
+        multiplier = self.sim.multiplier
+        if multiplier > 1:
+            self.multiplier_text.text = "x " + str(multiplier)
+            self.multiplier_text.font_size = 30 + multiplier
+            if multiplier < 4:
                 self.multiplier_text.color = utils.Color.MUL_GREEN
-            elif self.multiplier >= 4 and self.multiplier < 6:
+            elif multiplier >= 4 and multiplier < 6:
                 self.multiplier_text.color = utils.Color.MUL_YELLOW
-            elif self.multiplier >= 6 and self.multiplier < 8:
+            elif multiplier >= 6 and multiplier < 8:
                 self.multiplier_text.color = utils.Color.MUL_ORANGE
             else:
                 self.multiplier_text.color = utils.Color.MUL_RED
 
-        self.last_kill_time = self.total_time
-
-    def check_hit_player(self, enemy: character.Character) -> None:
-        if self.counter % 10 != 0:  # check every 1/6 s
-            return
-
-        # Check player luck
-        chance = random.randrange(0, 100)
-        if chance < self.player.luck:
-            return
-
-        # Check collision
-        if arcade.check_for_collision(enemy, self.player):
-            self.player.get_damage(enemy.hit_damage)
-            push = enemy.force.normalize().scale(utils.Utils.ENEMY_FORCE)
-            self.physics_engine.apply_force(self.player, (push.x, push.y))
-            self.player.get_damage_len = utils.Utils.GET_DAMAGE_LEN
-            self.set_blood(self.player.position)
-
-    def check_trigger_mine(self, enemy: character.Character) -> None:
-        hit_list = arcade.check_for_collision_with_list(
-            enemy, self.player_mine_list)
-        for mine in hit_list:
-            if self.player.is_mine_multi:
-                self.set_multi_explosion(mine.position)
-            else:
-                self.set_explosion(mine.position)
-            mine.remove_from_sprite_lists()
-            self.room.grid[mine.grid_idx[0],
-                           mine.grid_idx[1]] = 0
-
-    def check_hit_wall(self, enemy: character.Character) -> None:
-        if self.counter % 20 != 0:  # check every 1/6 s
-            return
-        hit_list = arcade.check_for_collision_with_list(
-            enemy, self.player_object_list)
-        for obj in hit_list:
-            if obj.object_type != 0:
-                continue
-            obj.health -= enemy.hit_damage
-            if obj.health <= 0:
-                self.room.grid[obj.grid_idx[0],
-                               obj.grid_idx[1]] = 0
-                obj.remove_from_sprite_lists()
-
-    def set_explosion(self, position: arcade.Point) -> None:
-        # Add explosion visual
-        for _ in range(18):
-            particle = effect.Particle(self.explosion_visual_list)
-            particle.position = position
-            self.explosion_visual_list.append(particle)
-
-        # Add logic explosion
-        explosion = weapon.Explosion(position[0], position[1])
-        self.explosions_list.append(explosion)
-
-        self.shake_camera()
-        self.window.play_explosion_sound()
-
-        # Set explosion traces
-        for _ in range(12):
-            blood = effect.ExplosionTrace()
-            blood.position = position
-            self.blood_list.append(blood)
-
-    def set_multi_explosion(self, position: arcade.Point) -> None:
-        self.set_explosion(position)
-        for _ in range(3):
-            speed = 2
-            direction = random.randrange(360)
-            change_x = math.sin(math.radians(direction)) * speed
-            change_y = math.cos(math.radians(direction)) * speed
-            explosion_seed = weapon.ExplosionSeed()
-            explosion_seed.position = position
-            explosion_seed.change_x = change_x
-            explosion_seed.change_y = change_y
-            explosion_seed.life_span = 20
-            explosion_seed.damage = 0
-            self.player_bullet_list.append(explosion_seed)
-
-    def set_blood(self, position: arcade.Point) -> None:
-        for _ in range(12):
-            blood = effect.Blood()
-            blood.position = position
-            self.blood_list.append(blood)
-
-    def manage_level(self) -> None:
-        # Round
-        if self.counter <= -190:
-            self.round_text.text = "3"
-        elif self.counter > -190 and self.counter <= -130:
-            self.round_text.text = "2"
-        elif self.counter > -130 and self.counter <= -70:
-            self.round_text.text = "1"
-        elif self.counter > -70 and self.counter < -10:
-            self.round_text.text = "Start !!!"
-        if self.counter == 0:
-            self.spawn_cnt = 0
-            self.pool_size = 80
-
-        # Score multiplier
-        if self.total_time - self.last_kill_time > 1.0 and self.multiplier > 1:
-            self.multiplier = 1
-            self.multiplier_text.text = ""
-            self.multiplier_text.font_size = 30
-            self.multiplier_text.color = utils.Color.MUL_GREEN
-
-        if self.total_time - self.last_kill_time < 1.0:
-            if self.counter % 3 == 0:
-                self.multiplier_text.font_size -= 1
-
-        # Spawn enemy and round up
-        self.spawn_enemy()
-        if len(self.enemy_sprite_list) == 0 and self.spawn_cnt == 0:
-            self.round += 1
-            self.round_text.text = "Round: " + str(self.round)
-            self.counter = 0  # reset the counter
-            self.spawn_cnt = self.round * 8  # num of enemies: round * 8
-            if self.round < 21:
-                self.window.play_round_start_sound()
-            if self.round == 21:  # Game win
-                self.window.game_win_view.setup(self.all_item_list, self.score)
-                self.window.show_view(self.window.game_win_view)
-                self.window.play_game_win_sound()
-
-        # Update enemies
-        self.enemy_white_list.update()
-        self.enemy_red_list.update()
-        self.enemy_crack_list.update()
-        self.enemy_big_mouth_list.update()
-        self.enemy_crash_list.update()
-        self.enemy_tank_list.update()
-        self.boss_list.update()
-
-    def spawn_enemy(self) -> None:
-        """Spawn enemy with different rounds."""
+    def on_round_start(self, round: int) -> None:
+        self.round_text.text = "Round: " + str(round)
+        self.window.play_round_start_sound()
 
-        # Testing
-        if utils.Utils.IS_TESTING:
-            if self.spawn_cnt > 0:
-                # self.set_boss(character.BossRed)
-                self.generate_enemy(1, character.EnemyWhite,
-                                    self.enemy_white_list)
-                self.generate_enemy(1, character.EnemyWhite,
-                                    self.enemy_white_list)
-                self.generate_enemy(1, character.EnemyRed,
-                                    self.enemy_red_list)
-                self.generate_enemy(1, character.EnemyRed,
-                                    self.enemy_red_list)
-                self.generate_enemy(1, character.EnemyCrack,
-                                    self.enemy_crack_list)
-                self.generate_enemy(1, character.EnemyCrack,
-                                    self.enemy_crack_list)
-                self.generate_enemy(1, character.EnemyBigMouth,
-                                    self.enemy_big_mouth_list)
-                self.generate_enemy(1, character.EnemyBigMouth,
-                                    self.enemy_big_mouth_list)
-                self.generate_enemy(1, character.EnemyCrash,
-                                    self.enemy_crash_list)
-                self.generate_enemy(1, character.EnemyCrash,
-                                    self.enemy_crash_list)
-                self.generate_enemy(1, character.EnemyTank,
-                                    self.enemy_tank_list)
-                self.generate_enemy(1, character.EnemyTank,
-                                    self.enemy_tank_list)
-                self.spawn_cnt = 0
-            return
+    def on_game_win(self) -> None:
+        self.window.game_win_view.setup(self.sim.all_item_list,
+                                        self.sim.score)
+        self.window.show_view(self.window.game_win_view)
+        self.window.play_game_win_sound()
 
-        if self.round <= 2:
-            if self.counter % 30 == 0:
-                self.generate_enemy(1, character.EnemyWhite,
-                                    self.enemy_white_list)
-
-        if self.round > 2 and self.round <= 4:
-            if self.counter % 30 == 0:
-                if self.counter < 3600 and self.spawn_cnt > self.round:
-                    self.generate_enemy(1, character.EnemyWhite,
-                                        self.enemy_white_list)
-                else:
-                    self.generate_enemy(1, character.EnemyRed,
-                                        self.enemy_red_list)
-
-        if self.round == 5:
-            if self.counter % 30 == 0:
-                if self.counter < 3600 and self.spawn_cnt > 8:
-                    self.generate_enemy(1, character.EnemyWhite,
-                                        self.enemy_white_list)
-                elif self.spawn_cnt > 2:
-                    self.generate_enemy(1, character.EnemyRed,
-                                        self.enemy_red_list)
-                else:
-                    self.set_mini_boss(character.EnemyBigMouth,
-                                       self.enemy_big_mouth_list)
-
-        if self.round > 5 and self.round <= 7:
-            if self.counter % 30 == 0:
-                if self.counter < 1800 and self.spawn_cnt > 20:
-                    self.generate_enemy(1, character.EnemyWhite,
-                                        self.enemy_white_list)
-                else:
-                    self.generate_enemy(
-                        2, character.EnemyCrack, self.enemy_crack_list)
-            if self.counter % 80 == 0:
-                self.generate_enemy(1, character.EnemyRed,
-                                    self.enemy_red_list)
-
-        if self.round > 7 and self.round <= 9:
-            if self.counter % 30 == 0 and self.spawn_cnt > 30:
-                if self.counter < 1800:
-                    self.generate_enemy(3, character.EnemyWhite,
-                                        self.enemy_white_list)
-                else:
-                    self.generate_enemy(
-                        3, character.EnemyCrack, self.enemy_crack_list)
-            if self.counter % 80 == 0:
-                self.generate_enemy(1, character.EnemyRed,
-                                    self.enemy_red_list)
-            if self.counter % 90 == 0:
-                self.generate_enemy(
-                    1, character.EnemyBigMouth, self.enemy_big_mouth_list)
-                self.generate_enemy(
-                    2, character.EnemyCrack, self.enemy_crack_list)
-
-        if self.round == 10:
-            if self.counter % 30 == 0:
-                if self.counter < 3600 and self.spawn_cnt > 20:
-                    self.generate_enemy(1, character.EnemyCrack,
-                                        self.enemy_crack_list)
-                elif self.spawn_cnt > 2:
-                    self.generate_enemy(1, character.EnemyBigMouth,
-                                        self.enemy_big_mouth_list)
-                else:
-                    self.set_mini_boss(character.EnemyTank,
-                                       self.enemy_tank_list)
-
-        if self.round > 10 and self.round <= 14:
-            if self.counter % 30 == 0:
-                if self.counter < 1800 and self.spawn_cnt > 39:
-                    self.generate_enemy(1, character.EnemyCrack,
-                                        self.enemy_crack_list)
-                else:
-                    self.generate_enemy(
-                        1, character.EnemyCrash, self.enemy_crash_list)
-            if self.counter % 100 == 0:
-                self.generate_enemy(1, character.EnemyBigMouth,
-                                    self.enemy_big_mouth_list)
-
-        if self.round > 14 and self.round <= 19:
-            if self.counter == 300:
-                self.generate_enemy(3, character.EnemyWhite,
-                                    self.enemy_white_list)
-            if self.counter == 500:
-                self.generate_enemy(3, character.EnemyRed, self.enemy_red_list)
-
-            if self.counter % 30 == 0 and self.counter < 2000:
-                if self.spawn_cnt > 60:
-                    self.generate_enemy(
-                        1, character.EnemyCrash, self.enemy_crash_list)
-                elif self.spawn_cnt <= 100 and self.spawn_cnt > 70:
-                    self.generate_enemy(2, character.EnemyCrack,
-                                        self.enemy_crack_list)
-            if self.counter % 100 == 0:
-                self.generate_enemy(1, character.EnemyBigMouth,
-                                    self.enemy_big_mouth_list)
-            if self.counter % 100 == 0 and self.counter >= 2000:
-                self.generate_enemy(3, character.EnemyTank,
-                                    self.enemy_tank_list)
-
-        if self.round == 20:
-            if self.counter == 3000:
-                self.set_boss(character.BossRed)
-            if self.counter == 300:
-                self.generate_enemy(3, character.EnemyWhite,
-                                    self.enemy_white_list)
-            if self.counter == 500:
-                self.generate_enemy(3, character.EnemyRed, self.enemy_red_list)
-            if self.counter % 30 == 0 and self.counter < 2000:
-                if self.spawn_cnt > 60:
-                    self.generate_enemy(
-                        1, character.EnemyCrash, self.enemy_crash_list)
-                elif self.spawn_cnt <= 100 and self.spawn_cnt > 70:
-                    self.generate_enemy(2, character.EnemyCrack,
-                                        self.enemy_crack_list)
-            if self.counter % 100 == 0:
-                self.generate_enemy(1, character.EnemyBigMouth,
-                                    self.enemy_big_mouth_list)
-            if self.counter % 100 == 0 and self.counter >= 2000:
-                self.generate_enemy(3, character.EnemyTank,
-                                    self.enemy_tank_list)
-
-    def set_one_enemy(self, pos, enemy_type, enemy_list) -> None:
-        """Set up a single enemy."""
-        if self.spawn_cnt <= 0:
-            return
-        enemy = enemy_type(
-            pos.x, pos.y, self.physics_engine, self.player)
-        enemy.register_dir_field(self.dir_field)
-        enemy_list.append(enemy)
-        self.enemy_sprite_list.extend(enemy.parts)
-        self.physics_engine.add_sprite(enemy,
-                                       friction=0,
-                                       moment_of_intertia=PymunkPhysicsEngine.MOMENT_INF,
-                                       damping=0.001,
-                                       collision_type="enemy")
-        self.spawn_cnt -= 1
-
-    def generate_enemy(self, spawn_mode, enemy_type, enemy_list) -> None:
-        if spawn_mode == 1:  # generate one enemy
-            pos = random.choice(self.room.spawn_pos)
-            self.set_one_enemy(pos, enemy_type, enemy_list)
-        elif spawn_mode == 2:  # generate at random place
-            pos = Vec2(0, 0)
-            pos.x = random.randrange(60, self.room.width - 60)
-            pos.y = random.randrange(60, self.room.height - 60)
-            self.set_one_enemy(pos, enemy_type, enemy_list)
-        else:  # generate one wave of enemies
-            for pos in self.room.spawn_pos:
-                self.set_one_enemy(pos, enemy_type, enemy_list)
-
-    def set_mini_boss(self, enemy_type, enemy_list) -> None:
-        """Set up a mini boss."""
-        if self.spawn_cnt <= 0:
-            return
-        pos = random.choice(self.room.spawn_pos)
-        enemy = enemy_type(
-            pos.x, pos.y, self.physics_engine, self.player)
-        enemy.register_dir_field(self.dir_field)
-        enemy.health *= 5
-        enemy.speed += 200
-        enemy.cd_max -= 20
-        enemy_list.append(enemy)
-        self.enemy_sprite_list.extend(enemy.parts)
-        self.physics_engine.add_sprite(enemy,
-                                       friction=0,
-                                       moment_of_intertia=PymunkPhysicsEngine.MOMENT_INF,
-                                       damping=0.001,
-                                       collision_type="enemy")
-        self.spawn_cnt -= 1
-
-    def set_boss(self, enemy_type) -> None:
-        self.spawn_cnt -= 1
-        pos = random.choice(self.room.spawn_pos)
-        boss = enemy_type(
-            pos.x, pos.y, self.physics_engine, self.player)
-        boss.register_dir_field(self.dir_field)
-        self.enemy_sprite_list.extend(boss.parts)
-        self.boss_list.append(boss)
-        self.physics_engine.add_sprite(boss,
-                                       friction=0,
-                                       moment_of_intertia=PymunkPhysicsEngine.MOMENT_INF,
-                                       damping=0.001,
-                                       collision_type="enemy",
-                                       mass=4)
+    def on_game_over(self) -> None:
+        self.window.game_over_view.setup(self.sim.all_item_list,
+                                         self.sim.score)
+        self.window.show_view(self.window.game_over_view)
+        self.window.play_game_over_sound()
 
 
 class GameOverView(arcade.View):
@@ -2300,13 +1578,17 @@ class GameOverView(arcade.View):
             x = idx % 10
             y = math.floor(idx / 10)
             if item[0] == -1:
-                tmp_bg = arcade.Sprite("graphics/item/Special.png")
+                tmp_bg = arcade.Sprite(
+                    texture=textures.Textures.get("graphics/item/Special.png"))
             elif item[0] == 1:
-                tmp_bg = arcade.Sprite("graphics/item/Bronze.png")
+                tmp_bg = arcade.Sprite(
+                    texture=textures.Textures.get("graphics/item/Bronze.png"))
             elif item[0] == 2:
-                tmp_bg = arcade.Sprite("graphics/item/Sliver.png")
+                tmp_bg = arcade.Sprite(
+                    texture=textures.Textures.get("graphics/item/Sliver.png"))
             else:
-                tmp_bg = arcade.Sprite("graphics/item/Gold.png")
+                tmp_bg = arcade.Sprite(
+                    texture=textures.Textures.get("graphics/item/Gold.png"))
             tmp_bg.center_x = 100 + 50*x
             tmp_bg.center_y = self.h - 100 - 50*y
             self.item_sprites.append(tmp_bg)
@@ -2353,23 +1635,16 @@ class ShopView(arcade.View):
 
     def setup(self, last_view: GameView) -> None:
         self.last_view = last_view
-        self.player = last_view.player
-        self.shop = last_view.shop
+        self.player = last_view.sim.player
+        self.shop = last_view.sim.shop
         self.cnt = 0
-        self.refresh_cost = last_view.round * last_view.round
-        self.last_view.pool_size = 110 * last_view.round + \
-            5 * last_view.round * last_view.round
-        self.player.money += self.last_view.money_pool
 
-        # Reset money pool of the game view
-        self.last_view.money_pool = 0
+        # The money pool goes to the player, the items are rolled
+        self.last_view.sim.open_shop(self.window.cur_lang)
         self.last_view.money_ui.alpha = 0
         self.last_view.buy_text.text = ""
         self.last_view.money_pool_ui.visible = False
 
-        # Add items based on the current round
-        self.shop.update_item_list(self.last_view.round, self.player)
-
         # UI
         self.w, self.h = self.window.get_size()
         self.manager = arcade.gui.UIManager()
@@ -2380,7 +1655,7 @@ class ShopView(arcade.View):
                                                vertical=False)
 
         # Status text
-        back_ground = arcade.load_texture("graphics/ui/StatusText.png")
+        back_ground = textures.Textures.get("graphics/ui/StatusText.png")
         self.player_text = arcade.gui.UITextArea(x=self.w/2 - 480,
                                                  y=self.h/2 - 160,
                                                  width=250,
@@ -2400,10 +1675,11 @@ class ShopView(arcade.View):
         )
 
         # Money
-        self.coin = arcade.Sprite(filename="graphics/ui/Coin.png",
-                                  center_x=self.w/2 - 480,
-                                  center_y=self.h/2 + 280,
-                                  scale=1)
+        self.coin = arcade.Sprite(
+            texture=textures.Textures.get("graphics/ui/Coin.png"),
+            center_x=self.w/2 - 480,
+            center_y=self.h/2 + 280,
+            scale=1)
         self.money_text = arcade.Text(str(self.player.money),
                                       self.w/2 - 420,
                                       self.h/2 + 270,
@@ -2452,7 +1728,7 @@ class ShopView(arcade.View):
         item_button_3.on_click = self.on_click_item_3
 
         # Refresh button
-        self.refresh_cost_text = arcade.Text(str(self.refresh_cost),
+        self.refresh_cost_text = arcade.Text(str(self.last_view.sim.refresh_cost),
                                              start_x=self.w/2 + 100,
                                              start_y=self.h/2 - 160,
                                              color=utils.Color.BLACK,
@@ -2494,7 +1770,7 @@ class ShopView(arcade.View):
             self.cnt -= 1
         elif self.cnt == 0:
             self.purchase_text.text = ""
-        self.refresh_cost_text.text = str(self.refresh_cost)
+        self.refresh_cost_text.text = str(self.last_view.sim.refresh_cost)
 
     def on_draw(self) -> None:
         self.clear()
@@ -2511,8 +1787,7 @@ class ShopView(arcade.View):
         self.refresh_cost_text.draw()
 
     def on_click_continue(self, event) -> None:
-        # Update player weapon reference
-        self.player.change_weapon(0)
+        self.last_view.sim.close_shop()
 
         # Clear the game view reference
         self.player = None
@@ -2626,32 +1901,30 @@ class ShopView(arcade.View):
         self.player_text.text = text
 
     def get_items(self) -> None:
-        self.items = self.shop.get_items(self.last_view.round,
-                                         self.player,
-                                         self.window.cur_lang)
+        self.items = self.last_view.sim.shop_items
         for i in range(0, 4):
             # Item background
             bg = arcade.Sprite()
             bg.center_x = self.ref_pos.x + i*160
             bg.center_y = self.ref_pos.y + 20
             if self.items[i].quality == 1:
-                bg.texture = arcade.load_texture("graphics/ui/BronzeTier.png")
+                bg.texture = textures.Textures.get("graphics/ui/BronzeTier.png")
             elif self.items[i].quality == 2:
-                bg.texture = arcade.load_texture("graphics/ui/SliverTier.png")
+                bg.texture = textures.Textures.get("graphics/ui/SliverTier.png")
             elif self.items[i].quality == 3:
-                bg.texture = arcade.load_texture("graphics/ui/GoldTier.png")
+                bg.texture = textures.Textures.get("graphics/ui/GoldTier.png")
             else:
-                bg.texture = arcade.load_texture("graphics/ui/SpecialTier.png")
+                bg.texture = textures.Textures.get("graphics/ui/SpecialTier.png")
             bg.scale = 1.5
             self.item_bg_list.append(bg)
 
             # Item logo
             logo = arcade.Sprite()
             if self.items[i].image_path == "":
-                logo.texture = arcade.load_texture(
+                logo.texture = textures.Textures.get(
                     "graphics/item/PlaceHolder.png")
             else:
-                logo.texture = arcade.load_texture(self.items[i].image_path)
+                logo.texture = textures.Textures.get(self.items[i].image_path)
             logo.center_x = self.ref_pos.x + i*160
             logo.center_y = self.ref_pos.y + 120
             self.item_logo_list.append(logo)
@@ -2704,13 +1977,7 @@ class ShopView(arcade.View):
         self.cnt = 60
 
     def purchase_item(self, index: int) -> None:
-        if self.player.money < self.items[index].cost:
-            # Not enough money
-            self.update_purchase_text(1)
-            self.window.play_purchase_fail_sound()
-            return
-
-        if self.items[index].equip(self.items[index], self.player):
+        if self.last_view.sim.buy_item(index):
             # Deal with the button
 
             # Remove item visuals
@@ -2724,21 +1991,16 @@ class ShopView(arcade.View):
             self.update_purchase_text(0)
             self.item_button_enables[index] = False
             self.window.play_purchase_sound()
-            tmp_item = (int(self.items[index].quality),
-                        str(self.items[index].image_path))
-            self.last_view.all_item_list.append(tmp_item)
         else:
-            # Purchase failed
+            # Not enough money or purchase failed
             self.update_purchase_text(1)
             self.window.play_purchase_fail_sound()
 
     def on_click_refresh(self, event) -> None:
-        if self.player.money < self.refresh_cost:
+        if not self.last_view.sim.refresh_shop():
             self.update_purchase_text(2)
             self.window.play_purchase_fail_sound()
             return
-        self.player.money -= self.refresh_cost
-        self.refresh_cost += self.last_view.round
         self.window.play_refresh_sound()
 
         # Clear item list
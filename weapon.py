@@ -3,6 +3,10 @@ import math
 
 from arcade import Color
 import utils
+import textures
+import audio
+import projectile
+import pool
 from pyglet.math import Vec2
 
 """
@@ -10,57 +14,25 @@ Bullets
 """
 
 
-class Bullet(arcade.Sprite):
-    """Bullet base class."""
-
-    def __init__(self, filename="graphics/weapon/Bullet.png",
-                 width=6,
-                 height=6,
-                 scale=1) -> None:
-        super().__init__(
-            filename=filename,
-            image_width=width,
-            image_height=height,
-            scale=scale,
-        )
-        self.aim = Vec2(0, 0)
-        self.speed = float(0)
-        self.damage = int(0)
-        self.life_span = int(20)
-
-    def set_angle(self, rotate_angle: float) -> None:
-        """Rotate the bullet sprite when needed."""
-        self.angle = rotate_angle
-
-
-class EnergyBullet(Bullet):
-    """Bullet that cost energy."""
-
-    def __init__(self) -> None:
-        super().__init__()
-        self.texture = arcade.load_texture("graphics/weapon/EnergyBullet.png")
-
-
-class Missile(Bullet):
-    """Missile from the Rocket."""
-
-    def __init__(self) -> None:
-        super().__init__("graphics/weapon/Missile.png", 15, 15)
+# Bullet kinds, the bullets themselves live in a projectile.BulletSystem
+Bullet = projectile.BulletKind("graphics/weapon/Bullet.png", 6, 6)
+EnergyBullet = projectile.BulletKind("graphics/weapon/EnergyBullet.png", 6, 6)
+Missile = projectile.BulletKind("graphics/weapon/Missile.png", 15, 15)
+FireBall = projectile.BulletKind("graphics/weapon/FireBall.png", 20, 20, 60)
+ExplosionSeed = projectile.BulletKind("graphics/weapon/Bullet.png", 6, 6)
+BossFireBall = projectile.BulletKind("graphics/weapon/FireBall.png",
+                                     20, 20, 60)
 
 
-class FireBall(Bullet):
-    """FireBall class for enemy red."""
-
-    def __init__(self) -> None:
-        super().__init__("graphics/weapon/FireBall.png", 20, 20)
-        self.life_span = int(60)
-
-
-class Explosion(arcade.SpriteCircle):
+class Explosion(pool.Pooled, arcade.Sprite):
     """Explosion collider class."""
 
-    def __init__(self, x: int, y: int):
-        super().__init__(25, utils.Color.WHITE, False)
+    def __init__(self, x: int = 0, y: int = 0):
+        super().__init__(
+            texture=textures.Textures.circle(25, utils.Color.WHITE))
+        self.reset(x, y)
+
+    def reset(self, x: int, y: int) -> None:
         self.life_span = 10
         self.center_x = x
         self.center_y = y
@@ -72,19 +44,6 @@ class Explosion(arcade.SpriteCircle):
         self.life_span -= 1
 
 
-class ExplosionSeed(Bullet):
-    """Multi-explosion seed. """
-
-
-class BossFireBall(FireBall):
-    """FireBall class for enemy red."""
-
-    def __init__(self, x: int, y: int) -> None:
-        super().__init__()
-        self.center_x = x
-        self.center_y = y
-
-
 """
 Objects
 """
@@ -109,11 +68,11 @@ class PlacedWallObject(Object):
 
     def __init__(self, health_max: int = 200) -> None:
         super().__init__()
-        self.texture = arcade.load_texture("graphics/weapon/PlacedWall0.png")
+        self.texture = textures.Textures.get("graphics/weapon/PlacedWall0.png")
         self.object_type = 0  # Wall object
         self.textures = [
-            arcade.load_texture("graphics/weapon/PlacedWall1.png"),
-            arcade.load_texture("graphics/weapon/PlacedWall2.png")
+            textures.Textures.get("graphics/weapon/PlacedWall1.png"),
+            textures.Textures.get("graphics/weapon/PlacedWall2.png")
         ]
         self.health_max = health_max
         self.health = health_max
@@ -131,7 +90,7 @@ class BarrelObject(Object):
 
     def __init__(self) -> None:
         super().__init__()
-        self.texture = arcade.load_texture("graphics/weapon/Barrel.png")
+        self.texture = textures.Textures.get("graphics/weapon/Barrel.png")
         self.health = 0
         self.object_type = 1  # Barrel object
 
@@ -141,7 +100,7 @@ class MineObject(Object):
 
     def __init__(self) -> None:
         super().__init__()
-        self.texture = arcade.load_texture("graphics/weapon/Mine.png")
+        self.texture = textures.Textures.get("graphics/weapon/Mine.png")
         self.health = 0
         self.object_type = 2  # Mine object
 
@@ -168,17 +127,17 @@ class Weapon(arcade.Sprite):
         self.cost = int(0)
         self.life_span = int(20)
         self.texture_list = [
-            arcade.load_texture(weapon_name),
-            arcade.load_texture(weapon_name, flipped_horizontally=True),
+            textures.Textures.get(weapon_name),
+            textures.Textures.get(weapon_name, flipped_horizontally=True),
         ]
         super().__init__(
-            filename=weapon_name,
+            texture=self.texture_list[0],
             center_x=self.pos.x,
             center_y=self.pos.y,
             image_width=20,
             image_height=10,
         )
-        self.sound = arcade.Sound("audio/wpn_fire_usp45.wav")
+        self.sound = audio.Sounds.get("audio/wpn_fire_usp45.wav")
         self.bullet = Bullet
 
     def update(self) -> None:
@@ -204,21 +163,15 @@ class Weapon(arcade.Sprite):
 
         self.angle = rotate_angle
 
-    def get_bullet(self) -> arcade.SpriteList:
-        """Get the bullet list shot by the weapon."""
-        bullets = arcade.SpriteList()
-        bullet = self.bullet()
-        bullet.center_x = self.center_x - 10
-        bullet.center_y = self.center_y
-        bullet.speed = self.bullet_speed
-        bullet.life_span = self.life_span
-        bullet.aim = self.aim_pos.normalize().scale(bullet.speed)
-        bullet.damage = self.damage
-        bullets.append(bullet)
-        return bullets
+    def shoot(self, bullets: projectile.BulletSystem) -> None:
+        """Add the bullets shot by the weapon."""
+        bullets.spawn(self.bullet,
+                      self.center_x - 10, self.center_y,
+                      self.aim_pos.normalize().scale(self.bullet_speed),
+                      self.damage, self.life_span)
 
     def play_sound(self, effect_volume: int) -> None:
-        self.sound.play(volume=effect_volume/20)
+        audio.Sounds.play(self.sound, volume=effect_volume/20)
 
 
 class Shotgun(Weapon):
@@ -234,22 +187,16 @@ class Shotgun(Weapon):
         self.bullet_num = 3
         self.max_bullets = 12
         self.bullet = EnergyBullet
-        self.sound = arcade.Sound("audio/wpn_fire_m1014.wav")
+        self.sound = audio.Sounds.get("audio/wpn_fire_m1014.wav")
 
-    def get_bullet(self) -> arcade.SpriteList:
-        bullets = arcade.SpriteList()
+    def shoot(self, bullets: projectile.BulletSystem) -> None:
         for i in range(1, self.bullet_num + 1):
             angle = (-0.02 + 0.04 / (self.bullet_num+1) * i) * self.bullet_num
-            bullet = self.bullet()
-            bullet.life_span = self.life_span
-            bullet.center_x = self.center_x - 10
-            bullet.center_y = self.center_y
-            bullet.speed = self.bullet_speed
-            bullet.aim = self.aim_pos.rotate(angle)
-            bullet.aim = bullet.aim.normalize().scale(bullet.speed)
-            bullet.damage = self.damage
-            bullets.append(bullet)
-        return bullets
+            aim = self.aim_pos.rotate(angle)
+            bullets.spawn(self.bullet,
+                          self.center_x - 10, self.center_y,
+                          aim.normalize().scale(self.bullet_speed),
+                          self.damage, self.life_span)
 
 
 class Uzi(Weapon):
@@ -264,19 +211,13 @@ class Uzi(Weapon):
         self.life_span = 25
         self.bullet_speed = 30
         self.bullet = EnergyBullet
-        self.sound = arcade.Sound("audio/wpn_fire_p90.wav")
+        self.sound = audio.Sounds.get("audio/wpn_fire_p90.wav")
 
-    def get_bullet(self) -> arcade.SpriteList:
-        bullets = arcade.SpriteList()
-        bullet = self.bullet()
-        bullet.life_span = self.life_span
-        bullet.center_x = self.center_x - 10
-        bullet.center_y = self.center_y
-        bullet.speed = self.bullet_speed
-        bullet.aim = self.aim_pos.normalize().scale(bullet.speed)
-        bullet.damage = self.damage
-        bullets.append(bullet)
-        return bullets
+    def shoot(self, bullets: projectile.BulletSystem) -> None:
+        bullets.spawn(self.bullet,
+                      self.center_x - 10, self.center_y,
+                      self.aim_pos.normalize().scale(self.bullet_speed),
+                      self.damage, self.life_span)
 
 
 class Rocket(Weapon):
@@ -292,22 +233,16 @@ class Rocket(Weapon):
         self.bullet_speed = 32
         self.life_span = 15
         self.bullet_num = 1
-        self.sound = arcade.Sound("audio/wpn_fire_rocket.wav")
+        self.sound = audio.Sounds.get("audio/wpn_fire_rocket.wav")
 
-    def get_bullet(self) -> arcade.SpriteList:
-        bullets = arcade.SpriteList()
+    def shoot(self, bullets: projectile.BulletSystem) -> None:
         for i in range(1, self.bullet_num + 1):
             angle = (-0.06 + 0.12 / (self.bullet_num+1) * i) * self.bullet_num
-            bullet = self.bullet()
-            bullet.life_span = self.life_span
-            bullet.center_x = self.center_x - 10
-            bullet.center_y = self.center_y
-            bullet.speed = self.bullet_speed
-            bullet.aim = self.aim_pos.rotate(angle)
-            bullet.aim = bullet.aim.normalize().scale(bullet.speed)
-            bullet.damage = self.damage
-            bullets.append(bullet)
-        return bullets
+            aim = self.aim_pos.rotate(angle)
+            bullets.spawn(self.bullet,
+                          self.center_x - 10, self.center_y,
+                          aim.normalize().scale(self.bullet_speed),
+                          self.damage, self.life_span)
 
 
 class PlacedWall(Weapon):
@@ -322,9 +257,9 @@ class PlacedWall(Weapon):
         self.cost = 5
         self.is_right = True
         self.texture_list = [
-            arcade.load_texture("graphics/weapon/PlacedWall0.png"),
+            textures.Textures.get("graphics/weapon/PlacedWall0.png"),
         ]
-        self.sound = arcade.Sound("audio/wall_placed.wav")
+        self.sound = audio.Sounds.get("audio/wall_placed.wav")
         self.health_max = 300
 
     def update(self) -> None:
@@ -351,9 +286,9 @@ class Barrel(Weapon):
         self.cost = 25
         self.is_right = True
         self.texture_list = [
-            arcade.load_texture("graphics/weapon/Barrel.png"),
+            textures.Textures.get("graphics/weapon/Barrel.png"),
         ]
-        self.sound = arcade.Sound("audio/physics_place_object.wav")
+        self.sound = audio.Sounds.get("audio/physics_place_object.wav")
 
     def update(self) -> None:
         self.center_x = self.pos.x
@@ -379,9 +314,9 @@ class Mine(Weapon):
         self.cost = 25
         self.is_right = True
         self.texture_list = [
-            arcade.load_texture("graphics/weapon/Mine.png"),
+            textures.Textures.get("graphics/weapon/Mine.png"),
         ]
-        self.sound = arcade.Sound("audio/physics_place_object.wav")
+        self.sound = audio.Sounds.get("audio/physics_place_object.wav")
 
     def update(self) -> None:
         self.center_x = self.pos.x